@@ -0,0 +1,250 @@
+"""
+Asyncio conversion api, for use by services embedding mkdocs_translate.
+
+Conversions run preprocessing and postprocessing in a worker thread, while pandoc is run on the event loop
+using asyncio.create_subprocess_exec, so the event loop is not blocked.
+
+Example::
+
+    async for (rst_file, md_file, error) in iter_migrate(['docs/**/*.rst'], concurrency=8):
+        print(md_file or error)
+"""
+# message/aio.py
+
+import asyncio
+import contextvars
+import functools
+import logging
+import subprocess
+from typing import AsyncIterator
+from typing import Callable
+
+import mkdocs_translate.cache
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__
+from .backend import PandocBackend
+from .backend import PandocError
+from .backend import PandocTimeout
+from .backend import context_backend
+from .backend import log_messages
+from .backend import memory_options
+from .backend import pandoc_backend
+from .backend import parse_messages
+
+logger = logging.getLogger(__app_name__)
+
+
+class AsyncBackend(PandocBackend):
+    """
+    Pandoc backend used by worker threads, running pandoc on the event loop.
+
+    Attributes:
+        loop: event loop used to run pandoc
+        base: process backend, providing version and limits
+    """
+    name = 'asyncio'
+    loop: asyncio.AbstractEventLoop
+    base: PandocBackend
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, base: PandocBackend):
+        self.loop = loop
+        self.base = base
+        self.limit(base.timeout, base.memory, base.retries)
+
+    def options(self) -> dict:
+        return self.base.options()
+
+    def version(self) -> str:
+        return self.base.version()
+
+    def convert(self, text: str, from_format: str, to_format: str) -> str:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            raise RuntimeError("Synchronous pandoc conversion on event loop, use 'await pandoc()'")
+
+        future = asyncio.run_coroutine_threadsafe(_convert(self, text, from_format, to_format), self.loop)
+        return future.result()
+
+
+async def _convert(backend: PandocBackend, text: str, from_format: str, to_format: str) -> str:
+    """
+    Use pandoc to convert text, within backend timeout and memory limits, retrying if conversion times out.
+
+    :raises PandocTimeout: if all attempts time out
+    :raises PandocError: if pandoc failed
+    """
+    attempts = 1 + max(0, int(backend.retries or 0))
+    for attempt in range(1, attempts + 1):
+        try:
+            return await _run(backend, text, from_format, to_format)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"pandoc conversion from {from_format} to {to_format} timed out after "
+                           f"{backend.timeout} seconds (attempt {attempt} of {attempts})")
+    raise PandocTimeout(f"pandoc conversion from {from_format} to {to_format} timed out after "
+                        f"{backend.timeout} seconds ({attempts} attempts)")
+
+
+async def _run(backend: PandocBackend, text: str, from_format: str, to_format: str) -> str:
+    """
+    Run pandoc once.
+
+    :raises subprocess.TimeoutExpired: if pandoc did not complete within timeout (pandoc is stopped)
+    """
+    process = await asyncio.create_subprocess_exec(
+        "pandoc", *memory_options(backend.memory),
+        "--from", from_format, "--to", to_format, "--wrap=none", "--eol=lf",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        (stdout, stderr) = await asyncio.wait_for(process.communicate(text.encode('utf-8')),
+                                                  timeout=backend.timeout or None)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.communicate()
+        raise subprocess.TimeoutExpired('pandoc', backend.timeout)
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+
+    messages = parse_messages(stderr.decode('utf-8', errors='replace'))
+    if process.returncode != 0:
+        errors = [message.message for message in messages if message.verbosity != 'INFO']
+        raise PandocError(f"pandoc conversion from {from_format} to {to_format} failed with exit code "
+                          f"{process.returncode}: " + ('\n'.join(errors) or 'no error message'))
+    log_messages(messages)
+    return stdout.decode('utf-8')
+
+
+async def _in_thread(function: Callable, *args):
+    """
+    Run function in a worker thread, with pandoc conversions run on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    context.run(context_backend.set, AsyncBackend(loop, pandoc_backend()))
+    return await loop.run_in_executor(None, functools.partial(context.run, function, *args))
+
+
+async def pandoc(text: str, from_format: str, to_format: str) -> str:
+    """
+    Use pandoc to convert text, using cached conversion results if available.
+
+    :param text: content to convert
+    :param from_format: pandoc input format
+    :param to_format: pandoc output format
+    :return: converted content
+    """
+    backend = pandoc_backend()
+    if mkdocs_translate.cache.cache_size() <= 0:
+        return await _convert(backend, text, from_format, to_format)
+
+    key = await asyncio.to_thread(mkdocs_translate.cache.cache_key, text, from_format, to_format)
+    output = await asyncio.to_thread(mkdocs_translate.cache.cache_get, key)
+    if output is None:
+        output = await _convert(backend, text, from_format, to_format)
+        await asyncio.to_thread(mkdocs_translate.cache.cache_put, key, output)
+    return output
+
+
+async def convert_rst(rst_file: str) -> str:
+    """
+    Use pandoc to convert rst file to markdown file, see translate.convert_rst().
+
+    :param rst_file: rst file to convert
+    :return: markdown file generated
+    """
+    return await _in_thread(mkdocs_translate.translate.convert_rst, rst_file)
+
+
+async def convert_markdown(md_file: str) -> str:
+    """
+    Use pandoc to convert markdown file to html file for translation, see translate.convert_markdown().
+
+    :param md_file: markdown file to convert
+    :return: html file generated
+    """
+    return await _in_thread(mkdocs_translate.translate.convert_markdown, md_file)
+
+
+async def convert_html(html_file: str) -> str:
+    """
+    Use pandoc to convert html file to markdown file after translation, see translate.convert_html().
+
+    :param html_file: html file to convert
+    :return: markdown file generated
+    """
+    return await _in_thread(mkdocs_translate.translate.convert_html, html_file)
+
+
+async def deepl_document(en_html: str, fr_html: str):
+    """
+    Submit english html file to deepl for translation, see translate.deepl_document().
+
+    :param en_html: English html file
+    :param fr_html: French html file
+    :return: status
+    """
+    return await _in_thread(mkdocs_translate.translate.deepl_document, en_html, fr_html)
+
+
+async def scan_index_rst(base_path: str, rst_file: str) -> str:
+    """
+    Scan rst file for anchors and headings, see translate.scan_index_rst().
+    """
+    return await _in_thread(mkdocs_translate.translate.scan_index_rst, base_path, rst_file)
+
+
+async def scan_download_rst(base_path: str, rst_file: str) -> set[str]:
+    """
+    Scan rst file for download directives, see translate.scan_download_rst().
+    """
+    return await _in_thread(mkdocs_translate.translate.scan_download_rst, base_path, rst_file)
+
+
+async def scan_depends_rst(base_path: str, rst_file: str) -> dict[str, list[str]]:
+    """
+    Scan rst file for dependencies on other files and anchors, see translate.scan_depends_rst().
+    """
+    return await _in_thread(mkdocs_translate.translate.scan_depends_rst, base_path, rst_file)
+
+
+async def scan_toctree(toctree_rst_file: str) -> object:
+    """
+    Scan rst file for toctree navigation, see translate.scan_toctree().
+    """
+    return await _in_thread(mkdocs_translate.translate.scan_toctree, toctree_rst_file)
+
+
+async def iter_migrate(paths: list[str], concurrency: int = 4) -> AsyncIterator[tuple[str, str, str]]:
+    """
+    Convert rst files to markdown, producing each result as soon as its conversion completes.
+
+    A failed conversion is produced as a result, so the rest of the files are still converted.
+
+    :param paths: rst files, folders or glob patterns
+    :param concurrency: maximum number of conversions at once
+    :return: async iterator of rst_file, md_file (or None if failed), error message (or None if successful)
+    """
+    rst_files = await asyncio.to_thread(mkdocs_translate.translate.collect_paths, paths, 'rst', True)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def migrate(rst_file: str) -> tuple[str, str, str]:
+        async with semaphore:
+            try:
+                return (rst_file, await convert_rst(rst_file), None)
+            except Exception as error:
+                logger.debug(rst_file + ": conversion failed", exc_info=True)
+                return (rst_file, None, f"{type(error).__name__}: {error}")
+
+    tasks = [asyncio.ensure_future(migrate(rst_file)) for rst_file in rst_files]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        for task in tasks:
+            task.cancel()
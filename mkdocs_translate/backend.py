@@ -0,0 +1,546 @@
+"""
+Pandoc conversion backends.
+
+The subprocess backend runs pandoc once for each conversion. The server backend starts a local pandoc-server
+once per run and sends conversions to it over localhost http, falling back to subprocess if unavailable.
+
+The backend is configured and owned by the current session (shared by its project sessions), so sessions used in the
+same process may each use their own backend.
+
+Each conversion is limited by a wall-clock timeout, and pandoc processes by a heap limit. A conversion that
+times out is retried a limited number of times before failing with PandocTimeout.
+"""
+# message/backend.py
+
+import abc
+import atexit
+import contextvars
+import http.client
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import time
+import weakref
+from typing import Callable
+from typing import NamedTuple
+
+import mkdocs_translate.session
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+BACKENDS = ['subprocess', 'server']
+
+# number of kept-alive connections to pandoc-server
+SERVER_CONNECTIONS = 4
+
+# seconds to wait for pandoc-server to start
+SERVER_STARTUP = 5.0
+
+# seconds before a pandoc conversion is stopped, 0 for no limit
+PANDOC_TIMEOUT = 300
+
+# pandoc memory (heap) limit in megabytes, 0 for no limit
+PANDOC_MEMORY = 4096
+
+# number of times a conversion is retried after timing out
+PANDOC_RETRIES = 1
+
+# pandoc message, example: [WARNING] Reference not found for 'x' at line 5 column 1
+PANDOC_MESSAGE = re.compile(r"^\[(\w+)\] (.*)$")
+PANDOC_POSITION = re.compile(r"\bline (\d+),? column (\d+)")
+
+
+class PandocError(subprocess.SubprocessError):
+    """
+    Pandoc conversion failed.
+    """
+    pass
+
+
+class PandocTimeout(PandocError):
+    """
+    Pandoc conversion did not complete within timeout, including retries.
+    """
+    pass
+
+
+class PandocMessage(NamedTuple):
+    """
+    Warning or information message reported by pandoc.
+
+    Attributes:
+        verbosity: message level, 'ERROR', 'WARNING' or 'INFO'
+        message: message text
+        line: line number of pandoc input, if reported
+        column: column number of pandoc input, if reported
+    """
+    verbosity: str
+    message: str
+    line: int = None
+    column: int = None
+
+
+def parse_messages(stderr: str) -> list[PandocMessage]:
+    """
+    Parse pandoc stderr into messages, continuation lines are added to the preceding message.
+
+    :param stderr: pandoc standard error output
+    :return: pandoc messages
+    """
+    messages = []
+    for line in stderr.splitlines():
+        if not line.strip():
+            continue
+        match = PANDOC_MESSAGE.match(line)
+        if match:
+            messages.append([match.group(1), match.group(2)])
+        elif messages:
+            messages[-1][1] += '\n' + line
+        else:
+            messages.append(['ERROR', line])
+
+    return [_pandoc_message(verbosity, message) for (verbosity, message) in messages]
+
+
+def _pandoc_message(verbosity: str, message: str) -> PandocMessage:
+    position = PANDOC_POSITION.search(message)
+    if position:
+        return PandocMessage(verbosity, message, int(position.group(1)), int(position.group(2)))
+    return PandocMessage(verbosity, message)
+
+
+def log_messages(messages: list[PandocMessage]) -> None:
+    """
+    Log pandoc messages at the matching log level.
+    """
+    for message in messages:
+        if message.verbosity == 'INFO':
+            logger.info("pandoc: " + message.message)
+        elif message.verbosity == 'WARNING':
+            logger.warning("pandoc: " + message.message)
+        else:
+            logger.error("pandoc: " + message.message)
+
+
+def memory_options(memory: int) -> list[str]:
+    """
+    Pandoc runtime options limiting heap size, so runaway conversions fail rather than exhaust memory.
+
+    The limit is applied by the pandoc (haskell) runtime, as an address space limit (RLIMIT_AS) conflicts with the
+    large address space the runtime reserves on startup.
+
+    :param memory: memory limit in megabytes, 0 for no limit
+    :return: pandoc command line options
+    """
+    if not memory:
+        return []
+    return ['+RTS', f'-M{int(memory)}m', '-RTS']
+
+
+class PandocBackend(abc.ABC):
+    """
+    Pandoc conversion backend.
+
+    Attributes:
+        name: backend name, used to configure worker processes
+        timeout: seconds before a conversion is stopped, 0 for no limit
+        memory: pandoc memory limit in megabytes, 0 for no limit
+        retries: number of times a conversion is retried after timing out
+    """
+    name: str = None
+    timeout: float = PANDOC_TIMEOUT
+    memory: int = PANDOC_MEMORY
+    retries: int = PANDOC_RETRIES
+
+    @abc.abstractmethod
+    def convert(self, text: str, from_format: str, to_format: str) -> str:
+        """
+        Use pandoc to convert text.
+
+        :param text: content to convert
+        :param from_format: pandoc input format
+        :param to_format: pandoc output format
+        :return: converted content
+        """
+
+    def options(self) -> dict:
+        """
+        Options used to share this backend with worker processes, see init_backend().
+        """
+        return {'name': self.name, 'timeout': self.timeout, 'memory': self.memory, 'retries': self.retries}
+
+    def limit(self, timeout: float = PANDOC_TIMEOUT, memory: int = PANDOC_MEMORY, retries: int = PANDOC_RETRIES) -> None:
+        """
+        Configure conversion limits.
+
+        :param timeout: seconds before a conversion is stopped, 0 for no limit
+        :param memory: pandoc memory limit in megabytes, 0 for no limit
+        :param retries: number of times a conversion is retried after timing out
+        """
+        self.timeout = timeout
+        self.memory = memory
+        self.retries = retries
+
+    def _retry(self, convert: Callable[[], str], from_format: str, to_format: str) -> str:
+        """
+        Run conversion, retrying a limited number of times if it times out.
+
+        :param convert: conversion, raising subprocess.TimeoutExpired on timeout
+        :return: converted content
+        :raises PandocTimeout: if all attempts time out
+        """
+        attempts = 1 + max(0, int(self.retries or 0))
+        for attempt in range(1, attempts + 1):
+            try:
+                return convert()
+            except subprocess.TimeoutExpired:
+                logger.warning(f"pandoc conversion from {from_format} to {to_format} timed out after "
+                               f"{self.timeout} seconds (attempt {attempt} of {attempts})")
+        raise PandocTimeout(f"pandoc conversion from {from_format} to {to_format} timed out after "
+                            f"{self.timeout} seconds ({attempts} attempts)")
+
+    def version(self) -> str:
+        """
+        Look up pandoc version (used to detect when conversion results may change).
+
+        :return: pandoc version, or 'unknown' if pandoc is not available
+        """
+        try:
+            completed = subprocess.run(["pandoc", "--version"], capture_output=True, text=True)
+            version = completed.stdout.split('\n', 1)[0].strip()
+        except OSError:
+            version = None
+        return version or 'unknown'
+
+    def close(self) -> None:
+        """
+        Release any resources held by backend.
+        """
+        pass
+
+
+class SubprocessBackend(PandocBackend):
+    """
+    Run pandoc once for each conversion, using standard input and output.
+    """
+    name = 'subprocess'
+
+    def convert(self, text: str, from_format: str, to_format: str) -> str:
+        return self._retry(lambda: self._run(text, from_format, to_format), from_format, to_format)
+
+    def _run(self, text: str, from_format: str, to_format: str) -> str:
+        """
+        Run pandoc once, within timeout and memory limits.
+
+        :raises subprocess.TimeoutExpired: if pandoc did not complete within timeout (pandoc is stopped)
+        :raises PandocError: if pandoc failed
+        """
+        command = ["pandoc"] + memory_options(self.memory) + \
+                  ["--from", from_format, "--to", to_format, "--wrap=none", "--eol=lf"]
+        with subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              encoding='utf-8') as process:
+            try:
+                (stdout, stderr) = process.communicate(text, timeout=self.timeout or None)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+
+        messages = parse_messages(stderr)
+        if process.returncode != 0:
+            errors = [message.message for message in messages if message.verbosity != 'INFO']
+            if process.returncode < 0:
+                errors.append(f"terminated by signal {-process.returncode}")
+            raise PandocError(f"pandoc conversion from {from_format} to {to_format} failed with exit code "
+                              f"{process.returncode}: " + ('\n'.join(errors) or 'no error message'))
+        log_messages(messages)
+        return stdout
+
+
+class ServerBackend(PandocBackend):
+    """
+    Send conversions to a local pandoc-server over http, using a small pool of kept-alive connections.
+
+    The server is started when no port is provided, and stopped when the backend is closed.
+
+    Attributes:
+        port: localhost port pandoc-server is listening on
+        process: pandoc-server process, if started by this backend
+        owner: process id that started pandoc-server, forked worker processes do not stop the server
+    """
+    name = 'server'
+    port: int
+    process: subprocess.Popen
+    owner: int
+
+    def __init__(self, port: int = None, connections: int = SERVER_CONNECTIONS,
+                 timeout: float = PANDOC_TIMEOUT, memory: int = PANDOC_MEMORY, retries: int = PANDOC_RETRIES):
+        self.limit(timeout, memory, retries)
+        self.process = None
+        self.owner = os.getpid()
+        self.connections = queue.LifoQueue()
+        for _ in range(connections):
+            self.connections.put(None)
+
+        if port:
+            self.port = port
+        else:
+            self.port = _free_port()
+            self.process = _start_server(self.port, self.timeout, self.memory)
+
+        self._wait_for_server()
+
+    def options(self) -> dict:
+        return dict(super().options(), port=self.port)
+
+    def _wait_for_server(self) -> None:
+        """
+        Wait for pandoc-server to respond to version request.
+
+        :raises OSError: if server did not start
+        """
+        deadline = time.monotonic() + SERVER_STARTUP
+        while True:
+            if self.process and self.process.poll() is not None:
+                raise OSError(f"pandoc-server exited with code {self.process.returncode}")
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=SERVER_STARTUP)
+                connection.request('GET', '/version')
+                response = connection.getresponse()
+                version = response.read().decode('utf-8').strip()
+                connection.close()
+                if response.status != 200:
+                    raise OSError(f"pandoc-server version request failed: {response.status}")
+                logger.debug("pandoc-server " + version + " on port " + str(self.port))
+                return
+            except (OSError, http.client.HTTPException) as error:
+                if time.monotonic() > deadline:
+                    self.close()
+                    raise OSError(f"pandoc-server not available on port {self.port}: {error}")
+                time.sleep(0.05)
+
+    def convert(self, text: str, from_format: str, to_format: str) -> str:
+        return self._retry(lambda: self._request(text, from_format, to_format), from_format, to_format)
+
+    def _request(self, text: str, from_format: str, to_format: str) -> str:
+        """
+        Send conversion to pandoc-server once, within timeout.
+
+        :raises subprocess.TimeoutExpired: if pandoc-server did not respond within timeout
+        """
+        body = json.dumps({
+            'text': text,
+            'from': from_format,
+            'to': to_format,
+            'wrap': 'none',
+            'eol': 'lf'
+        }).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+
+        connection = self.connections.get()
+        try:
+            # kept-alive connection may have been closed by server, retry once with new connection
+            for attempt in range(2):
+                if connection is None:
+                    # allow server time to report its own timeout, before giving up on response
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port,
+                                                            timeout=self.timeout + SERVER_STARTUP if self.timeout else None)
+                try:
+                    connection.request('POST', '/', body, headers)
+                    response = connection.getresponse()
+                    payload = response.read().decode('utf-8')
+                    break
+                except socket.timeout:
+                    connection.close()
+                    connection = None
+                    raise subprocess.TimeoutExpired('pandoc-server', self.timeout)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    connection = None
+                    if attempt > 0:
+                        raise
+        finally:
+            self.connections.put(connection)
+
+        if response.status != 200:
+            if 'timeout' in payload.lower() or 'timed out' in payload.lower():
+                raise subprocess.TimeoutExpired('pandoc-server', self.timeout)
+            raise ValueError(f"pandoc-server conversion from {from_format} to {to_format} failed: {payload}")
+
+        result = json.loads(payload)
+        log_messages([_pandoc_message(message.get('verbosity', 'INFO'), message.get('message', ''))
+                      for message in result.get('messages', [])])
+
+        if result.get('base64'):
+            raise ValueError(f"pandoc-server returned binary output converting {from_format} to {to_format}")
+
+        return result['output']
+
+    def close(self) -> None:
+        while not self.connections.empty():
+            connection = self.connections.get_nowait()
+            if connection is not None:
+                connection.close()
+
+        if self.process and self.owner == os.getpid() and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class FallbackBackend(PandocBackend):
+    """
+    Use primary backend, switching to subprocess backend if primary backend fails.
+    """
+
+    def __init__(self, primary: PandocBackend):
+        self.primary = primary
+        self.name = primary.name
+        self.limit(primary.timeout, primary.memory, primary.retries)
+        self.fallback = None
+
+    def options(self) -> dict:
+        if self.fallback:
+            return self.fallback.options()
+        return self.primary.options()
+
+    def version(self) -> str:
+        return self.primary.version()
+
+    def convert(self, text: str, from_format: str, to_format: str) -> str:
+        if self.fallback is None:
+            try:
+                return self.primary.convert(text, from_format, to_format)
+            except (OSError, http.client.HTTPException) as error:
+                logger.warning(f"pandoc {self.primary.name} backend failed, using subprocess: {error}")
+                self.primary.close()
+                self.fallback = SubprocessBackend()
+                self.fallback.limit(self.timeout, self.memory, self.retries)
+        return self.fallback.convert(text, from_format, to_format)
+
+    def close(self) -> None:
+        self.primary.close()
+
+
+def _free_port() -> int:
+    """
+    Find an available localhost port.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int, timeout: float = PANDOC_TIMEOUT, memory: int = PANDOC_MEMORY) -> subprocess.Popen:
+    """
+    Start pandoc-server (or pandoc server) listening on localhost port.
+
+    :param port: localhost port
+    :param timeout: seconds before server stops a conversion, 0 for no limit
+    :param memory: server memory limit in megabytes, 0 for no limit
+    """
+    if shutil.which('pandoc-server'):
+        command = ['pandoc-server', '--port', str(port)]
+    elif shutil.which('pandoc'):
+        command = ['pandoc'] + memory_options(memory) + ['server', '--port', str(port)]
+    else:
+        raise OSError("pandoc not found")
+    if timeout:
+        command += ['--timeout', str(int(max(1, timeout)))]
+
+    logger.debug("Starting " + " ".join(command))
+    return subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# backends initialized by any session, closed on exit
+_backends: weakref.WeakSet = weakref.WeakSet()
+
+# backend used by the current context (example: asyncio conversions, see aio.py), rather than the process backend
+context_backend: contextvars.ContextVar = contextvars.ContextVar('pandoc_backend', default=None)
+
+
+def configure_backend(name: str, timeout: float = PANDOC_TIMEOUT, memory: int = PANDOC_MEMORY,
+                      retries: int = PANDOC_RETRIES) -> None:
+    """
+    Configure pandoc backend used by the current session, the backend is initialized when first used.
+
+    :param name: backend name, 'subprocess' or 'server'
+    :param timeout: seconds before a conversion is stopped, 0 for no limit
+    :param memory: pandoc memory limit in megabytes, 0 for no limit
+    :param retries: number of times a conversion is retried after timing out
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Pandoc backend '{name}' not supported, expected one of: {', '.join(BACKENDS)}")
+    session = mkdocs_translate.session.current_session().root
+    session.backend_name = name
+    session.backend_limits = {'timeout': timeout, 'memory': memory, 'retries': retries}
+
+
+def init_backend(name: str = 'subprocess', port: int = None, timeout: float = PANDOC_TIMEOUT,
+                 memory: int = PANDOC_MEMORY, retries: int = PANDOC_RETRIES) -> PandocBackend:
+    """
+    Initialize pandoc backend used for conversion by the current session.
+
+    If the server backend is unavailable the subprocess backend is used.
+
+    :param name: backend name, 'subprocess' or 'server'
+    :param port: connect to pandoc-server already running on this port (rather than starting one)
+    :param timeout: seconds before a conversion is stopped, 0 for no limit
+    :param memory: pandoc memory limit in megabytes, 0 for no limit
+    :param retries: number of times a conversion is retried after timing out
+    :return: pandoc backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Pandoc backend '{name}' not supported, expected one of: {', '.join(BACKENDS)}")
+
+    session = mkdocs_translate.session.current_session().root
+    if session.backend is not None:
+        session.backend.close()
+        session.backend = None
+    session.backend_name = name
+    session.pandoc_version = None
+
+    backend = None
+    if name == 'server':
+        try:
+            backend = FallbackBackend(ServerBackend(port, timeout=timeout, memory=memory, retries=retries))
+        except OSError as error:
+            logger.warning(f"pandoc-server not available, using subprocess: {error}")
+
+    if backend is None:
+        backend = SubprocessBackend()
+        backend.limit(timeout, memory, retries)
+
+    session.backend = backend
+    _backends.add(backend)
+    return backend
+
+
+def pandoc_backend() -> PandocBackend:
+    """
+    Pandoc backend used for conversion by the current session, initialized on first use as configured.
+    """
+    backend = context_backend.get()
+    if backend is not None:
+        return backend
+    session = mkdocs_translate.session.current_session().root
+    if session.backend is None:
+        return init_backend(session.backend_name, **session.backend_limits)
+    return session.backend
+
+
+def _close_backend() -> None:
+    for backend in list(_backends):
+        backend.close()
+
+
+atexit.register(_close_backend)
@@ -0,0 +1,369 @@
+"""
+Content-addressed cache of pandoc conversion results.
+
+Cache entries are keyed by a hash of the exact pandoc input, the input and output formats, and the pandoc version.
+The cache is kept in the build folder, and is pruned to size removing least recently used entries.
+
+Entries are written atomically, so several processes can share a cache folder. The cache, along with the manifest and
+scan results of the build folder, can be exported as a bundle to seed the build folder of another CI job.
+"""
+# message/cache.py
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tarfile
+import tempfile
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import mkdocs_translate.manifest
+import mkdocs_translate.schedule
+import mkdocs_translate.session
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__, __version__
+
+logger = logging.getLogger(__app_name__)
+
+# default cache size limit in megabytes
+CACHE_SIZE = 256
+
+# lock file in cache folder, held while pruning, exporting or importing
+LOCK_FILE = '.lock'
+
+BUNDLE_FORMAT = 1
+BUNDLE_METADATA = 'bundle.json'
+
+CACHE_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def cache_folder() -> str:
+    """
+    Location of pandoc cache in the build folder.
+    """
+    return mkdocs_translate.session.current_session().cache_folder
+
+
+def cache_size() -> int:
+    """
+    Cache size limit in bytes, zero if cache is disabled.
+    """
+    config = mkdocs_translate.session.current_session().config
+    return int(config.get('cache_size', CACHE_SIZE)) * 1024 * 1024
+
+
+def cache_key(text: str, from_format: str, to_format: str) -> str:
+    """
+    Cache key for pandoc conversion.
+
+    :param text: content to convert
+    :param from_format: pandoc input format (including extensions)
+    :param to_format: pandoc output format (including extensions)
+    :return: hash of conversion inputs
+    """
+    key = json.dumps([from_format, to_format, mkdocs_translate.translate.pandoc_version()])
+    digest = hashlib.sha256(key.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    return os.path.join(cache_folder(), key[0:2], key)
+
+
+def cache_get(key: str) -> str:
+    """
+    Look up cached conversion result, marking entry as recently used.
+
+    :param key: cache key
+    :return: cached pandoc output, or None if not available
+    """
+    path = _cache_path(key)
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            output = file.read()
+        os.utime(path)
+    except OSError:
+        return None
+
+    logger.debug("cache hit: " + key)
+    return output
+
+
+def cache_put(key: str, output: str) -> None:
+    """
+    Store conversion result in cache.
+
+    :param key: cache key
+    :param output: pandoc output
+    """
+    path = _cache_path(key)
+    try:
+        _write_file(path, output.encode('utf-8'))
+    except OSError as error:
+        logger.warning(f"cache write failed for {path}: {error}")
+
+
+def _write_file(path: str, data: bytes) -> None:
+    """
+    Write file atomically, so concurrent readers never see a partial file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    (handle, tmp_path) = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def cache_lock(exclusive: bool = True) -> Iterator[None]:
+    """
+    Lock cache folder, shared by processes exporting or importing, exclusive while pruning.
+
+    Locking is skipped where fcntl is not available, entries are still written atomically.
+
+    :param exclusive: exclusive lock, rather than shared lock
+    """
+    if fcntl is None:
+        yield
+        return
+
+    folder = cache_folder()
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _cache_entries() -> list[tuple[str, int, float]]:
+    """
+    Cache entries as (path, size, last used) tuples.
+
+    Lock file and temporary files (being written by another process) are not entries.
+    """
+    entries = []
+    for (dirpath, dirnames, filenames) in os.walk(cache_folder()):
+        for filename in filenames:
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+    return entries
+
+
+def cache_stats() -> dict[str, object]:
+    """
+    Summary of cache contents.
+    """
+    entries = _cache_entries()
+    return {
+        'folder': cache_folder(),
+        'entries': len(entries),
+        'size': sum(entry[1] for entry in entries),
+        'limit': cache_size()
+    }
+
+
+def prune_cache(limit: int = None) -> tuple[int, int]:
+    """
+    Prune cache to size limit, removing least recently used entries first.
+
+    :param limit: size limit in bytes, defaults to cache_size configuration
+    :return: number of entries removed, bytes removed
+    """
+    if limit is None:
+        limit = cache_size()
+
+    removed = 0
+    removed_size = 0
+    with cache_lock():
+        entries = _cache_entries()
+        total = sum(entry[1] for entry in entries)
+
+        for (path, size, used) in sorted(entries, key=lambda entry: entry[2]):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            removed_size += size
+
+    if removed:
+        logger.info(f"cache pruned {removed} entries ({removed_size} bytes)")
+    return (removed, removed_size)
+
+
+def _state_files() -> dict[str, tuple[object, str]]:
+    """
+    Build folder files included in cache bundle (manifest, scan results and durations) for each project.
+
+    :return: session and file location, by bundle member name
+    """
+    root = mkdocs_translate.session.current_session()
+    files = {}
+    for session in root.project_sessions():
+        with session.activate():
+            paths = [
+                mkdocs_translate.manifest.manifest_path(),
+                mkdocs_translate.manifest.depends_path(),
+                mkdocs_translate.schedule.durations_path(),
+                session.anchor_file
+            ]
+        for path in paths:
+            if not path:
+                continue
+            name = os.path.relpath(path, root.build_folder).replace(os.sep, '/')
+            files['build/' + name] = (session, path)
+    return files
+
+
+def export_cache(bundle: str) -> int:
+    """
+    Export cache entries and build folder state as a compressed bundle (tar.gz).
+
+    Bundle records pandoc version, tool version, and the configuration hash used for the build folder state of each
+    project, so incompatible content is rejected on import.
+
+    :param bundle: bundle file to write
+    :return: number of files exported
+    """
+    state = _state_files()
+    metadata = {
+        'format': BUNDLE_FORMAT,
+        'version': __version__,
+        'pandoc': mkdocs_translate.translate.pandoc_version(),
+        'files': {}
+    }
+    for (name, (session, path)) in state.items():
+        if os.path.exists(path):
+            with session.activate():
+                metadata['files'][name] = {'config': mkdocs_translate.manifest.config_hash()}
+
+    directory = os.path.dirname(os.path.abspath(bundle))
+    os.makedirs(directory, exist_ok=True)
+    (handle, tmp_path) = tempfile.mkstemp(dir=directory, prefix='.tmp', suffix='.tar.gz')
+    os.close(handle)
+    count = 0
+    try:
+        with cache_lock(exclusive=False), tarfile.open(tmp_path, 'w:gz') as tar:
+            data = json.dumps(metadata, indent=1, sort_keys=True).encode('utf-8')
+            info = tarfile.TarInfo(BUNDLE_METADATA)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+            for name in sorted(metadata['files']):
+                tar.add(state[name][1], arcname=name)
+                count += 1
+
+            for (path, size, used) in sorted(_cache_entries()):
+                key = os.path.basename(path)
+                if not CACHE_KEY.match(key):
+                    continue
+                try:
+                    tar.add(path, arcname=f"cache/{key[0:2]}/{key}")
+                except FileNotFoundError:
+                    continue  # pruned by another process
+                count += 1
+        os.replace(tmp_path, bundle)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+    logger.info(f"cache exported {count} files to {bundle}")
+    return count
+
+
+def import_cache(bundle: str) -> tuple[int, int]:
+    """
+    Import cache entries and build folder state from a bundle created by export_cache.
+
+    Cache entries are rejected if created with a different pandoc version, build folder state is rejected if created
+    with a different tool version or configuration. Existing files are kept, so a bundle only fills in what is missing.
+
+    :param bundle: bundle file to read
+    :return: number of files imported, number of files rejected
+    """
+    state = _state_files()
+    imported = 0
+    rejected = 0
+    with tarfile.open(bundle, 'r:gz') as tar:
+        member = tar.next()
+        if member is None or member.name != BUNDLE_METADATA:
+            raise ValueError(f"{bundle} is not a cache bundle")
+        metadata = json.load(tar.extractfile(member))
+        if metadata.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"{bundle} cache bundle format {metadata.get('format')} not supported")
+
+        pandoc_version = mkdocs_translate.translate.pandoc_version()
+        pandoc_compatible = metadata.get('pandoc') == pandoc_version
+        if not pandoc_compatible:
+            logger.warning(f"{bundle} created with pandoc {metadata.get('pandoc')}, cache entries rejected")
+        version_compatible = metadata.get('version') == __version__
+        if not version_compatible:
+            logger.warning(f"{bundle} created with version {metadata.get('version')}, build state rejected")
+
+        with cache_lock(exclusive=False):
+            for member in tar:
+                if member.name == BUNDLE_METADATA:
+                    continue
+                if not member.isfile():
+                    rejected += 1
+                    continue
+
+                if member.name.startswith('cache/'):
+                    key = member.name.rsplit('/', 1)[-1]
+                    if not CACHE_KEY.match(key) or member.name != f"cache/{key[0:2]}/{key}":
+                        logger.debug(f"cache bundle member {member.name} not recognised")
+                        rejected += 1
+                        continue
+                    if not pandoc_compatible:
+                        rejected += 1
+                        continue
+                    path = _cache_path(key)
+                elif member.name in state:
+                    (session, path) = state[member.name]
+                    with session.activate():
+                        config = mkdocs_translate.manifest.config_hash()
+                    recorded = metadata.get('files', {}).get(member.name, {})
+                    if not version_compatible or recorded.get('config') != config:
+                        logger.debug(f"cache bundle member {member.name} rejected, configuration changed")
+                        rejected += 1
+                        continue
+                else:
+                    logger.debug(f"cache bundle member {member.name} not recognised")
+                    rejected += 1
+                    continue
+
+                if os.path.exists(path):
+                    continue
+                _write_file(path, tar.extractfile(member).read())
+                imported += 1
+
+    logger.info(f"cache imported {imported} files from {bundle} ({rejected} rejected)")
+    return (imported, rejected)
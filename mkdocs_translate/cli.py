@@ -4,32 +4,69 @@ and deepl for language translation services.
 """
 # message/cli.py
 
+import errno
 import logging
+import filecmp
 import os
 import shutil
+import time
+from typing import Iterator
 from typing import List
 from typing import Optional
 
 import typer
 from typing_extensions import Annotated
 
+import mkdocs_translate.daemon
 import mkdocs_translate.translate
 from mkdocs_translate import __app_name__, __version__
+from .manifest import append_journal
+from .manifest import is_current
+from .manifest import load_depends
+from .manifest import load_journal
+from .manifest import load_manifest
+from .manifest import manifest_entry
+from .manifest import manifest_key
+from .manifest import reset_journal
+from .manifest import save_depends
+from .manifest import save_manifest
+from .session import Session
+from .session import current_session
 from .translate import collect_path
 from .translate import collect_paths
 from .translate import convert_html
 from .translate import convert_markdown
-from .translate import convert_rst
+from .translate import convert_rst_batch
 from .translate import deepl_document
 from .translate import init_anchors
 from .translate import init_config
+from .translate import scan_depends_rst
 from .translate import scan_download_rst
 from .translate import scan_index_rst
 from .translate import scan_toctree
+from .translate import write_text
+from .backend import PANDOC_MEMORY
+from .backend import PANDOC_RETRIES
+from .backend import PANDOC_TIMEOUT
+from .backend import configure_backend
+from .cache import cache_stats
+from .cache import export_cache
+from .cache import import_cache
+from .cache import prune_cache
+from .schedule import estimate_durations
+from .schedule import load_durations
+from .schedule import longest_first
+from .schedule import makespan
+from .schedule import record_duration
+from .schedule import save_durations
+from .substitution import substitution_report
+from .watch import watch_rst
 
 import yaml
 
 app = typer.Typer(help="Translation for mkdocs content")
+cache_app = typer.Typer(help="Manage cache of pandoc conversion results")
+app.add_typer(cache_app, name="cache")
 
 logger = logging.getLogger(__app_name__)
 
@@ -62,6 +99,14 @@ def _config_callback(config_path: str) -> None:
     init_config(config_path)
 
 
+def _keep_temp_callback(keep_temp: bool) -> None:
+    current_session().keep_temp = keep_temp
+
+
+def _daemon_callback(daemon: bool) -> None:
+    mkdocs_translate.daemon.use_daemon = daemon
+
+
 @app.command()
 def french(
         md_file: Annotated[str, typer.Argument(help="Markdown file path")]
@@ -80,7 +125,8 @@ def french(
 
     md_fr = os.path.normpath(os.path.join(folder, os.path.basename(translated)))
 
-    shutil.copy2(translated, md_fr)
+    with open(translated, 'r') as file:
+        write_text(md_fr, file.read())
 
     print(md_fr, "\n")
 
@@ -89,7 +135,7 @@ def scan(
         scan: Optional[str] = typer.Option(
             "all",
             "--scan",
-            help="RST scan to perform (all, index, download).",
+            help="RST scan to perform (all, index, download, depends).",
         ),
         test_rst_file: Annotated[str, typer.Argument(
             help="Test scan a single file, sending output to standard output",
@@ -100,25 +146,66 @@ def scan(
     """
     check_folders()
 
-    rst_folder = mkdocs_translate.translate.rst_folder
-
     if test_rst_file:
-        if scan.lower() in ("all","index"):
-            print(f"\nTest scan anchor and header index: { test_rst_file }\n")
-            index_test = scan_index_rst(rst_folder, test_rst_file)
-            print("------------------------------")
-            if index_test:
-                print(index_test, end="")
-            print("------------------------------")
-        if scan.lower() in ("all","download"):
-            print(f"\nTest scan :download: directive: ${ test_rst_file }")
-            print("------------------------------")
-            download_references: set[str] = scan_download_rst(rst_folder, test_rst_file)
-            if download_references:
-                print('\n'.join(download_references))
-            print("------------------------------")
+        client = mkdocs_translate.daemon.connect_daemon()
+        if client:
+            with client:
+                results = client.call('scan-file', {'rst_file': test_rst_file, 'scan': scan})
+        else:
+            with current_session().project_session(test_rst_file).activate():
+                results = scan_file(scan, test_rst_file)
+        scan_test(test_rst_file, results)
         return
 
+    for project in current_session().project_sessions():
+        with project.activate():
+            scan_project(scan)
+
+
+def scan_file(scan: str, rst_file: str) -> dict:
+    """
+    Scan a single rst file, without updating index, download or depends output.
+
+    :param scan: scan to perform (all, index, download, depends)
+    :param rst_file: rst file to scan
+    :return: scan results (index text, download references, dependencies) for each scan performed
+    """
+    rst_folder = current_session().rst_folder
+
+    results = {}
+    if scan.lower() in ("all","index"):
+        results['index'] = scan_index_rst(rst_folder, rst_file)
+    if scan.lower() in ("all","download"):
+        results['download'] = sorted(scan_download_rst(rst_folder, rst_file))
+    if scan.lower() in ("all","depends"):
+        results['depends'] = scan_depends_rst(rst_folder, rst_file)
+    return results
+
+
+def scan_test(test_rst_file: str, results: dict):
+    if 'index' in results:
+        print(f"\nTest scan anchor and header index: { test_rst_file }\n")
+        index_test = results['index']
+        print("------------------------------")
+        if index_test:
+            print(index_test, end="")
+        print("------------------------------")
+    if 'download' in results:
+        print(f"\nTest scan :download: directive: ${ test_rst_file }")
+        print("------------------------------")
+        download_references: list[str] = results['download']
+        if download_references:
+            print('\n'.join(download_references))
+        print("------------------------------")
+    if 'depends' in results:
+        print(f"\nTest scan dependencies: { test_rst_file }")
+        print("------------------------------")
+        print(yaml.dump(results['depends']), end="")
+        print("------------------------------")
+
+
+def scan_project(scan: str):
+    rst_folder = current_session().rst_folder
     rst_glob = rst_folder + "/**/*.rst"
 
     collected = collect_path(rst_glob, 'rst', True)
@@ -128,11 +215,14 @@ def scan(
         scan_index(collected)
     if scan.lower() in ("all","download"):
         scan_download(collected)
+    if scan.lower() in ("all","depends"):
+        scan_depends(collected)
 
 def scan_index( collected: list[str]):
     # configuration settings
-    rst_folder = mkdocs_translate.translate.rst_folder
-    anchor_path = mkdocs_translate.translate.anchor_file
+    session = current_session()
+    rst_folder = session.rst_folder
+    anchor_path = session.anchor_file
 
     index = ''
     for file in collected:
@@ -143,14 +233,14 @@ def scan_index( collected: list[str]):
     if not os.path.exists(anchor_dir):
         print("anchors.txt index directory:", anchor_dir)
         os.makedirs(anchor_dir)
-    with open(anchor_path, 'w') as anchor_file:
-        anchor_file.write(index)
+    write_text(anchor_path, index)
     logger.info("index: "+anchor_path)
 
 def scan_download( collected: list[str] ):
     # configuration settings
-    docs_folder = mkdocs_translate.translate.docs_folder
-    rst_folder = mkdocs_translate.translate.rst_folder
+    session = current_session()
+    docs_folder = session.docs_folder
+    rst_folder = session.rst_folder
 
     downloads: dict[str : set[str]] = dict()
     for file in collected:
@@ -161,7 +251,7 @@ def scan_download( collected: list[str] ):
                 download_folder = download_folder.replace(rst_folder, docs_folder, 1)
 
             if download_folder in downloads:
-                downloads[download_folder].extend(download_references)
+                downloads[download_folder].update(download_references)
             else:
                 downloads[download_folder] = download_references
 
@@ -171,26 +261,35 @@ def scan_download( collected: list[str] ):
             logging.info("download folder:" + download_folder)
             os.makedirs(download_folder)
 
+        # sorted so unchanged downloads produce identical download.txt
         download_txt_file = os.path.join(download_folder,"download.txt")
-        with open(download_txt_file, 'w') as download_file:
-            logging.info("download.txt: "+ download_txt_file)
-            text = "\n".join(download_references)
-            download_file.write(text)
+        logging.info("download.txt: "+ download_txt_file)
+        write_text(download_txt_file, "\n".join(sorted(download_references)))
         download_gitiginore = os.path.join(download_folder,".gitignore")
-        with open(download_gitiginore, 'w') as gitignore:
-            text = "*\n!download.txt"
-            gitignore.write(text)
+        write_text(download_gitiginore, "*\n!download.txt")
+
+def scan_depends( collected: list[str] ):
+    # configuration settings
+    rst_folder = current_session().rst_folder
+
+    graph: dict[str, dict] = dict()
+    for file in collected:
+        logger.debug("depends: " + file)
+        graph[manifest_key(file)] = scan_depends_rst(rst_folder, file)
+
+    save_depends(graph)
 
 @app.command()
 def init(
         rst_path: Annotated[
-            List[str], typer.Argument(help="path to rst source folder")] = mkdocs_translate.translate.rst_folder
+            List[str], typer.Argument(help="path to rst source folder")] = None
 ):
     """
     Init docs directory, copying images and files from rst source folder (excluding rst files for migration).
     """
-    rst_folder = mkdocs_translate.translate.rst_folder
-    docs_folder = mkdocs_translate.translate.docs_folder
+    session = current_session()
+    rst_folder = session.rst_folder
+    docs_folder = session.docs_folder
     if not os.path.exists(rst_folder):
         raise FileNotFoundError(errno.ENOENT, f"The rst folder does not exist at location:", rst_folder)
 
@@ -208,7 +307,7 @@ def init(
             else:
                 raise FileNotFoundError(errno.ENOENT, f"RST folder does not exist at location:", path)
     else:
-        glob.append(mkdocs_translate.translate.rst_folder + "/**/*")
+        glob.append(rst_folder + "/**/*")
 
     # create docs if required
     if not os.path.exists(docs_folder):
@@ -224,7 +323,8 @@ def init(
         if not os.path.exists(os.path.dirname(copy)):
             os.makedirs(os.path.dirname(copy), exist_ok=True)
 
-        if os.path.isfile(file):
+        # unchanged files are not copied, preserving modification time
+        if os.path.isfile(file) and not (os.path.isfile(copy) and filecmp.cmp(file, copy, shallow=False)):
             shutil.copy2(file, copy)
         print(copy)
 
@@ -238,39 +338,84 @@ def nav(
     Scan rst files collecting toctree structure into a working mkdocs nav tree.
     """
     check_folders()
-    init_anchors()
 
     if rst_file:
         rst_index = rst_file
     else:
-        rst_index = mkdocs_translate.translate.rst_folder
+        rst_index = current_session().rst_folder
 
     if os.path.exists(rst_index) and os.path.isdir(rst_index):
-        rst_index = os.path.join(mkdocs_translate.translate.rst_folder,'index.rst')
+        rst_index = os.path.join(current_session().rst_folder,'index.rst')
 
     if not os.path.exists(rst_index):
         raise FileNotFoundError(errno.ENOENT, f"RST file to scan for toctree not found at location:", rst_index)
 
-    nav: object = scan_toctree(rst_index)
+    client = mkdocs_translate.daemon.connect_daemon()
+    if client:
+        with client:
+            nav: object = client.call('nav', {'rst_file': rst_index})
+    else:
+        init_anchors()
+        nav: object = scan_toctree(rst_index)
     print(yaml.dump(nav))
 
 
 def check_folders():
     """
-    Check docs and rst folder exist before doing anything else.
+    Check docs and rst folder (of each project) exist before doing anything else.
     """
-    rst_folder = mkdocs_translate.translate.rst_folder
-    docs_folder = mkdocs_translate.translate.docs_folder
-    if not os.path.exists(docs_folder):
-        raise FileNotFoundError(errno.ENOENT, f"The docs folder does not exist at location:", docs_folder)
+    for project in current_session().project_sessions():
+        if not os.path.exists(project.docs_folder):
+            raise FileNotFoundError(errno.ENOENT, f"The docs folder does not exist at location:", project.docs_folder)
 
-    if not os.path.exists(rst_folder):
-        raise FileNotFoundError(errno.ENOENT, f"The rst folder does not exist at location:", rst_folder)
+        if not os.path.exists(project.rst_folder):
+            raise FileNotFoundError(errno.ENOENT, f"The rst folder does not exist at location:", project.rst_folder)
 
 @app.command()
 def migrate(
         rst_path: Annotated[
-            List[str], typer.Argument(help="path to rst file(s)")] = mkdocs_translate.translate.rst_folder,
+            List[str], typer.Argument(help="path to rst file(s)")] = None,
+        jobs: Optional[int] = typer.Option(
+            os.cpu_count(),
+            "--jobs",
+            "-j",
+            help="Number of files to convert in parallel (defaults to cpu count).",
+        ),
+        force: bool = typer.Option(
+            False,
+            "--force",
+            help="Convert all files, even if unchanged since last migrate.",
+        ),
+        changed: bool = typer.Option(
+            False,
+            "--changed",
+            help="Also convert files whose references, titles or includes changed (requires scan dependency graph).",
+        ),
+        ast: Optional[bool] = typer.Option(
+            None,
+            "--ast/--no-ast",
+            help="Write markdown from pandoc JSON AST, rather than postprocessing pandoc markdown (default from pandoc_ast config).",
+        ),
+        fast_path: Optional[bool] = typer.Option(
+            None,
+            "--fast-path/--no-fast-path",
+            help="Convert simple rst files without pandoc (default from fast_path config).",
+        ),
+        verify: bool = typer.Option(
+            False,
+            "--verify",
+            help="Convert using both fast path and pandoc, reporting any differences (pandoc output is kept).",
+        ),
+        resume: bool = typer.Option(
+            False,
+            "--resume",
+            help="Skip files already converted by an interrupted migrate (recorded in build folder journal).",
+        ),
+        stats: bool = typer.Option(
+            False,
+            "--stats",
+            help="Show predicted and actual time to convert files in parallel (slowest files are converted first).",
+        )
 ):
     """
     Convert rst files to markdown using pandoc.
@@ -279,15 +424,301 @@ def migrate(
     gui-label, menuselection, file, command
     """
     check_folders()
-    init_anchors()
 
-    if not rst_path:
-        rst_glob = mkdocs_translate.translate.rst_folder + "/**/*.rst"
-        rst_path = [rst_glob]
+    settings = {}
+    if ast is not None:
+        settings['pandoc_ast'] = ast
+    if fast_path is not None:
+        settings['fast_path'] = fast_path
+    if verify:
+        settings['fast_path'] = 'verify'
+        force = True
+
+    failed = 0
+
+    def report(rst_file: str, md_file: str, error: str) -> None:
+        nonlocal failed
+        if error:
+            logger.error(rst_file + ": " + error)
+            failed += 1
+        else:
+            print(md_file)
+
+    client = mkdocs_translate.daemon.connect_daemon()
+    if client:
+        with client:
+            client.call('convert',
+                        {'paths': rst_path, 'jobs': jobs, 'force': force, 'changed': changed, 'resume': resume,
+                         'stats': stats, 'settings': settings},
+                        notify=lambda method, params: report(params['rst_file'], params['md_file'], params['error']))
+    else:
+        init_anchors()
+        session = current_session()
+        for project in [session] + list(session.projects.values()):
+            project.config.update(settings)
+        for (rst_file, md_file, error) in migrate_files(rst_path, jobs, force, changed, resume, stats):
+            report(rst_file, md_file, error)
+
+    if failed:
+        logger.error("migrate: " + str(failed) + " file(s) failed to convert")
+        raise typer.Exit(code=1)
 
+
+def migrate_files(rst_path: list[str], jobs: int, force: bool, changed: bool,
+                  resume: bool = False, stats: bool = False) -> Iterator[tuple[str, str, str]]:
+    """
+    Convert rst files (of each project) to markdown, skipping files unchanged since last migrate.
+
+    The manifest of each project is updated as files are converted, and each file completed is appended to the
+    journal so an interrupted migrate can be resumed. When converting in parallel, files expected to take longest
+    (using durations history) are converted first, with results reported in file order.
+
+    :param rst_path: rst files, folders or glob patterns (defaults to rst folder of each project)
+    :param jobs: number of files to convert in parallel
+    :param force: convert all files, even if unchanged since last migrate
+    :param changed: also convert files whose references, titles or includes changed
+    :param resume: skip files already converted by an interrupted migrate, recorded in journal
+    :param stats: log predicted and actual time to convert files
+    :return: iterator of rst_file, md_file (or None if failed), error message (or None if successful)
+    """
+    session = current_session()
+    if not rst_path:
+        rst_path = [project.rst_folder + "/**/*.rst" for project in session.project_sessions()]
+
+    # manifest (for each project) used to skip files unchanged since last migrate
+    manifests: dict[Session, dict[str, dict]] = {}
+    loaded_manifests: dict[Session, dict[str, dict]] = {}
+    graphs: dict[Session, dict] = {}
+    journals: dict[Session, dict[str, dict]] = {}
+    for project in session.project_sessions():
+        with project.activate():
+            manifests[project] = load_manifest()
+            loaded_manifests[project] = dict(manifests[project])
+            graphs[project] = load_depends()
+            if resume:
+                journals[project] = load_journal()
+            else:
+                journals[project] = {}
+                reset_journal()
+            if changed and graphs[project] is None:
+                logger.warning("migrate: dependency graph not available, run scan to check references, titles and includes")
+
+    start = time.perf_counter()
+    entries: dict[str, dict] = {}
+    pending: list[str] = []
+    skipped = 0
+    resumed = 0
     for rst_file in collect_paths(rst_path, 'rst', True):
-        md_file = convert_rst(rst_file)
-        print(md_file)
+        project = session.project_session(rst_file)
+        with project.activate():
+            manifest = manifests.setdefault(project, {})
+            graph = graphs.get(project)
+            entry = manifest_entry(rst_file, graph=graph)
+            journal = journals.get(project, {})
+            recorded = journal.get(manifest_key(rst_file))
+            if recorded and recorded.get('status') == 'converted' and \
+                    is_current(journal, rst_file, entry, depends=changed and graph is not None):
+                logger.debug("resumed: " + rst_file)
+                manifest[manifest_key(rst_file)] = {key: recorded[key] for key in entry.keys() if key in recorded}
+                resumed += 1
+                continue
+            if not force and is_current(manifest, rst_file, entry, depends=changed and graph is not None):
+                logger.debug("unchanged: " + rst_file)
+                skipped += 1
+                continue
+        entries[rst_file] = entry
+        pending.append(rst_file)
+
+    if skipped:
+        logger.info("migrate: " + str(skipped) + " unchanged file(s) skipped, use --force to convert")
+
+    if resumed:
+        logger.info("migrate: " + str(resumed) + " file(s) already converted by interrupted migrate")
+
+    # estimated durations (for each project), so slowest files are started first
+    durations: dict[Session, dict[str, list[float]]] = {}
+    loaded_durations: dict[Session, dict[str, list[float]]] = {}
+    estimates: dict[str, float] = {}
+    for rst_file in pending:
+        durations.setdefault(session.project_session(rst_file), {})
+    for project in durations:
+        with project.activate():
+            durations[project] = load_durations()
+            loaded_durations[project] = {key: list(history) for (key, history) in durations[project].items()}
+            project_files = [rst_file for rst_file in pending if session.project_session(rst_file) is project]
+            estimates.update(estimate_durations(project_files, durations[project]))
+
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    workers = min(jobs, len(pending))
+    in_order = makespan([estimates[rst_file] for rst_file in pending], workers)
+    submit = longest_first(pending, estimates) if workers > 1 else pending
+
+    # files from all projects are converted using one worker pool
+    timings: dict[str, float] = {}
+    unknown: dict[str, list[str]] = {}
+    records: list[dict] = []
+    completed: dict[str, tuple[str, str, str]] = {}
+    next_file = 0
+    batch_start = time.perf_counter()
+    try:
+        for (rst_file, md_file, error) in convert_rst_batch(submit, jobs, timings, unknown):
+            project = session.project_session(rst_file)
+            with project.activate():
+                manifest = manifests[project]
+                if error:
+                    manifest.pop(manifest_key(rst_file), None)
+                else:
+                    entries[rst_file]['md'] = md_file
+                    manifest[manifest_key(rst_file)] = entries[rst_file]
+                records.append(append_journal(rst_file, entries[rst_file], error, timings.get(rst_file)))
+                record_duration(durations[project], rst_file, timings[rst_file])
+
+            # results reported in file order, as files are submitted longest first
+            completed[rst_file] = (rst_file, md_file, error)
+            while next_file < len(pending) and pending[next_file] in completed:
+                yield completed.pop(pending[next_file])
+                next_file += 1
+    finally:
+        actual = time.perf_counter() - batch_start
+        # only entries changed are saved, keeping entries saved by other processes sharing the build folder
+        for (project, manifest) in manifests.items():
+            with project.activate():
+                save_manifest(manifest, loaded_manifests.get(project, {}))
+        for (project, history) in durations.items():
+            with project.activate():
+                save_durations(history, loaded_durations[project])
+        prune_cache()
+        migrate_summary(records, skipped + resumed, time.perf_counter() - start)
+        substitution_report(unknown)
+        if stats and pending:
+            predicted = makespan([estimates[rst_file] for rst_file in pending], workers)
+            logger.info(f"migrate: {len(pending)} file(s) on {workers} worker(s), "
+                        f"estimated {sum(estimates.values()):.1f}s and actual {sum(timings.values()):.1f}s of conversion")
+            logger.info(f"migrate: predicted makespan {predicted:.1f}s (in file order {in_order:.1f}s), "
+                        f"actual {actual:.1f}s")
+
+
+def migrate_summary(records: list[dict], skipped: int, elapsed: float) -> None:
+    """
+    Log summary of files converted, skipped or failed, and the slowest conversions.
+
+    :param records: journal entries of files converted (or failed)
+    :param skipped: number of files skipped
+    :param elapsed: migrate duration in seconds
+    """
+    converted = sum(1 for record in records if record['status'] == 'converted')
+    failed = len(records) - converted
+    logger.info(f"migrate: {converted} converted, {skipped} skipped, {failed} failed in {elapsed:.1f}s")
+
+    timed = sorted((record for record in records if record.get('seconds') is not None),
+                   key=lambda record: record['seconds'], reverse=True)
+    for record in timed:
+        logger.debug(f"migrate: {record['seconds']:.3f}s {record['file']} ({record['status']})")
+    if len(timed) > 1:
+        slowest = ', '.join(f"{record['file']} {record['seconds']:.1f}s" for record in timed[:5])
+        logger.info("migrate: slowest " + slowest)
+
+
+@app.command()
+def watch(
+        interval: Optional[float] = typer.Option(
+            0.5,
+            "--interval",
+            help="Polling interval in seconds, used when inotify is not available.",
+        )
+):
+    """
+    Watch rst files, migrating changed files and any pages that depend on them.
+
+    Anchors and dependencies are kept up to date in memory as headings and references change.
+    """
+    check_folders()
+    try:
+        watch_rst(interval)
+    except KeyboardInterrupt:
+        logger.info("watch stopped")
+
+
+@app.command()
+def daemon(
+        stop: bool = typer.Option(
+            False,
+            "--stop",
+            help="Stop running daemon.",
+        )
+):
+    """
+    Run conversion daemon, keeping configuration, anchors and pandoc backend ready between calls.
+
+    While the daemon is running: migrate, scan of a single file, nav and internal-html use the daemon.
+    """
+    if stop:
+        client = mkdocs_translate.daemon.connect_daemon()
+        if not client:
+            logger.warning("daemon not running")
+            return
+        with client:
+            client.call('shutdown')
+        return
+
+    check_folders()
+    try:
+        mkdocs_translate.daemon.serve_daemon()
+    except KeyboardInterrupt:
+        pass
+
+
+@cache_app.command("stats")
+def cache_stats_command():
+    """
+    Summary of pandoc conversion cache.
+    """
+    stats = cache_stats()
+    print(f"folder:  {stats['folder']}")
+    print(f"entries: {stats['entries']}")
+    print(f"size:    {stats['size'] / (1024 * 1024):.1f} MB")
+    print(f"limit:   {stats['limit'] / (1024 * 1024):.1f} MB")
+
+
+@cache_app.command("prune")
+def cache_prune_command(
+        size: Optional[int] = typer.Option(
+            None,
+            "--size",
+            help="Size limit in MB, defaults to cache_size configuration (use 0 to clear cache).",
+        )
+):
+    """
+    Prune pandoc conversion cache, removing least recently used entries.
+    """
+    limit = None if size is None else size * 1024 * 1024
+    (removed, removed_size) = prune_cache(limit)
+    print(f"removed: {removed} entries ({removed_size / (1024 * 1024):.1f} MB)")
+
+
+@cache_app.command("export")
+def cache_export_command(
+        bundle: Annotated[str, typer.Argument(help="Bundle file to write (tar.gz)")]
+):
+    """
+    Export pandoc conversion cache, manifests and scan results as a compressed bundle.
+    """
+    count = export_cache(bundle)
+    print(f"exported: {count} files to {bundle}")
+
+
+@cache_app.command("import")
+def cache_import_command(
+        bundle: Annotated[str, typer.Argument(help="Bundle file to read (tar.gz)")]
+):
+    """
+    Import pandoc conversion cache, manifests and scan results from a bundle, rejecting incompatible content.
+    """
+    if not os.path.exists(bundle):
+        raise FileNotFoundError(errno.ENOENT, "Cache bundle does not exist at location:", bundle)
+    (imported, rejected) = import_cache(bundle)
+    print(f"imported: {imported} files ({rejected} rejected)")
 
 
 @app.command()
@@ -298,7 +729,12 @@ def internal_html(
     Convert markdown file to html using pandoc (some additional simplifications applied).
     This step is used prior to translation.
     """
-    file = convert_markdown(md_file)
+    client = mkdocs_translate.daemon.connect_daemon()
+    if client:
+        with client:
+            file = client.call('internal_html', {'md_file': md_file})
+    else:
+        file = convert_markdown(md_file)
     print(file, "\n")
 
 
@@ -352,10 +788,38 @@ def main(
             help="Provide to config file to override built-in configuration.",
             callback=_config_callback,
             is_eager=True,
+        ),
+        keep_temp: Optional[bool] = typer.Option(
+            False,
+            "--keep-temp",
+            help="Write intermediate files to build folder for troubleshooting.",
+            callback=_keep_temp_callback,
+            is_eager=True,
+        ),
+        backend: Optional[str] = typer.Option(
+            None,
+            "--backend",
+            help="Pandoc backend (subprocess, server), defaults to pandoc_backend configuration.",
+        ),
+        daemon: Optional[bool] = typer.Option(
+            True,
+            "--daemon/--no-daemon",
+            help="Use running daemon when available (not used with --keep-temp or --backend).",
+            callback=_daemon_callback,
         )
 ) -> None:
     """
     Services written around pandoc for format translation,
     and deepl for language translation services.
     """
+    settings = current_session().config
+    if keep_temp or backend:
+        # daemon was started with its own keep-temp and backend settings
+        mkdocs_translate.daemon.use_daemon = False
+    if not backend:
+        backend = settings.get('pandoc_backend', 'subprocess')
+    configure_backend(backend,
+                      timeout=float(settings.get('pandoc_timeout', PANDOC_TIMEOUT)),
+                      memory=int(settings.get('pandoc_memory', PANDOC_MEMORY)),
+                      retries=int(settings.get('pandoc_retries', PANDOC_RETRIES)))
     return
@@ -0,0 +1,464 @@
+"""
+Conversion daemon, keeping configuration, anchors and pandoc backend warm between command line calls.
+
+The daemon accepts JSON-RPC 2.0 requests on a Unix domain socket, one json message per line. While a request is
+handled, log messages and conversion results are sent to the client as notifications ahead of the response::
+
+    --> {"jsonrpc": "2.0", "id": 1, "method": "internal_html", "params": {"md_file": "docs/index.md"}}
+    <-- {"jsonrpc": "2.0", "method": "log", "params": {"level": "INFO", "message": "..."}}
+    <-- {"jsonrpc": "2.0", "id": 1, "result": "target/translate/index.html"}
+
+The command line uses a running daemon, started for the same project folder and config, when available. The socket
+is only accessible to the user running the daemon.
+"""
+# message/daemon.py
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from typing import Callable
+from typing import Iterator
+
+import mkdocs_translate.cli
+import mkdocs_translate.session
+from mkdocs_translate import __app_name__, __version__
+from .backend import pandoc_backend
+from .translate import convert_markdown
+from .translate import scan_toctree
+
+logger = logging.getLogger(__app_name__)
+
+DAEMON_SOCKET = 'daemon.sock'
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# command line uses a running daemon when available, disabled for options the daemon was not started with
+use_daemon: bool = True
+
+
+class DaemonError(RuntimeError):
+    """
+    Request failed in daemon.
+
+    Attributes:
+        code: JSON-RPC error code
+    """
+    code: int
+
+    def __init__(self, message: str, code: int = SERVER_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+def socket_path() -> str:
+    """
+    Daemon socket location, daemon_socket configuration relative to build folder.
+    """
+    session = mkdocs_translate.session.current_session()
+    return os.path.normpath(os.path.join(session.build_folder, session.config.get('daemon_socket', DAEMON_SOCKET)))
+
+
+class _Connection:
+    """
+    Client connection, sending json messages one per line.
+    """
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+
+    def send(self, message: dict) -> None:
+        data = (json.dumps(message) + '\n').encode('utf-8')
+        with self.lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    def notify(self, method: str, params: dict) -> None:
+        self.send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+
+# client connection for request handled by current thread (and chunk conversion threads)
+_connection: contextvars.ContextVar = contextvars.ContextVar('connection', default=None)
+
+
+class _NotifyHandler(logging.Handler):
+    """
+    Send log messages to client of the request being handled.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        connection = _connection.get()
+        if connection is None:
+            return
+        try:
+            connection.notify('log', {'level': record.levelname, 'message': record.getMessage()})
+        except OSError:
+            pass
+
+
+@contextlib.contextmanager
+def _notify_logging() -> Iterator[None]:
+    """
+    Send log messages to client of the request being handled, including messages logged outside the app logger.
+    """
+    handler = _NotifyHandler()
+    loggers = [logging.getLogger()]
+    if not logger.propagate:
+        loggers.append(logger)
+    for log in loggers:
+        log.addHandler(handler)
+    try:
+        yield
+    finally:
+        for log in loggers:
+            log.removeHandler(handler)
+
+
+class Daemon:
+    """
+    Warm conversion state, handling requests from command line clients.
+
+    Attributes:
+        session: session (configured by command line) used for requests
+        methods: request handlers by method name
+        lock: serializes conversions, which update manifest and configuration
+        anchors_modified: anchor_file modification time of each project, to reload anchors after scan
+        server: socket server, used to shut down
+    """
+    session: mkdocs_translate.session.Session
+    methods: dict[str, Callable]
+    lock: threading.Lock
+    anchors_modified: dict[str, int]
+    server: socketserver.BaseServer
+
+    def __init__(self, session: mkdocs_translate.session.Session):
+        self.session = session
+        self.lock = threading.Lock()
+        self.anchors_modified = {}
+        self.server = None
+        self.methods = {
+            'ping': self.ping,
+            'convert': self.convert,
+            'scan-file': self.scan_file,
+            'nav': self.nav,
+            'internal_html': self.internal_html,
+            'shutdown': self.shutdown,
+        }
+
+    def refresh_anchors(self) -> None:
+        """
+        Load anchors index of each project, when anchor_file has been updated (by scan) since last loaded.
+        """
+        for project in self.session.project_sessions():
+            modified = os.stat(project.anchor_file).st_mtime_ns if os.path.exists(project.anchor_file) else None
+            if project.anchor_file not in self.anchors_modified or self.anchors_modified[project.anchor_file] != modified:
+                project.init_anchors()
+                self.anchors_modified[project.anchor_file] = modified
+
+    def dispatch(self, line: bytes) -> dict:
+        """
+        Handle JSON-RPC request.
+
+        :param line: json request
+        :return: json response
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return _error(None, PARSE_ERROR, f"Parse error: {error}")
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return _error(None, INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get('id')
+        method = self.methods.get(request['method'])
+        if method is None:
+            return _error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            return _error(request_id, INVALID_PARAMS, "Invalid params: expected object")
+
+        try:
+            with self.session.activate():
+                result = method(**params)
+        except Exception as error:
+            logger.debug(request['method'] + ": request failed", exc_info=True)
+            return _error(request_id, SERVER_ERROR, f"{type(error).__name__}: {error}")
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    def ping(self) -> dict:
+        """
+        Daemon status, used by client to check daemon was started for the same project.
+        """
+        return {
+            'version': __version__,
+            'pid': os.getpid(),
+            'cwd': os.getcwd(),
+            'config': _config_key(self.session.config_path),
+        }
+
+    def convert(self, paths: list[str], jobs: int = 1, force: bool = False, changed: bool = False,
+                resume: bool = False, stats: bool = False, settings: dict = None) -> dict:
+        """
+        Migrate rst files, see cli.migrate_files(). Each result is sent as a notification.
+
+        :param settings: configuration used for this conversion (example: pandoc_ast)
+        :return: number of files converted and failed
+        """
+        with self.lock:
+            self.refresh_anchors()
+            projects = [self.session] + list(self.session.projects.values())
+            saved = [(project, dict(project.config)) for project in projects]
+            try:
+                for project in projects:
+                    project.config.update(settings or {})
+
+                converted = 0
+                failed = 0
+                connection = _connection.get()
+                results = mkdocs_translate.cli.migrate_files(paths, jobs, force, changed, resume, stats)
+                for (rst_file, md_file, error) in results:
+                    if error:
+                        failed += 1
+                    else:
+                        converted += 1
+                    if connection is not None:
+                        connection.notify('result', {'rst_file': rst_file, 'md_file': md_file, 'error': error})
+                return {'converted': converted, 'failed': failed}
+            finally:
+                for (project, config) in saved:
+                    project.config.clear()
+                    project.config.update(config)
+
+    def scan_file(self, rst_file: str, scan: str = 'all') -> dict:
+        """
+        Scan single rst file, see cli.scan_file().
+        """
+        with self.session.project_session(rst_file).activate():
+            return mkdocs_translate.cli.scan_file(scan, rst_file)
+
+    def nav(self, rst_file: str) -> object:
+        """
+        Scan rst file for toctree navigation, see translate.scan_toctree().
+        """
+        self.refresh_anchors()
+        with self.session.project_session(rst_file).activate():
+            return scan_toctree(rst_file)
+
+    def internal_html(self, md_file: str) -> str:
+        """
+        Convert markdown file to html for translation, see translate.convert_markdown().
+        """
+        with self.session.project_session(md_file).activate():
+            return convert_markdown(md_file)
+
+    def shutdown(self) -> bool:
+        """
+        Stop daemon, once the response has been sent.
+        """
+        if self.server is not None:
+            threading.Thread(target=self.server.shutdown).start()
+        return True
+
+
+def _error(request_id, code: int, message: str) -> dict:
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def _config_key(config_path: str) -> str:
+    return os.path.abspath(config_path) if config_path else None
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle requests from one client connection, one json request per line.
+    """
+
+    def handle(self) -> None:
+        connection = _Connection(self.wfile)
+        _connection.set(connection)
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.daemon.dispatch(line)
+            try:
+                connection.send(response)
+            except OSError:
+                logger.debug("daemon client disconnected")
+                return
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class DaemonServer(socketserver.ThreadingUnixStreamServer):
+        """
+        Unix domain socket server, handling each client connection in a thread.
+        """
+        daemon_threads = True
+
+        def __init__(self, path: str, daemon: Daemon):
+            self.daemon = daemon
+            daemon.server = self
+            super().__init__(path, _DaemonRequestHandler)
+
+        def server_bind(self) -> None:
+            # socket created accessible only to the user running the daemon
+            umask = os.umask(0o177)
+            try:
+                super().server_bind()
+            finally:
+                os.umask(umask)
+else:
+    DaemonServer = None
+
+
+def serve_daemon(path: str = None) -> None:
+    """
+    Run daemon until stopped, handling requests on Unix domain socket.
+
+    :param path: socket location, defaults to socket_path()
+    """
+    if DaemonServer is None:
+        raise RuntimeError("daemon requires Unix domain socket support")
+    if path is None:
+        path = socket_path()
+    if os.path.exists(path):
+        try:
+            connect(path).close()
+        except OSError:
+            logger.debug("removing stale daemon socket: " + path)
+            os.unlink(path)
+        else:
+            raise RuntimeError("daemon already running on socket: " + path)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    session = mkdocs_translate.session.current_session()
+    daemon = Daemon(session)
+    daemon.refresh_anchors()
+    pandoc_backend()
+
+    server = DaemonServer(path, daemon)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+    try:
+        with _notify_logging():
+            logger.info("daemon listening on " + path)
+            server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        logger.info("daemon stopped")
+
+
+class DaemonClient:
+    """
+    Connection to running daemon.
+
+    Log messages sent by the daemon are logged by the client as they are received.
+    """
+
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.file = connection.makefile('rwb')
+        self.next_id = 0
+
+    def __enter__(self) -> 'DaemonClient':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+        self.connection.close()
+
+    def call(self, method: str, params: dict = None, notify: Callable[[str, dict], None] = None):
+        """
+        Call daemon method, waiting for response.
+
+        :param method: method name
+        :param params: method parameters
+        :param notify: called with each notification (other than log messages) received before the response
+        :return: result
+        :raises DaemonError: if request failed in daemon
+        :raises ConnectionError: if daemon closed connection without a response
+        """
+        self.next_id += 1
+        request = {'jsonrpc': '2.0', 'id': self.next_id, 'method': method, 'params': params or {}}
+        self.file.write((json.dumps(request) + '\n').encode('utf-8'))
+        self.file.flush()
+
+        for line in self.file:
+            message = json.loads(line)
+            if 'id' not in message:
+                if message.get('method') == 'log':
+                    logger.log(logging.getLevelName(message['params']['level']), message['params']['message'])
+                elif notify is not None:
+                    notify(message['method'], message['params'])
+                continue
+            if message['id'] != self.next_id:
+                continue
+            if 'error' in message:
+                raise DaemonError(message['error']['message'], message['error'].get('code', SERVER_ERROR))
+            return message.get('result')
+        raise ConnectionError("daemon closed connection: " + method)
+
+
+def connect(path: str) -> DaemonClient:
+    """
+    Connect to daemon socket.
+
+    :raises OSError: if daemon is not running
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        connection.close()
+        raise
+    return DaemonClient(connection)
+
+
+def connect_daemon() -> DaemonClient:
+    """
+    Connect to running daemon, if started for the same project folder and config.
+
+    :return: daemon client, or None if daemon not available (or disabled using --no-daemon, --keep-temp or --backend)
+    """
+    if not use_daemon or not hasattr(socket, 'AF_UNIX'):
+        return None
+    path = socket_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        client = connect(path)
+    except OSError as error:
+        logger.debug(f"daemon not available: {error}")
+        return None
+
+    try:
+        status = client.call('ping')
+    except (OSError, ValueError, DaemonError) as error:
+        logger.debug(f"daemon not available: {error}")
+        client.close()
+        return None
+
+    session = mkdocs_translate.session.current_session()
+    if (status.get('version') != __version__ or status.get('cwd') != os.getcwd()
+            or status.get('config') != _config_key(session.config_path)):
+        logger.debug("daemon started for another project, not used: " + str(status))
+        client.close()
+        return None
+    logger.debug("using daemon: " + path)
+    return client
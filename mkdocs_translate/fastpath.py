@@ -0,0 +1,566 @@
+"""
+Fast path conversion of simple rst pages to markdown, without running pandoc.
+
+Handles the subset of rst left after preprocess_rst_text for most pages: headings, labels, paragraphs,
+bullet and enumerated lists, code-block and literal blocks, comments, the grid cards html generated for toctree
+directives, and inline strong, emphasis, literal, title-ref and link markup. The markdown produced matches pandoc
+output, and is postprocessed as usual.
+
+Pages using anything else (directives, tables, definition lists, block quotes, substitutions, roles, ...)
+are converted by pandoc.
+"""
+# message/fastpath.py
+
+import difflib
+import logging
+import re
+
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+# constructs requiring pandoc, checked before parsing
+PANDOC_REQUIRED = re.compile(
+    r"^\s*\.\. (?!(code-block|admonition|note|tip|hint|important|attention|caution|danger|error|warning)::)"
+    r"[\w:-]+::"  # directives other than code-block and admonitions
+    r"|^\s*\.\. [\[|]"  # footnotes, citations, substitution definitions
+    r"|^\s*\+[-=]+\+|^\s*=+( +=+)+\s*$"  # grid and simple tables
+    r"|^\s*:[\w -]+:(\s|$)"  # field lists
+    r"|^\s*\|( |$)"  # line blocks
+    r"|^\s*>>>"  # doctest
+    r"|:[\w-]+:`"  # roles
+    r"|\|\w[^|]*\|"  # substitutions
+    r"|\t",
+    flags=re.MULTILINE
+)
+
+ADORNMENT = re.compile(r"^([!-/:-@\[-`{-~])\1+\s*$")
+LABEL = re.compile(r"^\.\. _([a-z0-9][a-z0-9_.-]*):\s*$")
+BULLET = re.compile(r"^([-*+]) +(?=\S)")
+ENUMERATED = re.compile(r"^(\d+|#)\. +(?=\S)")
+CODE_BLOCK = re.compile(r"^\.\. code-block::\s*(\S*)\s*$")
+ADMONITION = re.compile(r"^\.\. (admonition|note|tip|hint|important|attention|caution|danger|error|warning)::(.*)$")
+COMMENT = re.compile(r"^\.\.(\s|$)")
+# html generated by preprocess_rst_text for toctree directives, a paragraph of text for pandoc
+RAW_HTML = re.compile(r'^</?div(?: class="[\w -]+")?(?: markdown)?>$')
+
+# inline markup, start-string and end-string rules simplified from docutils
+INLINE = re.compile(
+    r"(?<![\w\\])(?:"
+    r"``(?P<literal>\S(?:.*?\S)??)``"
+    r"|\*\*\*(?P<strong_emphasis>[^\s*](?:[^*]*?[^\s*])??)\*\*\*"
+    r"|\*\*(?P<strong>[^\s*](?:[^*]*?[^\s*])??)\*\*"
+    r"|\*(?P<emphasis>[^\s*](?:[^*]*?[^\s*])??)\*"
+    r"|`(?P<link>[^`<>]+?)\s*<(?P<url>[^`<>\s]+)>`__?"
+    r"|`<(?P<uri>[^`<>\s]+)>`__?"
+    r"|`(?P<title>[^\s`](?:[^`]*?[^\s`])??)`"
+    r")(?![\w])"
+)
+URL = re.compile(r"(?<![\w<(\[])(https?://[\w\-./:#?=&%~+@,;!]+)")
+URL_CHARS = re.compile(r"^[\w\-./:#?=&%~+@,;!]*$")
+MACRO = re.compile(r"\{\{ \w+ \}\}")
+
+# typographic punctuation, written by pandoc (smart extension) as ascii
+SMART_PUNCTUATION = {
+    '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"',
+    '\u2013': '--', '\u2014': '---', '\u2026': '...'
+}
+SMART = re.compile('[' + ''.join(SMART_PUNCTUATION) + ']')
+
+# runs of spaces, collapsed by pandoc
+SPACES = re.compile(r" {2,}")
+
+# runs of hyphens, escaped by pandoc so they are not read as dashes
+HYPHENS = re.compile(r"-{2,}")
+
+# characters pandoc writes escaped, that are not unescaped by postprocess_rst_markdown_text
+TEXT_UNSUPPORTED = re.compile(r"[\\$~^#|*`<>\"]|\w_\b|\]_|!\[|^\d+\)|^\(\w\)")
+
+
+class FastPathUnsupported(ValueError):
+    """
+    Content requires pandoc for conversion.
+    """
+    pass
+
+
+def fast_path_scan(text: str) -> str:
+    """
+    Quick scan for constructs requiring pandoc.
+
+    :param text: preprocessed rst content
+    :return: first construct requiring pandoc, or None if fast path may be used
+    """
+    match = PANDOC_REQUIRED.search(text)
+    if match:
+        return match.group(0).strip()
+    return None
+
+
+def convert_rst_fast(text: str) -> str:
+    """
+    Convert simple rst content to markdown (as generated by pandoc).
+
+    :param text: preprocessed rst content
+    :return: markdown content
+    :raises FastPathUnsupported: if content requires pandoc
+    """
+    reason = fast_path_scan(text)
+    if reason:
+        raise FastPathUnsupported(reason)
+
+    if text.startswith('\ufeff'):
+        # byte order mark, ignored by pandoc
+        text = text[1:]
+
+    parser = _RstParser()
+    blocks = parser.blocks(text.expandtabs().splitlines())
+    markdown = _write_blocks(blocks)
+    # pandoc writes a newline for empty content
+    return markdown + '\n'
+
+
+def fast_path_diff(md_file: str, expected: str, actual: str) -> str:
+    """
+    Unified diff of pandoc and fast path markdown, used to verify fast path.
+
+    :return: diff, or empty string if identical
+    """
+    return ''.join(difflib.unified_diff(
+        expected.splitlines(keepends=True),
+        actual.splitlines(keepends=True),
+        fromfile=md_file + ' (pandoc)',
+        tofile=md_file + ' (fast path)'
+    ))
+
+
+def _indentation(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def _dedent(lines: list[str], indent: int) -> list[str]:
+    """
+    Remove indent from lines, which must be blank or indented at least as far.
+    """
+    dedented = []
+    for line in lines:
+        if line.strip() and _indentation(line) < indent:
+            raise FastPathUnsupported("inconsistent indentation: " + line.strip())
+        dedented.append(line[indent:] if line.strip() else '')
+    return dedented
+
+
+def _strip_blank(lines: list[str]) -> list[str]:
+    while lines and not lines[0].strip():
+        lines = lines[1:]
+    while lines and not lines[-1].strip():
+        lines = lines[:-1]
+    return lines
+
+
+class _RstParser:
+    """
+    Parse rst subset into blocks.
+
+    Blocks are tuples: ('header', level, inlines, identifier), ('para', inlines), ('code', language, code),
+    ('list', start, items), where start is None for bullet lists and each item is a list of blocks,
+    and ('div', type, title, blocks) for admonitions.
+
+    Attributes:
+        styles: heading adornment styles, in order encountered, determining heading level
+    """
+    styles: list[tuple[str, bool]]
+
+    def __init__(self):
+        self.styles = []
+
+    def blocks(self, lines: list[str]) -> list[tuple]:
+        blocks = []
+        label = None
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            if not line.strip():
+                index += 1
+                continue
+
+            if _indentation(line) > 0:
+                raise FastPathUnsupported("block quote: " + line.strip())
+
+            match = LABEL.match(line)
+            if match:
+                if label is not None:
+                    raise FastPathUnsupported("multiple labels: " + line.strip())
+                label = match.group(1)
+                index += 1
+                continue
+
+            header = self._header(lines, index)
+            if header:
+                (level, title, index) = header
+                inlines = _inlines(title)
+                identifier = None
+                if label is not None and label != _auto_identifier(title):
+                    identifier = label
+                blocks.append(('header', level, inlines, identifier))
+                label = None
+                continue
+
+            if label is not None:
+                raise FastPathUnsupported("label not before heading: " + label)
+
+            match = CODE_BLOCK.match(line)
+            if match:
+                (code, index) = self._indented(lines, index + 1, options=False)
+                if not code:
+                    raise FastPathUnsupported("empty code block: " + line.strip())
+                blocks.append(('code', match.group(1), code))
+                continue
+
+            match = ADMONITION.match(line)
+            if match:
+                (block, index) = self._admonition(lines, index, match.group(1), match.group(2).strip())
+                blocks.append(block)
+                continue
+
+            if COMMENT.match(line):
+                (comment, index) = self._indented(lines, index + 1)
+                continue
+
+            match = BULLET.match(line) or ENUMERATED.match(line)
+            if match:
+                (block, index) = self._list(lines, index)
+                blocks.append(block)
+                continue
+
+            if ADORNMENT.match(line):
+                raise FastPathUnsupported("transition or adornment: " + line.strip())
+
+            index = self._paragraph(lines, index, blocks)
+
+        if label is not None:
+            raise FastPathUnsupported("label at end of content: " + label)
+
+        return blocks
+
+    def _header(self, lines: list[str], index: int) -> tuple[int, str, int]:
+        """
+        Section title, with underline or overline and underline.
+
+        :return: level, title, next index; or None if not a section title
+        """
+        line = lines[index]
+        following = lines[index + 1] if index + 1 < len(lines) else ''
+
+        overline = ADORNMENT.match(line)
+        if overline and index + 2 < len(lines):
+            title = following.strip()
+            underline = ADORNMENT.match(lines[index + 2])
+            if title and underline and underline.group(1) == overline.group(1):
+                return (self._level(overline.group(1), True), title, index + 3)
+
+        underline = ADORNMENT.match(following)
+        if not overline and underline and line.strip():
+            if len(following.rstrip()) < len(line.rstrip()):
+                raise FastPathUnsupported("title underline too short: " + line.strip())
+            return (self._level(underline.group(1), False), line.strip(), index + 2)
+
+        return None
+
+    def _level(self, char: str, overline: bool) -> int:
+        style = (char, overline)
+        if style not in self.styles:
+            self.styles.append(style)
+        return self.styles.index(style) + 1
+
+    def _indented(self, lines: list[str], index: int, options: bool = True) -> tuple[str, int]:
+        """
+        Indented block following directive, comment or literal block marker.
+
+        :return: dedented content, next index
+        """
+        block = []
+        while index < len(lines) and (not lines[index].strip() or _indentation(lines[index]) > 0):
+            block.append(lines[index])
+            index += 1
+
+        block = _strip_blank(block)
+        if not block:
+            return ('', index)
+        if not options and block[0].lstrip().startswith(':'):
+            raise FastPathUnsupported("directive options: " + block[0].strip())
+
+        indent = min(_indentation(line) for line in block if line.strip())
+        return ('\n'.join(_dedent(block, indent)), index)
+
+    def _admonition(self, lines: list[str], index: int, kind: str, argument: str) -> tuple[tuple, int]:
+        """
+        Admonition, content may start on the directive line (generic admonition has title argument instead).
+
+        :return: div block, next index
+        """
+        start = index + 1
+        index += 1
+        block = []
+        while index < len(lines) and (not lines[index].strip() or _indentation(lines[index]) > 0):
+            block.append(lines[index])
+            index += 1
+        block = _strip_blank(block)
+
+        if block and block[0].lstrip().startswith(':'):
+            raise FastPathUnsupported("directive options: " + block[0].strip())
+        indent = min([_indentation(line) for line in block if line.strip()] or [3])
+        content = _dedent(block, indent)
+
+        if kind == 'admonition':
+            if not argument or (start < len(lines) and lines[start].strip()):
+                raise FastPathUnsupported("admonition title: " + argument)
+            title = _inlines(argument)
+        else:
+            title = kind.capitalize()
+            if argument:
+                # blank line after directive separates argument from following content
+                separator = [''] if start < len(lines) and not lines[start].strip() else []
+                content = [argument] + separator + content
+
+        blocks = self.blocks(content)
+        if not blocks:
+            raise FastPathUnsupported("empty admonition: " + kind)
+        return (('div', kind, title, blocks), index)
+
+    def _paragraph(self, lines: list[str], index: int, blocks: list[tuple]) -> int:
+        """
+        Paragraph, followed by literal block if it ends with '::'.
+
+        :return: next index
+        """
+        paragraph = []
+        while index < len(lines) and lines[index].strip():
+            line = lines[index]
+            if paragraph:
+                if _indentation(line) > 0:
+                    raise FastPathUnsupported("definition list: " + paragraph[0].strip())
+                if BULLET.match(line) or ENUMERATED.match(line) or COMMENT.match(line) or ADORNMENT.match(line):
+                    raise FastPathUnsupported("paragraph continuation: " + line.strip())
+            paragraph.append(line.strip())
+            index += 1
+
+        text = ' '.join(paragraph)
+        literal = text.endswith('::')
+        if literal:
+            # matching pandoc, which keeps a single ':' (docutils removes ' ::' entirely)
+            text = '' if text == '::' else text[:-1]
+
+        if len(paragraph) == 1 and RAW_HTML.match(text):
+            blocks.append(('para', re.sub(r'([<>"])', r'\\\1', text)))
+        elif text:
+            blocks.append(('para', _inlines(text)))
+
+        if literal:
+            (code, index) = self._indented(lines, index)
+            if not code:
+                raise FastPathUnsupported("empty literal block")
+            blocks.append(('code', None, code))
+
+        return index
+
+    def _list(self, lines: list[str], index: int) -> tuple[tuple, int]:
+        """
+        Bullet or enumerated list, items continue while indented to item text.
+
+        :return: list block, next index
+        """
+        first = BULLET.match(lines[index]) or ENUMERATED.match(lines[index])
+        bullet = first.re is BULLET
+        start = None if bullet else int(first.group(1).replace('#', '1'))
+
+        items = []
+        while index < len(lines):
+            line = lines[index]
+            match = BULLET.match(line) if bullet else ENUMERATED.match(line)
+            if not match or (bullet and match.group(1) != first.group(1)):
+                break
+            if not bullet and match.group(1) != '#' and int(match.group(1)) != start + len(items):
+                raise FastPathUnsupported("enumerated list numbering: " + line.strip())
+
+            indent = match.end()
+            item = [' ' * indent + line[indent:]]
+            index += 1
+            while index < len(lines) and (not lines[index].strip() or _indentation(lines[index]) >= indent):
+                item.append(lines[index])
+                index += 1
+
+            item = _strip_blank(item)
+            items.append(self.blocks(_dedent(item, indent)))
+
+            # blank lines between items are part of list
+            while index < len(lines) and not lines[index].strip():
+                index += 1
+
+        following = lines[index] if index < len(lines) else ''
+        if (BULLET if bullet else ENUMERATED).match(following):
+            raise FastPathUnsupported("adjacent lists: " + following.strip())
+
+        return (('list', start, items), index)
+
+
+def _auto_identifier(text: str) -> str:
+    """
+    Pandoc auto identifier for heading text.
+    """
+    identifier = re.sub(r"[^\w\s.-]", "", text.lower())
+    identifier = re.sub(r"\s+", "-", identifier.strip())
+    return re.sub(r"^[^a-z]+", "", identifier) or 'section'
+
+
+def _inlines(text: str) -> str:
+    """
+    Convert inline markup to markdown.
+    """
+    markdown = ''
+    position = 0
+    for match in INLINE.finditer(text):
+        markdown += _text(text[position:match.start()])
+        position = match.end()
+
+        if match.group('literal') is not None:
+            markdown += _code(match.group('literal'))
+        elif match.group('strong_emphasis') is not None:
+            # not rst markup, read as strong text starting with '*' followed by '*' (which pandoc reads as
+            # starting emphasis unless followed by a space)
+            if text[match.end():match.end() + 1] not in ('', ' '):
+                raise FastPathUnsupported("strong emphasis: " + match.group(0))
+            markdown += '**\\*' + _text(match.group('strong_emphasis')) + '**\\*'
+        elif match.group('strong') is not None:
+            markdown += '**' + _text(match.group('strong')) + '**'
+        elif match.group('emphasis') is not None:
+            markdown += '*' + _text(match.group('emphasis')) + '*'
+        elif match.group('link') is not None:
+            url = _url(match.group('url'))
+            link = match.group('link').strip()
+            if link == url:
+                markdown += '<' + url + '>'
+            else:
+                markdown += '[' + _text(link) + '](' + url + ')'
+        elif match.group('uri') is not None:
+            markdown += '<' + _url(match.group('uri')) + '>'
+        elif match.group('title') is not None:
+            markdown += '[' + _text(match.group('title')) + ']{.title-ref}'
+
+    markdown += _text(text[position:])
+    return markdown
+
+
+def _text(text: str) -> str:
+    """
+    Plain text, with standalone urls as links.
+    """
+    markdown = ''
+    position = 0
+    for match in URL.finditer(text):
+        url = match.group(1)
+        if url[-1] in '.,;:!?':
+            raise FastPathUnsupported("url punctuation: " + url)
+        markdown += _plain(text[position:match.start()]) + '<' + url + '>'
+        position = match.end()
+    return markdown + _plain(text[position:])
+
+
+def _plain(text: str) -> str:
+    """
+    Plain text, written as pandoc does: spaces collapsed, apostrophes escaped and typographic punctuation as ascii.
+    """
+    if TEXT_UNSUPPORTED.search(text) or '@' in text:
+        raise FastPathUnsupported("text: " + text)
+    text = SPACES.sub(' ', text.replace('...', '\\...').replace("'", "\\'"))
+    text = HYPHENS.sub(lambda match: '\\-' * (len(match.group(0)) - 1) + '-', text)
+    return SMART.sub(lambda match: SMART_PUNCTUATION[match.group(0)], text)
+
+
+def _url(url: str) -> str:
+    if not URL_CHARS.match(MACRO.sub('', url)):
+        raise FastPathUnsupported("url: " + url)
+    return url
+
+
+def _code(text: str) -> str:
+    if '`' in text:
+        raise FastPathUnsupported("literal: " + text)
+    return '`' + text + '`'
+
+
+def _write_blocks(blocks: list[tuple]) -> str:
+    return '\n\n'.join(_write_block(block) for block in blocks)
+
+
+def _write_block(block: tuple) -> str:
+    kind = block[0]
+    if kind == 'header':
+        (kind, level, inlines, identifier) = block
+        text = '#' * level + ' ' + inlines
+        if identifier:
+            text += ' {#' + identifier + '}'
+        return text
+    if kind == 'para':
+        return block[1]
+    if kind == 'code':
+        (kind, language, code) = block
+        if language is None:
+            return '\n'.join('    ' + line if line else '' for line in code.split('\n'))
+        if '```' in code:
+            raise FastPathUnsupported("code fence in code block")
+        return '``` ' + language + '\n' + code + '\n```'
+    if kind == 'list':
+        return _write_list(block[1], block[2])
+    if kind == 'div':
+        (kind, div_type, title, blocks) = block
+        fence = ':' * (3 + _count_divs(blocks) + (0 if div_type == 'admonition' else 1))
+        text = fence + ' ' + div_type + '\n'
+        if div_type == 'admonition':
+            text += title + '\n\n'
+        else:
+            text += '::: title\n' + title + '\n:::\n\n'
+        return text + _write_blocks(blocks) + '\n' + fence
+    raise FastPathUnsupported(kind)
+
+
+def _count_divs(blocks: list[tuple]) -> int:
+    """
+    Number of divs (including title divs) nested in blocks, determining fence length used by pandoc.
+    """
+    count = 0
+    for block in blocks:
+        if block[0] == 'div':
+            count += 1 + _count_divs(block[3]) + (0 if block[1] == 'admonition' else 1)
+        elif block[0] == 'list':
+            count += sum(_count_divs(item) for item in block[2])
+    return count
+
+
+def _write_list(start: int, items: list[list[tuple]]) -> str:
+    """
+    List, tight unless an item has content other than a paragraph followed by lists.
+    """
+    tight = True
+    for item in items:
+        if not item or item[0][0] != 'para' or any(block[0] != 'list' for block in item[1:]):
+            tight = False
+
+    written = []
+    for (index, item) in enumerate(items):
+        if start is None:
+            marker = '- '
+            indent = 2
+        else:
+            marker = (str(start + index) + '.').ljust(3) + ' '
+            indent = 4
+        text = '\n'.join(_write_block(block) for block in item) if tight else _write_blocks(item)
+        lines = []
+        for (line_index, line) in enumerate(text.split('\n')):
+            if line_index == 0:
+                lines.append(marker + line)
+            else:
+                lines.append(' ' * indent + line if line else '')
+        written.append('\n'.join(lines))
+
+    return ('\n' if tight else '\n\n').join(written)
@@ -0,0 +1,286 @@
+"""
+List-table directive parsed into rows of cells, and written as a markdown pipe table or rst definition list.
+
+The directive content is read once into an in-memory model, each cell holding the rst lines of its content.
+Tables with a single paragraph of inline markup in each cell are written directly as a mkdocs pipe table,
+tables with block content (several paragraphs, lists, nested directives) as a definition list. Neither form
+leaves pandoc to produce a grid table.
+"""
+# message/list_table.py
+
+import logging
+import re
+from typing import Callable
+from typing import Iterable
+
+import mkdocs_translate.fastpath
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+# bullet characters for rows and cells
+BULLETS = '*-+'
+
+# cell content starting a block: list item, directive or comment, literal block, line block, field list,
+# doctest, grid or simple table
+BLOCK_START = re.compile(r"^([-+*](\s|$)|(\d+|#)\.(\s|$)|\.\.(\s|$)|::|\|(\s|$)|:[\w -]+:(\s|$)|>>>|\+-|={2,})")
+
+# inline markup left for pandoc: interpreted text, escapes, references, footnotes and substitution references
+INLINE_UNSUPPORTED = re.compile(r"[`\\|]|\w__?(?!\w)|\]_")
+
+# substitution reference, replaced after directives are processed
+SUBSTITUTION = re.compile(r"\|(\w[^|`\n]*)\|")
+
+# link to rst page, optionally with #anchor
+RST_LINK = re.compile(r"^((\w|-|/|\.)*)\.rst(#.*)?$")
+
+
+class ListTable:
+    """
+    List-table content, as rows of cells.
+
+    Attributes:
+        rows: cells of each row, a cell is the rst lines of its content with cell indentation removed
+        columns: number of columns, the length of the longest row
+    """
+    rows: list[list[list[str]]]
+    columns: int
+
+    def __init__(self, rows: list[list[list[str]]]):
+        self.rows = rows
+        self.columns = max((len(row) for row in rows), default=0)
+
+    def inline(self) -> bool:
+        """
+        Check if each cell is empty, or a single paragraph of inline markup.
+        """
+        return all(_inline_cell(cell) for row in self.rows for cell in row)
+
+    def pipe_table(self, convert: Callable[[str], str]) -> list[str]:
+        """
+        Markdown pipe table, for a table of inline cells with a single header row.
+
+        :param convert: converts cell rst inline markup to markdown, raising ValueError if not supported
+        :return: markdown lines, the first row used as table header
+        """
+        rows = [
+            [convert(' '.join(cell)) for cell in row] + [''] * (self.columns - len(row))
+            for row in self.rows
+        ]
+
+        widths = [3] * self.columns
+        for row in rows:
+            for (column, cell) in enumerate(row):
+                widths[column] = max(widths[column], len(cell))
+
+        lines = [_pipe_row(rows[0], widths), '|' + '|'.join('-' * (width + 2) for width in widths) + '|']
+        lines.extend(_pipe_row(row, widths) for row in rows[1:])
+        return lines
+
+    def definition_list(self, indent: str) -> str:
+        """
+        Raw reStructuredText definition list, for a table of block cells.
+
+        The first paragraph of each row is used as the term, with the remaining content of the row
+        (one paragraph or block per cell) as the definition.
+
+        :param indent: indentation of list-table directive
+        :return: rst content
+        """
+        processed = []
+        for row in self.rows:
+            first = row[0] if row else []
+            if first and not BLOCK_START.match(first[0]):
+                end = first.index('') if '' in first else len(first)
+                term = ' '.join(line.strip() for line in first[:end])
+                blocks = [first[end + 1:]] + row[1:]
+            else:
+                term = '\\ '
+                blocks = row
+
+            definition = []
+            for block in blocks:
+                if block:
+                    if definition:
+                        definition.append('')
+                    definition.extend(block)
+            if not definition:
+                definition = ['\\ ']
+
+            processed.append(f"{indent}{term}\n")
+            processed.extend(f"{indent}   {line}\n" if line else f"{indent}\n" for line in definition)
+            processed.append(f"{indent}\n")
+
+        return ''.join(processed)
+
+
+def parse_list_table(file_path: str, block: str) -> ListTable:
+    """
+    Parse list-table directive content, a two level bullet list of rows and cells, in a single pass.
+
+    :param file_path: rst file location, used for messages
+    :param block: directive content, including indentation
+    :return: list-table rows of cells
+    :raises ValueError: if content is not a two level bullet list
+    """
+    rows: list[list[list[str]]] = []
+    row_indent = None
+    row_bullet = None
+    cell_indent = None
+    cell_bullet = None
+    content_indent = None
+    cell = None
+
+    for line in block.expandtabs().splitlines():
+        text = line.lstrip(' ')
+        if not text:
+            if cell is not None:
+                cell.append('')
+            continue
+
+        indent = len(line) - len(text)
+        if row_indent is None:
+            if not _bullet(text, text[0]):
+                raise ValueError(f"{file_path}: list-table start row expected, unexpected content:" + line)
+            row_indent = indent
+            row_bullet = text[0]
+
+        if indent == row_indent:
+            if not _bullet(text, row_bullet):
+                raise ValueError(f"{file_path}: list-table row expected, unexpected content:" + line)
+            rows.append([])
+            cell = None
+            item = text[1:].lstrip(' ')
+            if not item:
+                continue
+            indent += len(text) - len(item)
+            text = item
+            if cell_indent is not None and indent != cell_indent:
+                raise ValueError(f"{file_path}: list-table row processing, unexpected content:" + line)
+        elif indent < row_indent:
+            raise ValueError(f"{file_path}: list-table, unexpected content:" + line)
+
+        if cell_indent is None:
+            if not _bullet(text, text[0]):
+                raise ValueError(f"{file_path}: list-table start cell expected, unexpected content:" + line)
+            cell_indent = indent
+            cell_bullet = text[0]
+
+        if indent == cell_indent:
+            if not _bullet(text, cell_bullet):
+                raise ValueError(f"{file_path}: list-table cell expected, unexpected content:" + line)
+            cell = []
+            rows[-1].append(cell)
+            item = text[1:].lstrip(' ')
+            content_indent = None
+            if item:
+                content_indent = indent + len(text) - len(item)
+                cell.append(item)
+            continue
+
+        if cell is None or indent < cell_indent:
+            raise ValueError(f"{file_path}: list-table cell processing, unexpected content:" + line)
+        if content_indent is None:
+            content_indent = indent
+        elif indent < content_indent:
+            raise ValueError(f"{file_path}: list-table cell processing, unexpected indentation:" + line)
+        cell.append(line[content_indent:].rstrip())
+
+    for row in rows:
+        for cell in row:
+            while cell and not cell[-1]:
+                cell.pop()
+            while cell and not cell[0]:
+                cell.pop(0)
+
+    return ListTable(rows)
+
+
+def inline_markdown(text: str, substitutions: Iterable[str] = ()) -> str:
+    """
+    Convert rst inline markup (literal, strong, emphasis, title-ref and links) to markdown.
+
+    :param text: rst inline markup, with roles already processed
+    :param substitutions: substitution names replaced later, references to these are left as is
+    :return: markdown inline content
+    :raises ValueError: if markup requires pandoc for conversion
+    """
+    markdown = []
+    position = 0
+    for match in mkdocs_translate.fastpath.INLINE.finditer(text):
+        markdown.append(_text(text[position:match.start()], substitutions))
+        position = match.end()
+
+        if match.group('literal') is not None:
+            literal = match.group('literal')
+            markdown.append('`` ' + literal + ' ``' if '`' in literal else '`' + literal + '`')
+        elif match.group('strong_emphasis') is not None:
+            markdown.append('***' + _text(match.group('strong_emphasis'), substitutions) + '***')
+        elif match.group('strong') is not None:
+            markdown.append('**' + _text(match.group('strong'), substitutions) + '**')
+        elif match.group('emphasis') is not None:
+            markdown.append('*' + _text(match.group('emphasis'), substitutions) + '*')
+        elif match.group('link') is not None:
+            url = _link_url(match.group('url'))
+            link = match.group('link')
+            if link == url:
+                markdown.append('<' + url + '>')
+            else:
+                markdown.append('[' + _text(link, substitutions) + '](' + url + ')')
+        elif match.group('uri') is not None:
+            markdown.append('<' + match.group('uri') + '>')
+        elif match.group('title') is not None:
+            # as postprocess_rst_markdown_text writes title-ref
+            markdown.append('``' + _text(match.group('title'), substitutions) + '``')
+
+    markdown.append(_text(text[position:], substitutions))
+    return ''.join(markdown)
+
+
+def _bullet(text: str, bullet: str) -> bool:
+    """
+    Check text starts with bullet list item marker.
+    """
+    return bullet in BULLETS and text[0] == bullet and (len(text) == 1 or text[1] == ' ')
+
+
+def _inline_cell(cell: list[str]) -> bool:
+    """
+    Check cell is empty, or a single paragraph of inline markup.
+    """
+    if not cell:
+        return True
+    if BLOCK_START.match(cell[0]) or cell[-1].endswith('::'):
+        return False
+    return all(line and line[0] != ' ' for line in cell)
+
+
+def _pipe_row(cells: list[str], widths: list[int]) -> str:
+    return '| ' + ' | '.join(cell.ljust(width) for (cell, width) in zip(cells, widths)) + ' |'
+
+
+def _text(text: str, substitutions: Iterable[str]) -> str:
+    """
+    Plain text, with standalone urls as links.
+    """
+    check = SUBSTITUTION.sub(lambda match: '' if match.group(1) in substitutions else match.group(0), text)
+    if INLINE_UNSUPPORTED.search(check):
+        raise ValueError("inline markup: " + text)
+
+    markdown = ''
+    position = 0
+    for match in mkdocs_translate.fastpath.URL.finditer(text):
+        url = match.group(1).rstrip('.,;:!?')
+        markdown += text[position:match.start()] + '<' + url + '>'
+        position = match.start() + len(url)
+    return markdown + text[position:]
+
+
+def _link_url(url: str) -> str:
+    """
+    Link to rst page changed to markdown page.
+    """
+    match = RST_LINK.match(url)
+    if match:
+        return match.group(1) + '.md' + (match.group(3) or '')
+    return url
@@ -0,0 +1,365 @@
+"""
+Migration manifest recording the inputs used to generate each markdown file.
+
+The manifest is kept in the build folder, and allows migrate to skip rst files that have not changed.
+
+Several processes may share a build folder: manifest, dependency graph and durations are saved under an exclusive
+lock, merging the entries changed by this process into the file saved by other processes.
+"""
+# message/manifest.py
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import mkdocs_translate.session
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__, __version__
+
+logger = logging.getLogger(__app_name__)
+
+MANIFEST_FILE = 'manifest.json'
+DEPENDS_FILE = 'depends.json'
+JOURNAL_FILE = 'journal.jsonl'
+
+# lock file in build folder, held while saving build folder state
+LOCK_FILE = '.lock'
+
+# configuration settings that change the markdown generated
+MANIFEST_CONFIG_KEYS = ['substitutions', 'extlinks', 'nav', 'macro_ignore', 'pandoc_ast', 'fast_path']
+
+
+def manifest_path() -> str:
+    """
+    Location of manifest.json in the build folder.
+    """
+    return os.path.join(mkdocs_translate.session.current_session().build_folder, MANIFEST_FILE)
+
+
+def load_manifest() -> dict[str, dict]:
+    """
+    Load manifest.json from build folder.
+
+    :return: manifest entries by rst file, or empty dictionary if not available
+    """
+    path = manifest_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError) as error:
+        logger.warning(f"Manifest {path} could not be read, all files will be migrated: {error}")
+        return {}
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('files'), dict):
+        logger.warning(f"Manifest {path} format not recognised, all files will be migrated")
+        return {}
+
+    return manifest['files']
+
+
+def save_manifest(files: dict[str, dict], loaded: dict[str, dict] = None) -> None:
+    """
+    Save manifest.json to build folder.
+
+    :param files: manifest entries by rst file
+    :param loaded: manifest entries as loaded, only entries changed since are saved over manifest.json on disk,
+                   or None to replace manifest.json
+    """
+    path = manifest_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with build_lock():
+        if loaded is not None:
+            files = merge_entries(load_manifest(), files, loaded)
+        text = json.dumps({'version': __version__, 'files': files}, indent=1, sort_keys=True)
+        mkdocs_translate.translate.write_text(path, text)
+    logger.debug("manifest: " + path)
+
+
+@contextlib.contextmanager
+def build_lock() -> Iterator[None]:
+    """
+    Lock build folder state, exclusive while saving.
+
+    Locking is skipped where fcntl is not available, files are still written atomically.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    folder = mkdocs_translate.session.current_session().build_folder
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def merge_entries(saved: dict, entries: dict, loaded: dict) -> dict:
+    """
+    Merge entries added, changed or removed since loaded into the entries saved on disk (by other processes).
+
+    :param saved: entries read from disk
+    :param entries: entries of this process
+    :param loaded: entries of this process as loaded, before changes
+    :return: merged entries
+    """
+    merged = dict(saved)
+    for key in loaded.keys() - entries.keys():
+        merged.pop(key, None)
+    for (key, entry) in entries.items():
+        if key not in loaded or loaded[key] != entry:
+            merged[key] = entry
+    return merged
+
+
+def file_hash(path: str) -> str:
+    """
+    Content hash of file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_hash() -> str:
+    """
+    Hash of the configuration settings used during conversion.
+    """
+    config = mkdocs_translate.session.current_session().config
+    settings = {key: config.get(key) for key in MANIFEST_CONFIG_KEYS}
+    text = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def manifest_key(rst_file: str) -> str:
+    """
+    Manifest key for rst file, relative to rst folder.
+    """
+    return os.path.relpath(rst_file, mkdocs_translate.session.current_session().rst_folder)
+
+
+def manifest_entry(rst_file: str, md_file: str = None, graph: dict[str, dict] = None) -> dict[str, str]:
+    """
+    Manifest entry describing the inputs used to convert rst_file.
+
+    :param rst_file: rst file
+    :param md_file: markdown file generated
+    :param graph: dependency graph from scan, used to record content used from other files
+    """
+    entry = {
+        'source': file_hash(rst_file),
+        'config': config_hash(),
+        'pandoc': mkdocs_translate.translate.pandoc_version(),
+        'version': __version__,
+        'md': md_file
+    }
+    if graph is not None:
+        entry['depends'] = depends_hash(graph, rst_file)
+    return entry
+
+
+def is_current(files: dict[str, dict], rst_file: str, entry: dict[str, str], depends: bool = False) -> bool:
+    """
+    Check if manifest records rst_file as already converted from the same inputs.
+
+    :param files: manifest entries by rst file
+    :param rst_file: rst file
+    :param entry: manifest entry describing current inputs (md is ignored)
+    :param depends: also check content used from other files (titles, references and includes)
+    :return: True if markdown file exists, and was generated from identical inputs
+    """
+    recorded = files.get(manifest_key(rst_file))
+    if not recorded:
+        return False
+
+    keys = ['source', 'config', 'pandoc', 'version']
+    if depends:
+        keys.append('depends')
+
+    for key in keys:
+        if recorded.get(key) != entry.get(key):
+            return False
+
+    md_file = recorded.get('md')
+    return md_file is not None and os.path.exists(md_file)
+
+
+def journal_path() -> str:
+    """
+    Location of journal.jsonl in the build folder.
+    """
+    return os.path.join(mkdocs_translate.session.current_session().build_folder, JOURNAL_FILE)
+
+
+def load_journal() -> dict[str, dict]:
+    """
+    Load journal.jsonl recording files completed by an earlier, possibly interrupted, migrate.
+
+    A line left incomplete by an interrupted write is ignored.
+
+    :return: most recent journal entry by rst file, or empty dictionary if not available
+    """
+    path = journal_path()
+    if not os.path.exists(path):
+        return {}
+
+    journal = {}
+    try:
+        with open(path, 'r') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.debug(f"Journal {path} incomplete entry ignored")
+                    continue
+                if isinstance(entry, dict) and 'file' in entry:
+                    journal[entry['file']] = entry
+    except OSError as error:
+        logger.warning(f"Journal {path} could not be read, all files will be migrated: {error}")
+        return {}
+    return journal
+
+
+def reset_journal() -> None:
+    """
+    Remove journal.jsonl, starting a new migrate.
+    """
+    path = journal_path()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def append_journal(rst_file: str, entry: dict[str, str], error: str = None, seconds: float = None) -> dict:
+    """
+    Append entry to journal.jsonl as each file completes, so an interrupted migrate can be resumed.
+
+    :param rst_file: rst file
+    :param entry: manifest entry describing inputs used, and md file generated
+    :param error: error message if conversion failed
+    :param seconds: time taken to convert
+    :return: journal entry
+    """
+    record = dict(entry)
+    record['file'] = manifest_key(rst_file)
+    record['status'] = 'failed' if error else 'converted'
+    record['error'] = error
+    record['seconds'] = None if seconds is None else round(seconds, 3)
+
+    path = journal_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # an incomplete line left by an interrupted write is ended, so this entry can be read
+    line = json.dumps(record, sort_keys=True) + '\n'
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                line = '\n' + line
+    with open(path, 'a') as file:
+        file.write(line)
+    return record
+
+
+def depends_path() -> str:
+    """
+    Location of depends.json dependency graph in the build folder.
+    """
+    return os.path.join(mkdocs_translate.session.current_session().build_folder, DEPENDS_FILE)
+
+
+def load_depends() -> dict[str, dict]:
+    """
+    Load depends.json dependency graph produced by scan.
+
+    :return: dependencies by rst file, or None if not available
+    """
+    path = depends_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError) as error:
+        logger.warning(f"Dependency graph {path} could not be read: {error}")
+        return None
+
+
+def save_depends(graph: dict[str, dict], loaded: dict[str, dict] = None) -> None:
+    """
+    Save depends.json dependency graph to build folder.
+
+    :param graph: dependencies by rst file
+    :param loaded: dependencies as loaded, only entries changed since are saved over depends.json on disk,
+                   or None to replace depends.json (scan of all rst files)
+    """
+    path = depends_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with build_lock():
+        if loaded is not None:
+            graph = merge_entries(load_depends() or {}, graph, loaded)
+        mkdocs_translate.translate.write_text(path, json.dumps(graph, indent=1, sort_keys=True))
+    logger.info("depends: " + path)
+
+
+def _anchor_lookup(anchors: dict[str, str], key: str) -> str:
+    """
+    Anchors lookup, with the same lower case and other projects fallback used by _ref_location and _ref_title.
+    """
+    if key in anchors:
+        return anchors[key]
+    if key.lower() in anchors:
+        return anchors[key.lower()]
+    return mkdocs_translate.translate._project_anchor(key)
+
+
+def depends_hash(graph: dict[str, dict], rst_file: str) -> str:
+    """
+    Hash of the content rst_file uses from other files: reference links and titles, page titles and includes.
+
+    References are resolved as during conversion, including the anchors of other projects when migrating several
+    projects.
+
+    :param graph: dependency graph from scan
+    :param rst_file: rst file
+    :return: hash of dependencies, or None if rst_file was not scanned
+    """
+    depends = graph.get(manifest_key(rst_file))
+    if depends is None:
+        return None
+
+    session = mkdocs_translate.session.current_session()
+    anchors = session.anchors
+    rst_folder = session.rst_folder
+
+    values = []
+    for ref in depends.get('ref', []):
+        values.append(['ref', ref, _anchor_lookup(anchors, ref), _anchor_lookup(anchors, ref + '.title')])
+    for title_key in depends.get('doc', []):
+        values.append(['doc', title_key, anchors.get(title_key)])
+    for title_key in depends.get('toctree', []):
+        values.append(['toctree', title_key, anchors.get(title_key)])
+    for include in depends.get('include', []):
+        include_file = os.path.normpath(os.path.join(rst_folder, include))
+        if os.path.isfile(include_file):
+            values.append(['include', include, file_hash(include_file)])
+        else:
+            values.append(['include', include, None])
+
+    text = json.dumps(values, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,472 @@
+"""
+Pandoc JSON AST conversion of rst to mkdocs markdown.
+
+Alternative to postprocessing pandoc markdown output: pandoc is asked for its JSON AST, and the mkdocs markdown
+is written in a single tree walk applying the same transforms as postprocess_rst_markdown_text: title-ref spans,
+rst to md links, admonitions, header anchors and pipe tables.
+"""
+# message/pandoc_ast.py
+
+import json
+import logging
+import re
+
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+# pandoc api version this writer was written against (major, minor)
+PANDOC_API = [1, 23]
+
+# paragraph text that would be read as list item, header or block quote
+BLOCK_START = re.compile(r"^(\d+)?([.)] |[-+*] |#|>)")
+
+# relative link to rst page, optionally with #anchor
+RST_LINK = re.compile(r"^((\w|-|/|\.)*)\.rst(#.*)?$")
+
+
+def convert_rst_ast(md_file: str, rst_prep: str) -> str:
+    """
+    Use pandoc to parse rst into JSON AST, writing mkdocs markdown.
+
+    :param md_file: location of markdown file being generated, used for messages
+    :param rst_prep: preprocessed rst content
+    :return: markdown content
+    """
+    document = json.loads(mkdocs_translate.translate.pandoc(rst_prep, "rst", "json"))
+
+    api = document.get('pandoc-api-version', [])
+    if api[0:2] != PANDOC_API:
+        logger.debug(f"pandoc api {api} differs from {PANDOC_API}: {md_file}")
+
+    return MarkdownWriter(md_file).write(document)
+
+
+def auto_identifier(text: str) -> str:
+    """
+    Pandoc auto_identifiers extension, used to determine if header anchor needs to be written.
+    """
+    identifier = re.sub(r"[^\w\s.-]", "", text.lower())
+    identifier = re.sub(r"\s+", "-", identifier.strip())
+    identifier = re.sub(r"^[^a-z]+", "", identifier)
+    return identifier or 'section'
+
+
+def stringify(inlines: list) -> str:
+    """
+    Plain text of inline elements, without formatting.
+    """
+    text = ''
+    for inline in inlines:
+        kind = inline['t']
+        content = inline.get('c')
+        if kind == 'Str':
+            text += content
+        elif kind in ('Space', 'SoftBreak', 'LineBreak'):
+            text += ' '
+        elif kind in ('Code', 'Math', 'RawInline'):
+            text += content[1]
+        elif kind in ('Emph', 'Strong', 'Strikeout', 'Superscript', 'Subscript', 'SmallCaps', 'Underline'):
+            text += stringify(content)
+        elif kind in ('Span', 'Quoted', 'Cite'):
+            text += stringify(content[1])
+        elif kind in ('Link', 'Image'):
+            text += stringify(content[1])
+    return text
+
+
+def _indent(text: str, prefix: str, first: str = None) -> str:
+    """
+    Indent lines of text (blank lines are left empty), using first prefix for initial line.
+    """
+    lines = []
+    for (index, line) in enumerate(text.split('\n')):
+        if index == 0 and first is not None:
+            lines.append(first + line if line else first.rstrip())
+        elif line:
+            lines.append(prefix + line)
+        else:
+            lines.append('')
+    return '\n'.join(lines)
+
+
+class MarkdownWriter:
+    """
+    Write pandoc JSON AST as mkdocs markdown.
+
+    Markdown is written for python-markdown as used by mkdocs (four space indent for nested content,
+    admonitions and attr_list header anchors). Text is written as is without escaping, matching the
+    unescaping performed by postprocess_rst_markdown_text.
+
+    Attributes:
+        md_file: markdown file being generated, used for messages
+        notes: footnote content, written at the end of the document
+    """
+    md_file: str
+    notes: list[str]
+
+    def __init__(self, md_file: str):
+        self.md_file = md_file
+        self.notes = []
+
+    def write(self, document: dict) -> str:
+        """
+        Write markdown for pandoc document.
+
+        :param document: pandoc JSON AST
+        :return: markdown content
+        """
+        self.notes = []
+        text = self.blocks(document['blocks'])
+        for (index, note) in enumerate(self.notes):
+            text += '\n\n' + _indent(note, '    ', f"[^{index + 1}]: ")
+        return text + '\n' if text else ''
+
+    def blocks(self, blocks: list) -> str:
+        """
+        Write block elements, separated by blank lines.
+        """
+        written = []
+        for block in blocks:
+            text = self.block(block)
+            if text is not None:
+                written.append(text)
+        return '\n\n'.join(written)
+
+    def block(self, block: dict) -> str:
+        """
+        Write block element.
+
+        :return: markdown, or None if block is not written
+        """
+        kind = block['t']
+        content = block.get('c')
+
+        if kind in ('Para', 'Plain'):
+            return BLOCK_START.sub(r"\1\\\2", self.inlines(content), count=1)
+        if kind == 'Header':
+            return self.header(*content)
+        if kind == 'CodeBlock':
+            return self.code_block(*content)
+        if kind == 'RawBlock':
+            (raw_format, text) = content
+            if raw_format in ('html', 'markdown'):
+                return text
+            logger.debug(f"{self.md_file}: skipping raw {raw_format} block")
+            return None
+        if kind == 'BlockQuote':
+            return _indent(self.blocks(content), '> ').replace('\n\n', '\n>\n')
+        if kind == 'BulletList':
+            return self.list_items(content, lambda index: '-')
+        if kind == 'OrderedList':
+            start = content[0][0]
+            return self.list_items(content[1], lambda index: str(start + index) + '.')
+        if kind == 'DefinitionList':
+            return self.definition_list(content)
+        if kind == 'LineBlock':
+            return '  \n'.join(self.inlines(line) for line in content)
+        if kind == 'HorizontalRule':
+            return '-----'
+        if kind == 'Table':
+            return self.table(*content)
+        if kind == 'Figure':
+            return self.figure(*content)
+        if kind == 'Div':
+            return self.div(*content)
+
+        logger.warning(f"{self.md_file}: pandoc {kind} block not supported")
+        return None
+
+    def header(self, level: int, attr: list, inlines: list) -> str:
+        """
+        Header, with anchor written using attr_list syntax to avoid conflict with mkdocs-macros-plugin.
+        """
+        text = '#' * level + ' ' + self.inlines(inlines)
+        identifier = attr[0]
+        if identifier and identifier != auto_identifier(stringify(inlines)):
+            text += ' {: #' + identifier + ' }'
+        return text
+
+    def code_block(self, attr: list, code: str) -> str:
+        """
+        Fenced code block, code blocks marked raw_markdown are written as is.
+        """
+        (identifier, classes, attributes) = attr
+        if 'raw_markdown' in classes:
+            return code.rstrip('\n')
+
+        fence = '```'
+        while fence in code:
+            fence += '`'
+
+        if identifier or attributes or len(classes) > 1:
+            info = ' ' + self.attributes(attr)
+        elif classes:
+            info = ' ' + classes[0]
+        else:
+            info = ''
+
+        if not code:
+            return fence + info + '\n' + fence
+        return fence + info + '\n' + code + '\n' + fence
+
+    def attributes(self, attr: list) -> str:
+        """
+        Pandoc attributes {#identifier .class key="value"}.
+        """
+        (identifier, classes, attributes) = attr
+        values = []
+        if identifier:
+            values.append('#' + identifier)
+        for name in classes:
+            values.append('.' + name)
+        for (key, value) in attributes:
+            values.append(key + '="' + value.replace('"', '\\"') + '"')
+        return '{' + ' '.join(values) + '}'
+
+    def list_items(self, items: list, marker) -> str:
+        """
+        Bullet or ordered list, nested content is indented four spaces.
+
+        :param items: list items, each a list of blocks
+        :param marker: function providing marker for item index
+        """
+        tight = all(block['t'] != 'Para' for item in items for block in item)
+        written = []
+        for (index, item) in enumerate(items):
+            first = marker(index)
+            first += ' ' * max(1, 4 - len(first))
+            text = self.blocks(item)
+            written.append(_indent(text, ' ' * len(first), first))
+        return ('\n' if tight else '\n\n').join(written)
+
+    def definition_list(self, items: list) -> str:
+        """
+        Definition list, with definitions on following lines marked with ':'.
+        """
+        written = []
+        for (term, definitions) in items:
+            tight = all(block['t'] != 'Para' for definition in definitions for block in definition)
+            text = self.inlines(term)
+            for definition in definitions:
+                text += '\n' if tight else '\n\n'
+                text += _indent(self.blocks(definition), '    ', ':   ')
+            written.append(text)
+        return '\n\n'.join(written)
+
+    def figure(self, attr: list, caption: list, blocks: list) -> str:
+        """
+        Figure, written as content (the image alternate text is the caption).
+        """
+        return self.blocks(blocks)
+
+    def div(self, attr: list, blocks: list) -> str:
+        """
+        Fenced div, written as mkdocs admonition.
+
+        Rst admonitions are represented by pandoc as a div with a title div, generic admonitions have a title paragraph.
+        """
+        (identifier, classes, attributes) = attr
+        if not classes:
+            return self.blocks(blocks)
+
+        (kind, title) = mkdocs_translate.translate._fenced_div_to_mkdocs(classes[0])
+        if blocks and blocks[0]['t'] == 'Div' and 'title' in blocks[0]['c'][0][1]:
+            title = stringify_blocks(blocks[0]['c'][1])
+            blocks = blocks[1:]
+        elif title is None and blocks and blocks[0]['t'] in ('Para', 'Plain'):
+            title = self.inlines(blocks[0]['c'])
+            blocks = blocks[1:]
+
+        text = '!!! ' + kind
+        if title is not None and title.lower() != kind.lower():
+            text += ' "' + title + '"'
+
+        content = self.blocks(blocks)
+        if content:
+            text += '\n\n' + _indent(content, '    ')
+        return text
+
+    def table(self, attr: list, caption: list, colspecs: list, head: list, bodies: list, foot: list) -> str:
+        """
+        Pipe table, cell content is written on a single line.
+        """
+        rows = []
+        for row in head[1]:
+            rows.append(self.table_row(row))
+        header = len(rows)
+        for body in bodies:
+            for row in body[2] + body[3]:
+                rows.append(self.table_row(row))
+        for row in foot[1]:
+            rows.append(self.table_row(row))
+
+        columns = len(colspecs)
+        if not header:
+            # pipe tables require a header
+            rows.insert(0, [''] * columns)
+        for row in rows:
+            row.extend([''] * (columns - len(row)))
+
+        widths = [max(3, max(len(row[column]) for row in rows)) for column in range(columns)]
+
+        separator = []
+        for (column, (align, width)) in enumerate(colspecs):
+            dashes = '-' * widths[column]
+            if align['t'] == 'AlignLeft':
+                dashes = ':' + dashes[1:]
+            elif align['t'] == 'AlignRight':
+                dashes = dashes[1:] + ':'
+            elif align['t'] == 'AlignCenter':
+                dashes = ':' + dashes[2:] + ':'
+            separator.append(dashes)
+
+        lines = []
+        for (index, row) in enumerate(rows):
+            lines.append('| ' + ' | '.join(cell.ljust(widths[column]) for (column, cell) in enumerate(row)) + ' |')
+            if index == 0:
+                lines.append('|-' + '-|-'.join(separator) + '-|')
+
+        text = '\n'.join(lines)
+        caption_text = stringify_blocks(caption[1])
+        if caption_text:
+            text += '\n\n: ' + caption_text
+        return text
+
+    def table_row(self, row: list) -> list[str]:
+        """
+        Table row cells, spanned cells are repeated as empty cells.
+        """
+        cells = []
+        for (attr, align, row_span, col_span, blocks) in row[1]:
+            text = self.blocks(blocks)
+            text = re.sub(r"\n\s*", ' ', text).replace('|', '\\|')
+            cells.append(text)
+            cells.extend([''] * (col_span - 1))
+        return cells
+
+    def inlines(self, inlines: list) -> str:
+        """
+        Write inline elements.
+        """
+        return ''.join(self.inline(inline) for inline in inlines)
+
+    def inline(self, inline: dict) -> str:
+        """
+        Write inline element.
+        """
+        kind = inline['t']
+        content = inline.get('c')
+
+        if kind == 'Str':
+            return content
+        if kind == 'Space':
+            return ' '
+        if kind == 'SoftBreak':
+            # equivalent to pandoc --wrap=none
+            return ' '
+        if kind == 'LineBreak':
+            return '  \n'
+        if kind == 'Emph':
+            return '*' + self.inlines(content) + '*'
+        if kind == 'Strong':
+            return '**' + self.inlines(content) + '**'
+        if kind == 'Strikeout':
+            return '~~' + self.inlines(content) + '~~'
+        if kind == 'Superscript':
+            return '^' + self.inlines(content) + '^'
+        if kind == 'Subscript':
+            return '~' + self.inlines(content) + '~'
+        if kind in ('SmallCaps', 'Underline'):
+            return self.inlines(content)
+        if kind == 'Code':
+            return self.code(content[1])
+        if kind == 'Math':
+            (math_type, text) = content
+            if math_type['t'] == 'DisplayMath':
+                return '$$' + text + '$$'
+            return '$' + text + '$'
+        if kind == 'RawInline':
+            (raw_format, text) = content
+            return text if raw_format in ('html', 'markdown') else ''
+        if kind == 'Quoted':
+            quote = '"' if content[0]['t'] == 'DoubleQuote' else "'"
+            return quote + self.inlines(content[1]) + quote
+        if kind == 'Cite':
+            return self.inlines(content[1])
+        if kind == 'Span':
+            return self.span(*content)
+        if kind == 'Link':
+            return self.link(*content)
+        if kind == 'Image':
+            return self.image(*content)
+        if kind == 'Note':
+            self.notes.append(self.blocks(content))
+            return f"[^{len(self.notes)}]"
+
+        logger.warning(f"{self.md_file}: pandoc {kind} inline not supported")
+        return ''
+
+    def code(self, text: str) -> str:
+        """
+        Inline code, using enough backticks to enclose any backticks in text.
+        """
+        fence = '`'
+        while fence in text:
+            fence += '`'
+        if text.startswith('`') or text.endswith('`'):
+            return fence + ' ' + text + ' ' + fence
+        return fence + text + fence
+
+    def span(self, attr: list, inlines: list) -> str:
+        """
+        Span, title-ref (rst default role) is written as monospace.
+        """
+        if 'title-ref' in attr[1]:
+            text = self.inlines(inlines)
+            return '``' + text + '``' if text else ''
+        return self.inlines(inlines)
+
+    def link(self, attr: list, inlines: list, target: list) -> str:
+        """
+        Link, with rst page references changed to md pages.
+        """
+        (url, title) = target
+        url = _link_url(url)
+        text = self.inlines(inlines)
+        if text == url and not title and re.match(r"^\w+:", url):
+            return '<' + url + '>'
+        if title:
+            return '[' + text + '](' + url + ' "' + title + '")'
+        return '[' + text + '](' + url + ')'
+
+    def image(self, attr: list, inlines: list, target: list) -> str:
+        """
+        Image, with any size attributes.
+        """
+        (url, title) = target
+        text = '![' + self.inlines(inlines) + '](' + _link_url(url)
+        if title and title != 'fig:':
+            text += ' "' + title + '"'
+        text += ')'
+        if attr[2]:
+            text += self.attributes(['', [], attr[2]])
+        return text
+
+
+def stringify_blocks(blocks: list) -> str:
+    """
+    Plain text of block elements, without formatting.
+    """
+    return ' '.join(stringify(block['c']) for block in blocks if block['t'] in ('Para', 'Plain'))
+
+
+def _link_url(url: str) -> str:
+    """
+    Relative links to rst pages are changed to md pages, and mkdocs macros restored.
+    """
+    match = RST_LINK.match(url)
+    if match:
+        url = match.group(1) + '.md' + (match.group(3) or '')
+    return mkdocs_translate.translate._postprocess_link(url)
@@ -0,0 +1,122 @@
+"""
+MkDocs plugin serving rst pages, converted to markdown on demand, so rst files can be edited during mkdocs serve.
+
+Register plugin with mkdocs.yml (running mkdocs from the project folder)::
+
+    plugins:
+      - mkdocs_translate:
+          config: translate.yml
+
+Each rst file in the rst folder is served as the markdown page migrate would generate, replacing any markdown
+file previously migrated. Conversion results are cached in memory, so a live reload only converts pages that changed
+(or whose references, titles or includes changed).
+"""
+# message/plugin.py
+
+import logging
+import os
+
+from mkdocs.config import config_options
+from mkdocs.plugins import BasePlugin
+from mkdocs.structure.files import File
+
+from mkdocs_translate import __app_name__
+from .manifest import depends_hash
+from .manifest import file_hash
+from .session import Session
+from .translate import collect_path
+from .translate import convert_rst_text
+from .translate import markdown_path
+from .watch import WatchIndex
+
+logger = logging.getLogger(__app_name__)
+
+
+class TranslatePlugin(BasePlugin):
+    """
+    Serve rst folder pages, converted to markdown on demand.
+
+    Attributes:
+        session: session used for conversion
+        watch_index: anchors and dependencies, kept up to date as rst files change
+        sources: content hash of each rst file, when last indexed
+        pages: rst file for each page served (by markdown src_uri)
+        converted: cache key and markdown of each rst file converted
+    """
+    config_scheme = (
+        ('config', config_options.Type(str, default='')),
+    )
+
+    session: Session
+    watch_index: WatchIndex
+    sources: dict[str, str]
+    pages: dict[str, str]
+    converted: dict[str, tuple[str, str]]
+
+    def __init__(self):
+        self.session = None
+        self.watch_index = None
+        self.sources = {}
+        self.pages = {}
+        self.converted = {}
+
+    def on_config(self, config):
+        self.session = Session(self.config['config'] or None)
+        return config
+
+    def on_files(self, files, config):
+        with self.session.activate():
+            rst_files = collect_path(self.session.rst_folder + "/**/*.rst", 'rst', True)
+            self._update_index(rst_files)
+
+            # rst files in docs folder are not copied as static files
+            sources = {os.path.abspath(rst_file) for rst_file in rst_files}
+            for file in list(files):
+                if file.abs_src_path and os.path.abspath(file.abs_src_path) in sources:
+                    files.remove(file)
+
+            self.pages = {}
+            for rst_file in rst_files:
+                src_uri = os.path.relpath(markdown_path(rst_file), self.session.docs_folder).replace(os.sep, '/')
+                migrated = files.get_file_from_path(src_uri)
+                if migrated is not None:
+                    files.remove(migrated)
+                files.append(File(src_uri, config['docs_dir'], config['site_dir'], config['use_directory_urls']))
+                self.pages[src_uri] = rst_file
+        return files
+
+    def _update_index(self, rst_files: list[str]) -> None:
+        """
+        Update anchors and dependencies for rst files changed since last build.
+        """
+        sources = {rst_file: file_hash(rst_file) for rst_file in rst_files}
+        if self.watch_index is None:
+            self.watch_index = WatchIndex()
+            self.watch_index.scan(rst_files)
+        else:
+            for rst_file in sorted(sources.keys() | self.sources.keys()):
+                if sources.get(rst_file) != self.sources.get(rst_file):
+                    self.watch_index.update(rst_file)
+        self.sources = sources
+
+    def on_page_read_source(self, page, config):
+        rst_file = self.pages.get(page.file.src_uri)
+        if rst_file is None:
+            return None
+
+        with self.session.activate():
+            key = self.sources[rst_file] + ':' + str(depends_hash(self.watch_index.graph, rst_file))
+            cached = self.converted.get(rst_file)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            logger.info("Converting '" + rst_file + "'")
+            with open(rst_file, 'r') as file:
+                text = file.read()
+            markdown = convert_rst_text(rst_file, markdown_path(rst_file), text)
+            self.converted[rst_file] = (key, markdown)
+            return markdown
+
+    def on_serve(self, server, config, builder):
+        server.watch(self.session.rst_folder)
+        return server
@@ -0,0 +1,158 @@
+"""
+Cost-aware scheduling of rst file conversions, converting the slowest files first.
+
+A short history of conversion durations is kept in the build folder. Files without history are estimated from
+file size and the directives that are expensive to convert (list-table, toctree, include).
+"""
+# message/schedule.py
+
+import heapq
+import json
+import logging
+import os
+import re
+
+import mkdocs_translate.manifest
+import mkdocs_translate.session
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+DURATIONS_FILE = 'durations.json'
+
+# number of durations recorded for each file
+DURATIONS_HISTORY = 5
+
+# conversion cost of directives, in equivalent bytes of rst content
+DIRECTIVE_COST = {
+    'list-table': 20000,
+    'toctree': 5000,
+    'include': 5000,
+    'literalinclude': 2000,
+    'figure': 1000,
+}
+
+# seconds for each byte of cost, used until calibrated against durations history
+SECONDS_PER_COST = 0.00001
+
+DIRECTIVE = re.compile(r"^\s*\.\. ([\w-]+)::", re.MULTILINE)
+
+
+def durations_path() -> str:
+    """
+    Location of durations.json in the build folder.
+    """
+    return os.path.join(mkdocs_translate.session.current_session().build_folder, DURATIONS_FILE)
+
+
+def load_durations() -> dict[str, list[float]]:
+    """
+    Load durations history from build folder.
+
+    :return: recent conversion durations in seconds by rst file, or empty dictionary if not available
+    """
+    path = durations_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as file:
+            durations = json.load(file)
+    except (OSError, ValueError) as error:
+        logger.warning(f"Durations {path} could not be read: {error}")
+        return {}
+    if not isinstance(durations, dict):
+        return {}
+    return durations
+
+
+def save_durations(durations: dict[str, list[float]], loaded: dict[str, list[float]] = None) -> None:
+    """
+    Save durations history to build folder.
+
+    :param durations: recent conversion durations in seconds by rst file
+    :param loaded: durations as loaded, only files recorded since are saved over durations.json on disk,
+                   or None to replace durations.json
+    """
+    path = durations_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with mkdocs_translate.manifest.build_lock():
+        if loaded is not None:
+            durations = mkdocs_translate.manifest.merge_entries(load_durations(), durations, loaded)
+        mkdocs_translate.translate.write_text(path, json.dumps(durations, indent=1, sort_keys=True))
+
+
+def record_duration(durations: dict[str, list[float]], rst_file: str, seconds: float) -> None:
+    """
+    Record conversion duration, keeping a short history for each file.
+    """
+    history = durations.setdefault(mkdocs_translate.manifest.manifest_key(rst_file), [])
+    history.append(round(seconds, 3))
+    del history[:-DURATIONS_HISTORY]
+
+
+def estimate_cost(rst_file: str) -> float:
+    """
+    Conversion cost of rst file estimated from size and expensive directives, in equivalent bytes.
+    """
+    try:
+        with open(rst_file, 'r') as file:
+            text = file.read()
+    except (OSError, UnicodeDecodeError):
+        return 0.0
+    cost = float(len(text))
+    for match in DIRECTIVE.finditer(text):
+        cost += DIRECTIVE_COST.get(match.group(1), 0)
+    return cost
+
+
+def estimate_durations(rst_files: list[str], durations: dict[str, list[float]]) -> dict[str, float]:
+    """
+    Estimate conversion duration of each rst file.
+
+    Files with history use their average recent duration. Other files are estimated from size and directives,
+    using the seconds per cost observed for files with history.
+
+    :param rst_files: rst files to convert
+    :param durations: durations history
+    :return: estimated seconds by rst file
+    """
+    estimates: dict[str, float] = {}
+    costs: dict[str, float] = {}
+    observed_seconds = 0.0
+    observed_cost = 0.0
+    for rst_file in rst_files:
+        cost = estimate_cost(rst_file)
+        history = durations.get(mkdocs_translate.manifest.manifest_key(rst_file))
+        if history:
+            estimates[rst_file] = sum(history) / len(history)
+            observed_seconds += estimates[rst_file]
+            observed_cost += cost
+        else:
+            costs[rst_file] = cost
+
+    rate = observed_seconds / observed_cost if observed_cost > 0 and observed_seconds > 0 else SECONDS_PER_COST
+    for (rst_file, cost) in costs.items():
+        estimates[rst_file] = cost * rate
+    return estimates
+
+
+def longest_first(rst_files: list[str], estimates: dict[str, float]) -> list[str]:
+    """
+    Order rst files slowest first, so the last conversions to start are short and finish with the rest of the pool.
+    """
+    return sorted(rst_files, key=lambda rst_file: estimates.get(rst_file, 0.0), reverse=True)
+
+
+def makespan(durations: list[float], workers: int) -> float:
+    """
+    Time to complete jobs, started in order on the first available worker.
+
+    :param durations: job durations in seconds, in the order jobs are started
+    :param workers: number of workers
+    :return: seconds until the last job completes
+    """
+    finish = [0.0] * max(1, min(workers, len(durations)))
+    for duration in durations:
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
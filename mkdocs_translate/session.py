@@ -0,0 +1,353 @@
+"""
+Conversion session, owning project configuration and anchors index.
+
+Module functions in translate.py use the current session, which is the default session unless another session
+has been activated for the current thread or asyncio task. Several projects may be converted in one process
+by using a session for each project::
+
+    session = Session('translate.yml')
+    session.init_anchors()
+    md_file = session.convert_rst('docs/index.rst')
+"""
+# message/session.py
+
+import contextlib
+import contextvars
+import logging
+import os
+from typing import Iterator
+
+import mkdocs_translate.translate
+from mkdocs_translate import __app_name__
+from .substitution import Substitutions
+
+logger = logging.getLogger(__app_name__)
+
+
+class Session:
+    """
+    Project configuration and anchors index used for conversion.
+
+    Attributes:
+        config_path: config override location, or None for built-in default configuration
+        config: configuration
+        docs_folder: markdown docs folder
+        rst_folder: rst folder (defaults to docs folder)
+        build_folder: build folder
+        upload_folder: folder for files uploaded for translation
+        convert_folder: folder for intermediate conversion files, and anchors index
+        download_folder: folder for translated files
+        anchor_file: anchors index location
+        anchors: anchors index, reference to path#anchor or title
+        keep_temp: write intermediate files to build folder for troubleshooting
+        name: project name, when migrating several projects
+        parent: session configured with projects, for project sessions
+        projects: project sessions by name, shared by all sessions of a run (empty if not configured)
+        unknown_substitutions: names of substitution references not in configuration, by rst file converted
+        backend_name: pandoc backend name, 'subprocess' or 'server' (see backend.configure_backend())
+        backend_limits: pandoc backend timeout, memory and retries limits
+        backend: pandoc backend, initialized when first used (shared by project sessions, see root)
+        pandoc_version: pandoc version of backend, looked up when first used
+    """
+    config_path: str
+    config: dict
+    docs_folder: str
+    rst_folder: str
+    build_folder: str
+    upload_folder: str
+    convert_folder: str
+    download_folder: str
+    anchor_file: str
+    anchors: dict
+    name: str
+    parent: 'Session'
+    projects: dict[str, 'Session']
+    unknown_substitutions: dict[str, set[str]]
+    backend_name: str
+    backend_limits: dict
+    backend: object
+    pandoc_version: str
+
+    def __init__(self, override_path: str = None, keep_temp: bool = False, configure: bool = True):
+        """
+        Session using provided config.
+
+        :param override_path: Override config location, or None to use built-in default configuration
+        :param keep_temp: write intermediate files to build folder for troubleshooting
+        :param configure: False to create session without loading configuration
+        """
+        self.config_path = override_path
+        self.config = {}
+        self.docs_folder = None
+        self.rst_folder = None
+        self.build_folder = None
+        self.upload_folder = None
+        self.convert_folder = None
+        self.download_folder = None
+        self.anchor_file = None
+        self.anchors = {}
+        self._keep_temp = keep_temp
+        self.name = None
+        self.parent = None
+        self.projects = {}
+        self.unknown_substitutions = {}
+        self._substitutions = None
+        self._role_lexer = None
+        self.backend_name = 'subprocess'
+        self.backend_limits = {}
+        self.backend = None
+        self.pandoc_version = None
+        if configure:
+            self.init_config(override_path)
+
+    @property
+    def keep_temp(self) -> bool:
+        if self.parent is not None:
+            return self.parent.keep_temp
+        return self._keep_temp
+
+    @keep_temp.setter
+    def keep_temp(self, keep_temp: bool) -> None:
+        if self.parent is not None:
+            self.parent.keep_temp = keep_temp
+        else:
+            self._keep_temp = keep_temp
+
+    @property
+    def root(self) -> 'Session':
+        """
+        Session configured with projects for project sessions, or this session.
+
+        The root session owns the pandoc backend shared by its project sessions.
+        """
+        if self.parent is not None:
+            return self.parent
+        return self
+
+    @property
+    def cache_folder(self) -> str:
+        """
+        Location of pandoc cache in the build folder (shared by project sessions, see _project_config()).
+        """
+        return os.path.join(self.build_folder, self.config.get('cache_folder', 'cache'))
+
+    def init_config(self, override_path: str) -> None:
+        """
+        Initialize using provided config, including a session for each of the configured projects.
+
+        :param override_path: Override config location, or None to use built-in default configuration
+        """
+        self.config_path = override_path
+        self._init_folders(mkdocs_translate.translate.load_config(override_path))
+
+        self.projects = {}
+        for (name, settings) in (self.config.get('projects') or {}).items():
+            project = Session(override_path, configure=False)
+            project.name = name
+            project.parent = self
+            project.projects = self.projects
+            project._init_folders(self._project_config(name, settings or {}))
+            self.projects[name] = project
+
+    def _init_folders(self, config: dict) -> None:
+        """
+        Initialize configuration and project folders.
+        """
+        self.config = config
+        self._substitutions = Substitutions(config.get('substitutions'))
+
+        project_folder = config['project_folder']
+        self.docs_folder = os.path.normpath(os.path.join(project_folder, config.get('docs_folder', 'docs')))
+        self.build_folder = os.path.normpath(os.path.join(project_folder, config['build_folder']))
+        self.upload_folder = os.path.normpath(os.path.join(project_folder, config['build_folder'], config['upload_folder']))
+        self.convert_folder = os.path.normpath(os.path.join(project_folder, config['build_folder'], config['convert_folder']))
+        self.download_folder = os.path.normpath(os.path.join(project_folder, config['build_folder'], config['download_folder']))
+        self.anchor_file = os.path.normpath(os.path.join(self.convert_folder, config['anchor_file']))
+
+        self.rst_folder = self.docs_folder
+        if 'rst_folder' in config:
+            self.rst_folder = os.path.normpath(os.path.join(project_folder, config['rst_folder']))
+
+        if not os.path.exists(self.docs_folder):
+            logger.debug(f"The docs folder does not exist at location: {self.docs_folder}")
+
+        if not os.path.exists(self.rst_folder):
+            logger.debug(f"The rst folder does not exist at location: {self.rst_folder}")
+
+        logger.debug('--- start configuration ' + (self.name + ' ' if self.name else '') + '---')
+        logger.debug('docs folder: %s', self.docs_folder)
+        logger.debug(' rst folder: %s', self.rst_folder)
+        logger.debug('      build: %s', self.build_folder)
+        logger.debug('     upload: %s', self.upload_folder)
+        logger.debug('   download: %s', self.download_folder)
+        logger.debug('    anchors: %s', self.anchor_file)
+        logger.debug('--- end configuration ---')
+
+    def _project_config(self, name: str, settings: dict) -> dict:
+        """
+        Project configuration, project settings override the shared configuration.
+
+        Each project uses its own build folder (for anchors, manifest and intermediate files), sharing the
+        pandoc cache.
+        """
+        config = dict(self.config)
+        del config['projects']
+        config['build_folder'] = os.path.join(self.config['build_folder'], name)
+        config['cache_folder'] = os.path.abspath(os.path.join(self.build_folder, self.config.get('cache_folder', 'cache')))
+        config.update(settings)
+        return config
+
+    def init_anchors(self) -> None:
+        """
+        Load anchors index from anchor_file, or the anchors index of each project if configured with projects.
+        """
+        if self.projects and self.parent is None:
+            for project in self.projects.values():
+                project.init_anchors()
+            return
+        self.anchors = mkdocs_translate.translate.load_anchors(self.anchor_file)
+        logger.debug("anchors loaded:" + str(len(self.anchors)))
+
+    def substitutions(self) -> Substitutions:
+        """
+        Substitutions compiled from configuration, compiled again if substitutions configuration was changed.
+        """
+        substitutions = self.config.get('substitutions')
+        if self._substitutions is None or self._substitutions.source != substitutions:
+            self._substitutions = Substitutions(substitutions)
+        return self._substitutions
+
+    def role_lexer(self) -> tuple:
+        """
+        Inline role lexer compiled from extlinks configuration, compiled again if extlinks configuration was changed.
+        """
+        extlinks = self.config.get('extlinks') or {}
+        if self._role_lexer is None or self._role_lexer[0] != extlinks:
+            self._role_lexer = (dict(extlinks), mkdocs_translate.translate.inline_role_lexer(extlinks))
+        return self._role_lexer[1]
+
+    def project_sessions(self) -> list['Session']:
+        """
+        Sessions for each configured project, or this session if not configured with projects.
+        """
+        if self.projects and self.parent is None:
+            return list(self.projects.values())
+        return [self]
+
+    def project_session(self, path: str) -> 'Session':
+        """
+        Session for project containing path (in rst or docs folder), or this session if not found.
+
+        :param path: rst or markdown file
+        :return: project session
+        """
+        path = os.path.normpath(path)
+        for project in self.projects.values():
+            for folder in (project.rst_folder, project.docs_folder):
+                if path == folder or path.startswith(folder + os.sep):
+                    return project
+        return self
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator['Session']:
+        """
+        Use this session for module functions called in the current thread or asyncio task.
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def convert_rst(self, rst_file: str) -> str:
+        """
+        Convert rst file to markdown file, see translate.convert_rst().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.convert_rst(rst_file)
+
+    def convert_rst_batch(self, rst_files: list[str], jobs: int = 1) -> list[tuple[str, str, str]]:
+        """
+        Convert batch of rst files to markdown, see translate.convert_rst_batch().
+        """
+        with self.activate():
+            return list(mkdocs_translate.translate.convert_rst_batch(rst_files, jobs))
+
+    def convert_markdown(self, md_file: str) -> str:
+        """
+        Convert markdown file to html file for translation, see translate.convert_markdown().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.convert_markdown(md_file)
+
+    def convert_html(self, html_file: str) -> str:
+        """
+        Convert html file to markdown file after translation, see translate.convert_html().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.convert_html(html_file)
+
+    def deepl_document(self, en_html: str, fr_html: str):
+        """
+        Submit english html file to deepl for translation, see translate.deepl_document().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.deepl_document(en_html, fr_html)
+
+    def collect_paths(self, paths: list[str], extension: str, include: bool) -> list[str]:
+        """
+        Collect files matching paths, see translate.collect_paths().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.collect_paths(paths, extension, include)
+
+    def scan_index_rst(self, rst_file: str) -> str:
+        """
+        Scan rst file for anchors and headings, see translate.scan_index_rst().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.scan_index_rst(self.rst_folder, rst_file)
+
+    def scan_download_rst(self, rst_file: str) -> set[str]:
+        """
+        Scan rst file for download directives, see translate.scan_download_rst().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.scan_download_rst(self.rst_folder, rst_file)
+
+    def scan_depends_rst(self, rst_file: str) -> dict[str, list[str]]:
+        """
+        Scan rst file for dependencies, see translate.scan_depends_rst().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.scan_depends_rst(self.rst_folder, rst_file)
+
+    def scan_toctree(self, toctree_rst_file: str) -> object:
+        """
+        Scan rst file for toctree navigation, see translate.scan_toctree().
+        """
+        with self.activate():
+            return mkdocs_translate.translate.scan_toctree(toctree_rst_file)
+
+
+# session used when no other session has been activated
+_default: Session = Session(configure=False)
+
+_current: contextvars.ContextVar = contextvars.ContextVar('session', default=None)
+
+
+def current_session() -> Session:
+    """
+    Session activated for the current thread or asyncio task, or the default session.
+    """
+    session = _current.get()
+    if session is None:
+        return _default
+    return session
+
+
+def default_session() -> Session:
+    """
+    Default session, used by module functions (and the command line) when no other session is activated.
+    """
+    return _default
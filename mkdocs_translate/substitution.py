@@ -0,0 +1,109 @@
+"""
+Substitution table for rst_epilog `|substitutions|` and the `|version|` and `|release|` macros.
+
+The table is compiled once into a single alternation, so each `|name|` token is replaced in one scan of the
+document. Substitution references that are not in the table (and not defined by the document itself) are
+collected so they can be reported, rather than passed to pandoc silently.
+"""
+# message/substitution.py
+
+import logging
+import re
+
+from mkdocs_translate import __app_name__
+
+logger = logging.getLogger(__app_name__)
+
+# macros replaced unless defined by substitutions configuration
+MACROS = {
+    'version': '{{ version }}',
+    'release': '{{ release }}'
+}
+
+# substitution reference not in table: name starting with a word character, without trailing whitespace,
+# and not part of a longer run of | separated text
+UNKNOWN_REFERENCE = r"(?<![\w|`])\|(\w(?:[^|`\n]*?[^\s|`])?)\|(?![\w|])"
+
+# substitution definition in document: .. |name| image:: ...
+DEFINITION = re.compile(r"^\s*\.\. \|([^|\n]+)\|", re.MULTILINE)
+
+
+class Substitutions:
+    """
+    Substitutions compiled into a single pattern.
+
+    Attributes:
+        source: copy of substitutions configuration compiled, to detect changes to configuration
+        values: replacement text by substitution name
+        pattern: matches substitution names in table (group 1), or other substitution references (group 2)
+    """
+    source: dict
+    values: dict[str, str]
+    pattern: re.Pattern
+
+    def __init__(self, substitutions: dict[str, object] = None):
+        """
+        Compile substitutions configuration.
+
+        Replacement text is resolved as if each substitution was replaced in configuration order,
+        followed by the macros.
+
+        :param substitutions: replacement text by substitution name
+        """
+        self.source = dict(substitutions) if substitutions is not None else None
+        names = list((substitutions or {}).keys())
+        values = {name: str(value) for (name, value) in (substitutions or {}).items()}
+        for (index, name) in enumerate(names):
+            for later in names[index + 1:]:
+                if '|' in values[name]:
+                    values[name] = values[name].replace('|' + later + '|', values[later])
+        for (name, macro) in MACROS.items():
+            for key in values:
+                if '|' in values[key]:
+                    values[key] = values[key].replace('|' + name + '|', macro)
+            values.setdefault(name, macro)
+        self.values = values
+
+        known = '|'.join(re.escape(name) for name in sorted(values, key=len, reverse=True))
+        self.pattern = re.compile(r"\|(" + known + r")\||" + UNKNOWN_REFERENCE)
+
+    def substitute(self, text: str) -> tuple[str, list[str]]:
+        """
+        Replace substitution references in a single scan.
+
+        :param text: rst content
+        :return: rst content, names of substitution references not in table or defined by the document
+        """
+        if '|' not in text:
+            # no processing required
+            return (text, [])
+
+        unknown = set()
+
+        def replace(match: re.Match) -> str:
+            name = match.group(1)
+            if name is not None:
+                return self.values[name]
+            unknown.add(match.group(2))
+            return match.group(0)
+
+        text = self.pattern.sub(replace, text)
+        if unknown:
+            unknown.difference_update(DEFINITION.findall(text))
+        return (text, sorted(unknown))
+
+
+def substitution_report(unknown: dict[str, list[str]]) -> None:
+    """
+    Log substitution references not in substitutions configuration, and the files using them.
+
+    :param unknown: names of unknown substitution references by rst file
+    """
+    files: dict[str, list[str]] = {}
+    for (rst_file, names) in sorted(unknown.items()):
+        for name in names:
+            files.setdefault(name, []).append(rst_file)
+
+    for (name, rst_files) in sorted(files.items()):
+        used = ', '.join(rst_files[:3]) + (', ...' if len(rst_files) > 3 else '')
+        logger.warning(f"unknown substitution |{name}| in {len(rst_files)} file(s): {used}")
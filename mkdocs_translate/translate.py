@@ -1,30 +1,70 @@
+import contextvars
 import errno
 import glob
+import io
 import logging
 import os
 import pkgutil
 import re
 import shutil
-import subprocess
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
+from typing import Iterable
+from typing import Iterator
 
 import deepl
 import yaml
 
+import mkdocs_translate.backend
+import mkdocs_translate.cache
+import mkdocs_translate.fastpath
+import mkdocs_translate.pandoc_ast
+import mkdocs_translate.session
 from mkdocs_translate import __app_name__
+from .list_table import inline_markdown
+from .list_table import parse_list_table
 
 logger = logging.getLogger(__app_name__)
 
-# global configuration setup by cli._config_callback
-config: dict = {}
-docs_folder: str = None
-rst_folder: str = None
-upload_folder: str = None
-convert_folder: str = None
-download_folder: str = None
-anchor_file: str = None
 
-anchors: dict = {}
+# deprecated module attributes, read from the current session
+SESSION_ATTRIBUTES = ['config_path', 'config', 'docs_folder', 'rst_folder', 'build_folder', 'upload_folder',
+                      'convert_folder', 'download_folder', 'anchor_file', 'anchors', 'keep_temp']
+
+
+def __getattr__(name: str) -> object:
+    """
+    Deprecated module attributes config, docs_folder, rst_folder, anchors, keep_temp, ... of the current session.
+
+    Use mkdocs_translate.session.current_session() instead, see session.py. These attributes are read only,
+    assigning a module attribute does not change the session.
+    """
+    if name in SESSION_ATTRIBUTES:
+        warnings.warn(f"translate.{name} is deprecated, use current_session().{name}", DeprecationWarning,
+                      stacklevel=2)
+        return getattr(mkdocs_translate.session.current_session(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# default minimum lines in a chunk, when splitting large rst files for conversion
+CHUNK_LINES = 2000
+
+# placeholder heading text used to convert chunks
+CHUNK_HEADING = 'mkdocstranslatechunk'
+
+# content requiring the complete file for conversion: substitutions, footnotes, citations, targets and references,
+# and toctree entries (duplicates are listed once per file)
+CHUNK_UNSAFE = re.compile(
+    r"^\s*\.\. (\||\[|__:|_[^:\n]+:[ \t]+\S|toctree::)|\]_|`[^`<>]+`_(?!_)|(?<![\w`])\w[\w.-]*_(?![\w])|^__ ",
+    flags=re.MULTILINE
+)
+
+# configuration settings that may be changed on the command line, passed to worker processes
+CLI_CONFIG_KEYS = ['pandoc_ast', 'fast_path']
 
 md_extensions_to = 'markdown+definition_lists+fenced_divs+backtick_code_blocks+fenced_code_attributes+pipe_tables-simple_tables-multiline_tables'
 md_extensions_from = 'markdown+definition_lists+fenced_divs+backtick_code_blocks+fenced_code_attributes+pipe_tables'
@@ -69,39 +109,7 @@ def init_config(override_path: str) -> None:
     Initialize using provided config
     :param override_path: Overide config location, or None to use built-in default configuration
     """
-    global config
-    global docs_folder
-    global upload_folder
-    global convert_folder
-    global download_folder
-    global rst_folder
-    global anchor_file
-
-    config = load_config(override_path)
-
-    docs_folder = os.path.normpath(os.path.join(config['project_folder'], config['docs_folder']))
-    upload_folder = os.path.normpath(os.path.join(config['project_folder'], config['build_folder'], config['upload_folder']))
-    convert_folder = os.path.normpath(os.path.join(config['project_folder'], config['build_folder'], config['convert_folder']))
-    download_folder = os.path.normpath(os.path.join(config['project_folder'], config['build_folder'], config['download_folder']))
-    anchor_file = os.path.normpath(os.path.join(convert_folder, config['anchor_file']))
-
-    rst_folder = docs_folder
-    if 'rst_folder' in config:
-        rst_folder = os.path.normpath(os.path.join(config['project_folder'], config['rst_folder']))
-
-    if not os.path.exists(docs_folder):
-        logger.debug(f"The docs folder does not exist at location: {docs_folder}")
-
-    if not os.path.exists(rst_folder):
-        logger.debug(f"The rst folder does not exist at location: {rst_folder}")
-
-    logger.debug('--- start configuration ---')
-    logger.debug('docs folder: %s', docs_folder)
-    logger.debug(' rst folder: %s', rst_folder)
-    logger.debug('     upload: %s', upload_folder)
-    logger.debug('   download: %s', download_folder)
-    logger.debug('    anchors: %s', anchor_file)
-    logger.debug('--- end configuration ---')
+    mkdocs_translate.session.current_session().init_config(override_path)
     return
 
 
@@ -125,10 +133,7 @@ def load_anchors(anchor_txt: str) -> dict[str, str]:
 
 
 def init_anchors():
-    global anchors
-    global anchor_file
-    anchors = load_anchors(anchor_file)
-    logging.debug("anchors loaded:" + str(len(anchors)))
+    mkdocs_translate.session.current_session().init_anchors()
 
 
 def collect_path(path: str, extension: str, include: bool) -> list[str]:
@@ -184,14 +189,11 @@ def scan_index_rst(base_path: str, rst_file: str) -> str:
     if not common_path:
         raise FileNotFoundError(errno.ENOENT, f"RST base_path '{base_path}' does not contain rst_file: '{rst_file}'")
 
-    with open(rst_file, 'r') as file:
-        text = file.read()
-
     relative_path = rst_file[len(base_path):]
     doc = relative_path
     ref = None
     heading = None
-    index = ''
+    index = []
 
     with open(rst_file, 'r') as file:
         text = file.read()
@@ -210,18 +212,18 @@ def scan_index_rst(base_path: str, rst_file: str) -> str:
                 anchor = ref
                 if doc:
                     # reference to doc heading, no need for anchor
-                    index += ref + '=' + relative_path + "\n"
+                    index.append(ref + '=' + relative_path + "\n")
                 else:
-                    index += ref + '=' + relative_path + '#' + ref + "\n"
-                index += ref + '.title=' + heading + "\n"
+                    index.append(ref + '=' + relative_path + '#' + ref + "\n")
+                index.append(ref + '.title=' + heading + "\n")
                 ref = None
 
         if doc:
             heading = scan_heading(i, lines)
             if heading:
                 logging.debug(" +- page:" + heading)
-                index += doc + '=' + relative_path + "\n"
-                index += doc + '.title=' + heading + "\n"
+                index.append(doc + '=' + relative_path + "\n")
+                index.append(doc + '.title=' + heading + "\n")
                 doc = None
 
         match = re.search(r'\.\. _((\w|\.|_|-)*):$', line)
@@ -232,7 +234,7 @@ def scan_index_rst(base_path: str, rst_file: str) -> str:
             ref = match.group(1)
             logging.debug(" |   ref:" + ref)
 
-    return index
+    return ''.join(index)
 
 
 def scan_heading(index: int, lines: list[str]) -> str:
@@ -296,13 +298,14 @@ def _doc_title(rst_path: str, doc_link: str) -> str:
     :param doc_link: doc link (may be absolute or relative)
     :return: title, based n looking up definitive path in anchors.txt index
     """
+    session = mkdocs_translate.session.current_session()
     definitive_path = _doc_location(rst_path, doc_link)
     # example:
     #   /install-guide/loading-samples.rst=/install-guide/loading-samples.rst
     #   /install-guide/loading-samples.rst.title=Loading templates and sample data
     title_key = definitive_path + '.title'
-    if title_key in anchors:
-        return anchors[title_key]
+    if title_key in session.anchors:
+        return session.anchors[title_key]
     else:
         label = _label(doc_link)
         logger.warning(rst_path + ": broken doc '" + doc_link + "' title:" + label)
@@ -319,6 +322,7 @@ def _doc_location(rst_path: str, doc_link: str) -> str:
     :param doc_link: documentation link (may be absolute or relative)
     :return: definitive path to rst, indicating location relative to source folder. Used for looking up title.
     """
+    session = mkdocs_translate.session.current_session()
     doc_link = doc_link.strip()
     if not doc_link.endswith('.rst'):
         doc_link = doc_link + '.rst'
@@ -327,10 +331,10 @@ def _doc_location(rst_path: str, doc_link: str) -> str:
         definitive_path = doc_link
     else:
         rst_path_dir = os.path.dirname(rst_path)
-        definitive_rst_path_dir = os.path.relpath(rst_path_dir, rst_folder)
+        definitive_rst_path_dir = os.path.relpath(rst_path_dir, session.rst_folder)
         definitive_path = os.path.normpath(os.path.join(definitive_rst_path_dir, doc_link))
 
-    rst_file_path = os.path.normpath(os.path.join(rst_folder,definitive_path))
+    rst_file_path = os.path.normpath(os.path.join(session.rst_folder,definitive_path))
     if os.path.exists(rst_file_path) and os.path.isfile(rst_file_path):
         return '/' + definitive_path
     else:
@@ -358,13 +362,17 @@ def _ref_title(reference: str) -> str:
     :param reference: reference to document or heading
     :return: title for reference
     """
+    session = mkdocs_translate.session.current_session()
     title_lookup = reference + ".title"
     title_lookup2 = reference.lower() + ".title"
 
-    if title_lookup in anchors:
-        return anchors[title_lookup]
-    if title_lookup2 in anchors:
-        return anchors[title_lookup2]
+    if title_lookup in session.anchors:
+        return session.anchors[title_lookup]
+    if title_lookup2 in session.anchors:
+        return session.anchors[title_lookup2]
+    title = _project_anchor(title_lookup)
+    if title is not None:
+        return title
     else:
         label = _label(reference)
         logger.warning("broken reference '" + reference + "' title:" + label)
@@ -377,24 +385,59 @@ def _ref_location(reference: str) -> str:
     :param reference: reference to document or heading
     :return: absolute path, indicating location relative to docs folder. Used to determine a relative path.
     """
-    if reference in anchors:
-        return anchors[reference]
-    if reference.lower() in anchors:
-        return anchors[reference.lower()]
+    session = mkdocs_translate.session.current_session()
+    if reference in session.anchors:
+        return session.anchors[reference]
+    if reference.lower() in session.anchors:
+        return session.anchors[reference.lower()]
+    location = _project_anchor(reference)
+    if location is not None:
+        return location
     else:
         link = reference + "-broken.rst"
         logger.warning("broken reference '" + reference + "' link:" + link)
         return link
 
 
+def _project_anchor(key: str) -> str:
+    """
+    Look up reference in the anchors index of other projects, when migrating several projects.
+
+    The reference may be prefixed with project name (example: 'user:installation') to look up a specific project.
+
+    :param key: reference, or reference title
+    :return: title, or absolute path#anchor relative to current project docs folder, None if not found
+    """
+    session = mkdocs_translate.session.current_session()
+    if not session.projects:
+        return None
+
+    projects = [project for project in session.projects.values() if project is not session]
+    if ':' in key and key.split(':', 1)[0] in session.projects:
+        (name, key) = key.split(':', 1)
+        projects = [session.projects[name]]
+
+    for project in projects:
+        for lookup in (key, key.lower()):
+            if lookup in project.anchors:
+                value = project.anchors[lookup]
+                if lookup.endswith('.title') or not value.startswith('/'):
+                    return value
+                # location relative to current project, docs folders are assumed to be published side by side
+                location = os.path.join(os.path.relpath(project.docs_folder, session.docs_folder), value[1:])
+                return '/' + os.path.normpath(location)
+    return None
+
+
 def _ref_path(rst_path: str, reference: str) -> str:
     """
     Generate a relative link for the provided reference.
     """
+    session = mkdocs_translate.session.current_session()
     logging.debug("ref: " + reference)
     ref_location = _ref_location(reference)
 
-    rst_location = os.path.relpath(os.path.dirname(rst_path), rst_folder)
+    rst_location = os.path.relpath(os.path.dirname(rst_path), session.rst_folder)
     if ref_location.startswith("/"):
         ref_location = ref_location[1:]
 
@@ -485,6 +528,96 @@ def _download_path(path: str, download: str) -> str:
     else:
         return reference
 
+#
+# DEPENDENCY SCAN
+#
+def scan_depends_rst(base_path: str, rst_file: str) -> dict[str, list[str]]:
+    """
+    Scan through rst_file for content used from other files, producing a dependency graph entry.
+
+    Dependencies are recorded by kind:
+
+    * ref: references looked up in anchors.txt index for link and title
+    * doc: title lookup in anchors.txt index
+    * include: include and literalinclude file paths, relative to base_path
+    * toctree: page title lookup in anchors.txt index
+
+    :return: dependencies by kind
+    """
+    if not os.path.exists(base_path):
+        raise FileNotFoundError(errno.ENOENT, f"RST base_path does not exist at location: {base_path}")
+
+    common_path = os.path.commonpath([base_path, rst_file])
+    if not common_path:
+        raise FileNotFoundError(errno.ENOENT, f"RST base_path '{base_path}' does not contain rst_file: '{rst_file}'")
+
+    with open(rst_file, 'r') as file:
+        text = file.read()
+
+    refs: set[str] = set()
+    docs: set[str] = set()
+    includes: set[str] = set()
+    toctree: set[str] = set()
+
+    if ':ref:' in text or ':doc:' in text:
+        # same lexer and role content forms as _preprocess_rst_roles, _role_ref and _role_doc
+        (pattern, handlers) = mkdocs_translate.session.current_session().role_lexer()
+        for match in pattern.finditer(text):
+            (role, content) = match.groups()
+            if role == 'ref':
+                named = ROLE_REF_NAMED.fullmatch(content)
+                if named:
+                    refs.add(named.group(2))
+                elif ROLE_REF_SIMPLE.fullmatch(content):
+                    refs.add(content)
+            elif role == 'doc' and not ROLE_DOC_NAMED.fullmatch(content):
+                # only simple doc references look up title
+                simple = ROLE_DOC_SIMPLE.fullmatch(content)
+                if simple:
+                    docs.add(_doc_location(rst_file, simple.group(1)) + '.title')
+
+    rst_dir = os.path.dirname(rst_file)
+    for match in re.finditer(r"^\s*\.\. (include|literalinclude)::(.*)$", text, flags=re.MULTILINE):
+        include = match.group(2).strip()
+        if not include:
+            continue
+        if include[0:1] == '/':
+            # sphinx-build leading slash indicates root of source folder
+            include_file = os.path.join(base_path, include[1:])
+        else:
+            include_file = os.path.join(rst_dir, include)
+        includes.add(os.path.relpath(os.path.normpath(include_file), base_path))
+
+    if '.. toctree::' in text:
+        in_toctree = False
+        for line in text.splitlines():
+            if line.startswith('.. toctree::'):
+                in_toctree = True
+                continue
+            if not in_toctree:
+                continue
+            if len(line.strip()) == 0 or line.strip()[0:1] == ':':
+                continue
+            if not line.startswith('   '):
+                in_toctree = False
+                continue
+
+            parse = _nav_rst_link(rst_file, line)
+            if '*' in parse.link:
+                search_path = os.path.normpath(os.path.join(rst_dir, parse.link))
+                for match_file in glob.glob(search_path, recursive=False):
+                    if match_file.endswith('.rst') and match_file != rst_file:
+                        toctree.add('/' + os.path.relpath(match_file, base_path) + '.title')
+            elif not parse.toc_title:
+                toctree.add(parse.index + '.title')
+
+    return {
+        'ref': sorted(refs),
+        'doc': sorted(docs),
+        'include': sorted(includes),
+        'toctree': sorted(toctree)
+    }
+
 #
 # toctree scan
 #
@@ -604,13 +737,14 @@ class Link:
     title: str
 
     def __init__(self, base_rst:str, link:str,toc_title:str):
+        session = mkdocs_translate.session.current_session()
         self.base = base_rst
         self.link = link
         self.link_rst = link + '.rst'
         self.link_md = link + '.md'
         self.file = os.path.normpath(os.path.join(os.path.dirname(base_rst), self.link_rst))
-        self.nav = _relpath(self.file,rst_folder)[:-4]+'.md'
-        self.index = '/' + os.path.relpath(self.file, rst_folder)
+        self.nav = _relpath(self.file,session.rst_folder)[:-4]+'.md'
+        self.index = '/' + os.path.relpath(self.file, session.rst_folder)
         self.toc_title = toc_title
 
     def __str__(self):
@@ -618,13 +752,14 @@ class Link:
 
     def title(self) -> str:
         # check toctree title
+        session = mkdocs_translate.session.current_session()
         if self.toc_title:
             return self.toc_title
 
         # check page title
         title_key = self.index + '.title'
-        if title_key in anchors:
-            return anchors[title_key]
+        if title_key in session.anchors:
+            return session.anchors[title_key]
 
         # placeholder label
         label = _label(self.index)
@@ -637,8 +772,9 @@ class Link:
 
         :return: nav title, or empty string if not provided.
         """
-        if 'nav' in config:
-            nav: dict[str, str] = config['nav']
+        session = mkdocs_translate.session.current_session()
+        if 'nav' in session.config:
+            nav: dict[str, str] = session.config['nav']
             if self.nav in nav:
                 return nav[self.nav]
         return ''
@@ -733,8 +869,9 @@ def _nav_link(toctree_rst_file, toc_reference):
     """
     Determin mkdocs nav link for provided toctree toc_reference.
     """
+    session = mkdocs_translate.session.current_session()
     path = os.path.normpath(os.path.join(os.path.dirname(toctree_rst_file),toc_reference))
-    return os.path.relpath(path,rst_folder) + '.md'
+    return os.path.relpath(path,session.rst_folder) + '.md'
 
 def _nav_title(nav_link: str) -> str:
     """
@@ -742,8 +879,9 @@ def _nav_title(nav_link: str) -> str:
 
     return config['nav] override if available, or empty str
     """
-    if 'nav' in config:
-        nav:dict[str,str] = config['nav']
+    session = mkdocs_translate.session.current_session()
+    if 'nav' in session.config:
+        nav:dict[str,str] = session.config['nav']
         if nav_link in nav:
             return nav[nav_link]
     return ''
@@ -752,16 +890,17 @@ def _nav_reference_file(rst_file) -> str:
     """
     Convert rst file to mkdocs nav link (complete with .md suffix).
     """
+    session = mkdocs_translate.session.current_session()
     if rst_file.endswith('.rst'):
         rst_file = rst_file[:-4]
 
 
-    rst_path = os.path.relpath(rst_file,rst_folder)
+    rst_path = os.path.relpath(rst_file,session.rst_folder)
     if os.path.dirname(rst_path) == '.':
         reference = os.path.basename(rst_path)
     else:
         reference = rst_path
-    rst_path2 = _relpath(rst_path,rst_folder)
+    rst_path2 = _relpath(rst_path,session.rst_folder)
 
     return reference + '.md'
 
@@ -775,6 +914,17 @@ def _nav_reference_link(rst_dir,link) -> str:
 #
 # RST PANDOC CONVERSION
 #
+def pandoc_version() -> str:
+    """
+    Look up pandoc version (used to detect when conversion results may change), once for each session backend.
+
+    :return: pandoc version, or 'unknown' if pandoc is not available
+    """
+    session = mkdocs_translate.session.current_session().root
+    if session.pandoc_version is None:
+        session.pandoc_version = mkdocs_translate.backend.pandoc_backend().version()
+    return session.pandoc_version
+
 def convert_rst(rst_file: str) -> str:
     """
     Use pandoc to convert rich-structured-text file to markdown file for mkdocs
@@ -788,55 +938,363 @@ def convert_rst(rst_file: str) -> str:
         raise FileNotFoundError(errno.ENOENT, f"reStructuredText 'rst' extension required:", rst_file)
 
     # file we are generating
+    md_file = markdown_path(rst_file)
+
+    with open(rst_file, 'r') as file:
+        text = file.read()
+
+    clean = convert_rst_text(rst_file, md_file, text)
+
+    md_dir = os.path.dirname(md_file)
+    if not os.path.exists(md_dir):
+        print("mkdocs markdown directory:", md_dir)
+        os.makedirs(md_dir, exist_ok=True)
+
+    # unchanged markdown is not written, preserving modification time
+    if write_text(md_file, clean):
+        shutil.copystat(rst_file, md_file)
+
+    return md_file
+
+
+def markdown_path(rst_file: str) -> str:
+    """
+    Markdown file generated for rst file, in docs folder.
+
+    :param rst_file: rst file
+    :return: markdown file path
+    """
+    session = mkdocs_translate.session.current_session()
     md_file = rst_file.replace(".rst", ".md").replace(".txt", ".md")
 
-    if md_file.startswith(rst_folder) and rst_folder != docs_folder:
-        md_file = md_file.replace(rst_folder, docs_folder, 1)
+    if md_file.startswith(session.rst_folder) and session.rst_folder != session.docs_folder:
+        md_file = md_file.replace(session.rst_folder, session.docs_folder, 1)
+    return md_file
 
-    # temp file for processing
-    md_tmp_file = re.sub("^" + config['rst_folder'] + "/", convert_folder + '/', rst_file)
-    md_tmp_file = md_tmp_file.replace(".txt", ".md")
-    md_tmp_file = md_tmp_file.replace(".rst", ".md")
-    md_tmp_file = md_tmp_file.replace(".md", ".tmp.md")
 
-    convert_directory = os.path.dirname(md_tmp_file)
-    if not os.path.exists(convert_directory):
-        logger.info("Creating conversion directory '" + convert_directory + "'")
-        os.makedirs(convert_directory)
+def convert_rst_text(rst_file: str, md_file: str, text: str) -> str:
+    """
+    Use pandoc to convert rst content to markdown content for mkdocs, including front matter.
 
-    rst_prep = re.sub(r"\.md", r".prep.rst", md_tmp_file)
+    :param rst_file: rst file being converted, used to resolve relative links
+    :param md_file: markdown file being generated, used to resolve relative links
+    :param text: rst content
+    :return: markdown content
+    """
+    session = mkdocs_translate.session.current_session()
+    chunks = split_rst_chunks(text, int(session.config.get('chunk_lines', CHUNK_LINES)))
+    if len(chunks) == 1:
+        (rst_prep, markdown, clean) = _convert_rst_text(rst_file, md_file, text)
+    else:
+        logging.debug("Converting '" + rst_file + "' in " + str(len(chunks)) + " chunks")
+        # chunks are converted in the caller's context, so any context pandoc backend is used
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(
+                lambda context, chunk: context.run(_convert_rst_text, rst_file, md_file, *chunk),
+                contexts,
+                chunks
+            ))
+        rst_prep = '\n'.join(result[0] for result in results)
+        markdown = None if results[0][1] is None else '\n'.join(result[1] for result in results)
+        clean = '\n'.join(result[2] for result in results)
+
+    if session.keep_temp:
+        # temp files for troubleshooting
+        md_tmp_file = re.sub("^" + session.config['rst_folder'] + "/", session.convert_folder + '/', rst_file)
+        md_tmp_file = md_tmp_file.replace(".txt", ".md")
+        md_tmp_file = md_tmp_file.replace(".rst", ".md")
+        md_tmp_file = md_tmp_file.replace(".md", ".tmp.md")
+        _write_temp(re.sub(r"\.md", r".prep.rst", md_tmp_file), rst_prep)
+        if markdown is not None:
+            _write_temp(md_tmp_file, markdown)
+
+    # front matter is added once, after any chunks are combined
+    return _postprocess_macro_header(md_file, clean)
+
+
+def _convert_rst_text(rst_file: str, md_file: str, text: str,
+                      styles: list[tuple[str, bool]] = None, following: tuple[str, bool] = None) -> tuple[str, str, str]:
+    """
+    Convert rst content (complete file or chunk) to markdown, without front matter.
+
+    :param rst_file: rst file being converted, used for preprocessing and messages
+    :param md_file: markdown file being generated
+    :param text: rst content
+    :param styles: heading adornment styles used earlier in file, when converting a chunk
+    :param following: heading adornment style of heading following chunk
+    :return: preprocessed rst, pandoc markdown (None if written from pandoc ast), cleaned markdown
+    """
+    session = mkdocs_translate.session.current_session()
+    # placeholder headings so chunk heading levels, and content ending chunk, match the complete file
+    prologue = ''
+    for (index, style) in enumerate(styles or []):
+        prologue += _chunk_heading(index, style)
+    epilogue = ''
+    if following:
+        epilogue = '\n' + _chunk_heading(len(styles or []), following)
+
+    logging.debug("Preprocessing '" + rst_file + "'")
+    rst_prep = preprocess_rst_text(rst_file, prologue + text + epilogue)
+    if not rst_prep.startswith(prologue) or not rst_prep.endswith(epilogue):
+        raise ValueError("Unable to convert chunk of '" + rst_file + "', use chunk_lines: 0 to convert complete file")
+    chunk = rst_prep
+    rst_prep = rst_prep[len(prologue):len(rst_prep) - len(epilogue)]
+
+    # fast path skips pandoc for simple content, or is verified against pandoc
+    fast_path = session.config.get('fast_path', False)
+    fast = None
+    if fast_path and not session.config.get('pandoc_ast', False):
+        try:
+            fast = _strip_chunk_headings(mkdocs_translate.fastpath.convert_rst_fast(chunk))
+        except mkdocs_translate.fastpath.FastPathUnsupported as reason:
+            logging.debug("Fast path not used for '" + rst_file + "': " + str(reason))
+
+    if fast is not None and fast_path != 'verify':
+        logging.debug("Converting '" + rst_file + "' to markdown using fast path")
+        markdown = fast
+    elif session.config.get('pandoc_ast', False):
+        logging.debug("Converting '" + rst_file + "' to markdown using pandoc ast")
+        clean = _strip_chunk_headings(mkdocs_translate.pandoc_ast.convert_rst_ast(md_file, chunk))
+        return (rst_prep, None, clean)
+    else:
+        logging.debug("Converting '" + rst_file + "' to markdown")
+        markdown = _strip_chunk_headings(pandoc(chunk, "rst", md_extensions_to))
 
-    logging.debug("Preprocessing '" + rst_file + "' to '" + rst_prep + "'")
-    preprocess_rst(rst_file, rst_prep)
+    logging.debug("Postprocessing markdown to '" + md_file + "'")
+    clean = _postprocess_rst_markdown_content(md_file, markdown)
 
-    logging.debug("Converting '" + rst_prep + "' to '" + md_tmp_file + "'")
+    if fast is not None and fast_path == 'verify':
+        diff = mkdocs_translate.fastpath.fast_path_diff(md_file, clean, _postprocess_rst_markdown_content(md_file, fast))
+        if diff:
+            logger.warning("Fast path differs from pandoc for '" + rst_file + "':\n" + diff)
+        else:
+            logger.info("Fast path verified for '" + rst_file + "'")
 
-    completed = subprocess.run(["pandoc",
-                                "--from", "rst",
-                                "--to", md_extensions_to,
-                                "--wrap=none",
-                                "--eol=lf",
-                                "-o", md_tmp_file,
-                                rst_prep
-                                ])
-    if completed.returncode != 0:
-        print(completed)
+    return (rst_prep, markdown, clean)
 
-    if not os.path.exists(md_tmp_file):
-        raise FileNotFoundError(errno.ENOENT, f"Pandoc did not create md file:", md_tmp_file)
 
-    md_dir = os.path.dirname(md_file)
-    if not os.path.exists(md_dir):
-        print("mkdocs markdown directory:", md_dir)
-        os.makedirs(md_dir)
+def split_rst_chunks(text: str, chunk_lines: int) -> list[tuple[str, list[tuple[str, bool]], tuple[str, bool]]]:
+    """
+    Split large rst content into chunks at top-level section boundaries, so chunks may be converted concurrently.
 
-    logging.debug("Preprocessing '" + md_tmp_file + "' to '" + md_file + "'")
-    postprocess_rst_markdown(md_tmp_file, md_file)
-    if not os.path.exists(md_file):
-        raise FileNotFoundError(errno.ENOENT, f"Did not create postprocessed md file:", md_file)
-    shutil.copystat(rst_file, md_file)
+    Headings are detected using scan_heading. Content using substitutions, footnotes, references to
+    targets elsewhere in the file, or toctree directives is not split.
+
+    :param text: rst content
+    :param chunk_lines: minimum number of lines in a chunk, 0 to disable
+    :return: list of chunk content, heading adornment styles used before chunk, and style of following heading
+    """
+    lines = text.splitlines()
+    if chunk_lines <= 0 or len(lines) <= chunk_lines:
+        return [(text, [], None)]
+
+    unsafe = CHUNK_UNSAFE.search(text)
+    if unsafe:
+        logger.debug("Content not split into chunks, due to: " + unsafe.group(0).strip())
+        return [(text, [], None)]
+
+    styles: list[tuple[str, bool]] = []
+    start_styles: list[tuple[str, bool]] = []
+    chunks = []
+    start = 0
+    for index in range(len(lines) - 1):
+        line = lines[index]
+        if not line.strip() or line[0].isspace() or not scan_heading(index, lines):
+            continue
+
+        overline = index > 0 and lines[index - 1].rstrip() == lines[index + 1].rstrip()
+        style = (lines[index + 1][0], overline)
+        before = list(styles)
+        if style not in styles:
+            styles.append(style)
+
+        # section start, including overline and any labels before heading
+        section = index - 1 if overline else index
+        while section > 0 and (not lines[section - 1].strip() or re.match(r'\.\. _[^:]+:$', lines[section - 1])):
+            section -= 1
+        while section < index and not lines[section].strip():
+            section += 1
+
+        if before and styles.index(style) <= 1 and section - start >= chunk_lines:
+            chunks.append(('\n'.join(lines[start:section]) + '\n', start_styles, style))
+            start = section
+            start_styles = before
+
+    if not chunks:
+        return [(text, [], None)]
+
+    chunks.append(('\n'.join(lines[start:]) + '\n', start_styles, None))
+    return chunks
+
+
+def _chunk_heading(index: int, style: tuple[str, bool]) -> str:
+    """
+    Placeholder heading used to convert a chunk.
+    """
+    (char, overline) = style
+    title = CHUNK_HEADING + str(index)
+    heading = char * len(title) + '\n' if overline else ''
+    return heading + title + '\n' + char * len(title) + '\n\n'
+
+
+def _strip_chunk_headings(markdown: str) -> str:
+    """
+    Remove placeholder headings used to convert a chunk.
+    """
+    markdown = re.sub(r"\A(#+ " + CHUNK_HEADING + r"\d+\n\n)+", "", markdown)
+    return re.sub(r"\n*#+ " + CHUNK_HEADING + r"\d+\n\Z", "\n", markdown)
+
+
+def pandoc(text: str, from_format: str, to_format: str) -> str:
+    """
+    Use pandoc to convert text, using the configured pandoc backend (see backend.py).
+
+    Conversion results are cached in the build folder (see cache.py), a cache hit does not run pandoc.
+
+    :param text: content to convert
+    :param from_format: pandoc input format
+    :param to_format: pandoc output format
+    :return: converted content
+    """
+    if mkdocs_translate.cache.cache_size() <= 0:
+        return mkdocs_translate.backend.pandoc_backend().convert(text, from_format, to_format)
+
+    key = mkdocs_translate.cache.cache_key(text, from_format, to_format)
+    output = mkdocs_translate.cache.cache_get(key)
+    if output is None:
+        output = mkdocs_translate.backend.pandoc_backend().convert(text, from_format, to_format)
+        mkdocs_translate.cache.cache_put(key, output)
+    return output
+
+
+def _write_temp(path: str, text: str) -> None:
+    """
+    Write intermediate file for troubleshooting (used when keep_temp is enabled).
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        logger.info("Creating conversion directory '" + directory + "'")
+        os.makedirs(directory, exist_ok=True)
+
+    logging.debug("Intermediate '" + path + "'")
+    write_text(path, text)
+
+
+# process umask, applied to files written by write_text
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def write_text(path: str, text: str) -> bool:
+    """
+    Write text file, skipping the write when content is unchanged so the modification time is preserved.
+
+    Content is written to a temporary file and moved into place, so a partially written file is never left behind.
+
+    :param path: file location
+    :param text: file content
+    :return: True if file was written, False if content was unchanged
+    """
+    if os.path.isfile(path):
+        try:
+            with open(path, 'r', newline='') as file:
+                if file.read() == text.replace('\n', os.linesep):
+                    return False
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    (handle, temp_path) = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(handle, 'w') as file:
+            file.write(text)
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+        else:
+            os.chmod(temp_path, 0o666 & ~_umask)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return True
+
+
+def _init_worker(override_path: str, keep: bool, backend_options: dict, settings: dict) -> None:
+    """
+    Process pool initializer, each worker loads config and anchors once.
+    """
+    session = mkdocs_translate.session.current_session()
+    session.init_config(override_path)
+    for project in [session] + list(session.projects.values()):
+        project.config.update(settings)
+    session.init_anchors()
+    session.keep_temp = keep
+    mkdocs_translate.backend.init_backend(**backend_options)
 
-    return md_file
+
+def _convert_rst_job(rst_file: str) -> tuple[str, str, str, float, list[str]]:
+    """
+    Convert a single rst file, capturing any failure so the rest of the batch can continue.
+
+    :return: tuple of rst_file, md_file (or None if failed), error message (or None if successful), seconds taken,
+             unknown substitutions
+    """
+    start = time.perf_counter()
+    project = mkdocs_translate.session.current_session().project_session(rst_file)
+    try:
+        with project.activate():
+            md_file = convert_rst(rst_file)
+        return (rst_file, md_file, None, time.perf_counter() - start,
+                sorted(project.unknown_substitutions.pop(rst_file, [])))
+    except Exception as error:
+        logger.debug(rst_file + ": conversion failed", exc_info=True)
+        return (rst_file, None, f"{type(error).__name__}: {error}", time.perf_counter() - start,
+                sorted(project.unknown_substitutions.pop(rst_file, [])))
+
+
+def convert_rst_batch(rst_files: list[str], jobs: int = 1, timings: dict[str, float] = None,
+                      unknown: dict[str, list[str]] = None) -> Iterator[tuple[str, str, str]]:
+    """
+    Use pandoc to convert a batch of rst files to markdown, using a process pool for more than one job.
+
+    Results are produced in the same order as rst_files, regardless of the order conversions complete.
+
+    :param rst_files: rst files to convert
+    :param jobs: number of worker processes
+    :param timings: records conversion time of each rst file in seconds, if provided
+    :param unknown: records unknown substitutions used by each rst file, if provided
+    :return: iterator of rst_file, md_file (or None if failed), error message (or None if successful)
+    """
+    for (rst_file, md_file, error, seconds, substitutions) in _convert_rst_jobs(rst_files, jobs):
+        if timings is not None:
+            timings[rst_file] = seconds
+        if unknown is not None and substitutions:
+            unknown[rst_file] = substitutions
+        yield (rst_file, md_file, error)
+
+
+def _convert_rst_jobs(rst_files: list[str], jobs: int) -> Iterator[tuple[str, str, str, float, list[str]]]:
+    """
+    Convert batch of rst files, using a process pool for more than one job, see convert_rst_batch().
+    """
+    session = mkdocs_translate.session.current_session()
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(rst_files) <= 1:
+        for rst_file in rst_files:
+            yield _convert_rst_job(rst_file)
+        return
+
+    workers = min(jobs, len(rst_files))
+    logger.debug("Converting " + str(len(rst_files)) + " files using " + str(workers) + " workers")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(session.config_path, session.keep_temp, mkdocs_translate.backend.pandoc_backend().options(),
+                                       {key: session.config[key] for key in CLI_CONFIG_KEYS if key in session.config})) as executor:
+        futures = [executor.submit(_convert_rst_job, rst_file) for rst_file in rst_files]
+        for future in futures:
+            yield future.result()
 
 
 def preprocess_rst(rst_file: str, rst_prep: str) -> str:
@@ -846,27 +1304,31 @@ def preprocess_rst(rst_file: str, rst_prep: str) -> str:
     with open(rst_file, 'r') as file:
         text = file.read()
 
+    text = preprocess_rst_text(rst_file, text)
+
+    write_text(rst_prep, text)
+
+    return text
+
+
+def preprocess_rst_text(rst_file: str, text: str) -> str:
+    """
+    Pre-process rst content to simplify sphinx-build directives for pandoc conversion
+
+    :param rst_file: rst file location, used to resolve relative links
+    :param text: rst content
+    :return: preprocessed rst content
+    """
+    session = mkdocs_translate.session.current_session()
     # process toc_tree directive into a list of links
     if '.. toctree::' in text:
         text = _preprocess_rst_toctree(rst_file, text)
 
-    text = _preprocess_rst_block_directive(rst_file, text, 'code-block', _block_directive_code)
-    text = _preprocess_rst_block_directive(rst_file, text, 'only', _block_directive_only)
-    text = _preprocess_rst_block_directive(rst_file, text, 'include', _block_directive_include)
-    text = _preprocess_rst_block_directive(rst_file, text, 'literalinclude', _block_directive_literalinclude)
-    text = _preprocess_rst_block_directive(rst_file, text, 'parsed-literal', _block_directive_parsed_literal)
-    text = _preprocess_rst_block_directive(rst_file, text, 'figure', _block_directive_figure)
-    text = _preprocess_rst_block_directive(rst_file, text, 'list-table', _block_directive_list_table)
-
-    # process some things into url links
-    if ':doc:' in text:
-        text = _preprocess_rst_doc(rst_file, text)
+    # process block directives (code-block, only, include, figure, list-table, ...) in a single pass
+    text = _preprocess_rst_directives(rst_file, text)
 
-    if ':ref:' in text:
-        text = _preprocess_rst_ref(rst_file, text)
-
-    if ':download:' in text:
-        text = _preprocess_rst_download(rst_file, text)
+    # process inline roles into url links and markdown emphasis
+    text = _preprocess_rst_roles(rst_file, text)
 
     # strip unsupported things
     if '.. index::' in text:
@@ -878,47 +1340,6 @@ def preprocess_rst(rst_file: str, rst_prep: str) -> str:
     if text.startswith('.. _'):
        text = text.split('\n',2)[2]
 
-    # gui-label and menuselection represented: **Cancel**
-    text = re.sub(
-        r":guilabel:`(.*?)`",
-        r"**\1**",
-        text,
-        flags=re.MULTILINE
-    )
-    text = re.sub(
-        r":menuselection:`(.*?)`",
-        r"**\1**",
-        text,
-        flags=re.MULTILINE
-    )
-
-    # command represented: ***mkdir***
-    text = re.sub(
-        r":command:`(.*?)`",
-        r"***\1***",
-        text,
-        flags=re.MULTILINE
-    )
-
-    # file path represented: **`path`**
-
-    if ":file:" in text:
-        file_pattern: Pattern = re.compile(r":file:`(.*?)`")
-        text = file_pattern.sub(
-            lambda match: "**`"+match.group(1)+"`**",
-            text
-        )
-
-
-    # kbd input represented with as literal text in by mkdocs
-    # physical keys represented with +++ctrl+alt+del++
-    text = re.sub(
-        r":kbd:`(.*?)`",
-        r"`\1`",
-        text,
-        flags=re.MULTILINE
-    )
-
     # for monosapce markdown prefers double backticks (which allows single backtick to be used within text)
     # very simple literals: `some text` should use ``some text``
     #
@@ -931,63 +1352,13 @@ def preprocess_rst(rst_file: str, rst_prep: str) -> str:
     #     flags=re.MULTILINE
     # )
 
-    # static - rst_epilog stuff from config.py
-    if 'substitutions' in config:
-        replace: dict[str, str] = config['substitutions']
-        for (key, value) in replace.items():
-            text = text.replace('|' + key + '|', str(value))
-
-    # dynamic - macros
-    if '|version|' in text:
-        text = text.replace('|version|', '{{ version }}')
-    if '|release|' in text:
-        text = text.replace('|release|', '{{ release }}')
-
-    # external links
-    if 'extlinks' in config:
-        extlinks: dict = config['extlinks']
-        for key in extlinks.keys():
-            ext = ':'+key+':'
-
-            if ext in text:
-                definition:str = extlinks[key]
-                definition_split = definition.split('|')
-                if len(definition_split) == 2:
-                    link = definition_split[0]
-                    label = definition_split[1]
-                else:
-                    link = definition_split[0]
-                    label = '%s'
-
-                if label == "raw":
-                    # raw
-                    ext_reference = re.compile(r':' + key + r':`(.*?)\s+<(.*?)>`')
-                    text = ext_reference.sub(
-                        lambda match: link.replace(r'%s', match.group(2)),
-                        text
-                    )
-                    ext_reference = re.compile(r':' + key + r':`(.*?)`')
-                    text = ext_reference.sub(
-                        lambda match: link.replace(r'%s', match.group(1)),
-                        text
-                    )
-                else:
-                    # match :key:`link <url>` first
-                    ext_reference = re.compile(r':' + key + r':`(.*?)\s+<(.*?)>`')
-                    text = ext_reference.sub(
-                        lambda match: "`" + match.group(1) + " <" + link.replace(r'%s', match.group(2)) + ">`_",
-                        text
-                    )
-                    # match :key:`<url>` second
-                    # match :key:`<url>` second
-                    ext_reference = re.compile(r':' + key + r':`(.*?)`')
-                    text = ext_reference.sub(
-                        lambda match: "`" + label.replace(r'%s', match.group(1)) + " <" + link.replace(r'%s', match.group(1)) + ">`_",
-                        text
-                    )
-
-    with open(rst_prep, 'w') as rst:
-        rst.write(text)
+    # static - rst_epilog stuff from config.py, and dynamic - macros
+    (text, unknown) = session.substitutions().substitute(text)
+    if unknown:
+        logger.debug(rst_file + ": unknown substitutions " + ', '.join(unknown))
+        session.unknown_substitutions.setdefault(rst_file, set()).update(unknown)
+
+    return text
 
 def _block_directive_code(file_path: str, value: str, arguments: dict[str, str], block: str, indent: str) -> str:
     """
@@ -1002,98 +1373,192 @@ def _block_directive_code(file_path: str, value: str, arguments: dict[str, str],
         raw += f"{indent}   {indent}:{key}: {value}\n"
 
     raw += f"{indent}\n"
-
-    for item in block.splitlines():
-        raw += item + '\n'
-
+    raw += ''.join(item + '\n' for item in block.splitlines())
     raw += indent + '\n'
     return raw
 
-def _preprocess_rst_download(path:str, text:str) -> str:
+# role content forms, matched against the content between role backticks
+ROLE_DOWNLOAD_NAMED = re.compile(r"(.*?) <((\w|-|_|/|\.)*?)>")
+ROLE_DOWNLOAD_SIMPLE = re.compile(r"((\w|-|_|/|\.)*?)")
+ROLE_DOC_NAMED = re.compile(r"(.+?) <(.+?)(\.rst)?>")
+ROLE_DOC_SIMPLE = re.compile(r"((\w|-|_)*?)(\.rst)?")
+ROLE_REF_NAMED = re.compile(r"(.*?) <((?:\w+:)?(?:\w|-)*)>")
+ROLE_REF_SIMPLE = re.compile(r"((?:\w+:)?(?:\w|-)*?)")
+ROLE_EXTLINK_NAMED = re.compile(r"(.*?)\s+<(.*?)>")
+
+
+def _role_download(path: str, content: str) -> str:
     """
-    Preprocess rst content replacing download references with links:
+    Replace download reference with link:
 
     relative download links within mkdocs folder should work.
 
     relative download links external to docs folder should go to source code,
     which we will need to copy into a downloads folder.
     """
-    # download links processed in order from most to least complicated
     # :download:`normal <link>`
-    named_download = re.compile(r":download:`(.*?) <((\w|-|_|/|\.)*?)>`")
-    text = named_download.sub(
-        lambda match: "`" + match.group(1) + " <" + _download_path( path, match.group(2)) + ">`__",
-        text
-    )
+    match = ROLE_DOWNLOAD_NAMED.fullmatch(content)
+    if match:
+        return "`" + match.group(1) + " <" + _download_path(path, match.group(2)) + ">`__"
 
     # :download:`simple`
-    simple_reference = re.compile(r":download:`((\w|-|_|/|\.)*?)`")
-    text = simple_reference.sub(
-        lambda match: "`" + os.path.basename(match.group(1)) + " <" + _download_path(path, match.group(1)) + ">`__",
-        text
-    )
-    return text
+    match = ROLE_DOWNLOAD_SIMPLE.fullmatch(content)
+    if match:
+        return "`" + os.path.basename(match.group(1)) + " <" + _download_path(path, match.group(1)) + ">`__"
+    return None
 
-def _preprocess_rst_doc(path: str, text: str) -> str:
 
+def _role_doc(path: str, content: str) -> str:
     """
-    Preprocess rst content replacing doc references with links.
+    Replace doc reference with link.
     """
-    global anchors
-
-    # doc links processed in order from most to least complicated
-
-    # :doc:`normal <../folder/index.rst>`
-    # :doc:`normal <link.rst>`
-    # :doc:`normal <link>`
-    # `normal <../folder/index.rst>`
-    # `normal <link.rst>`
-    # `normal <link.rst>`
-    text = re.sub(
-        r":doc:`(.+?) <(.+?)(\.rst)?>`",
-        r"`\1 <\2.rst>`_",
-        text,
-        flags=re.MULTILINE
-    )
+    # :doc:`normal <../folder/index.rst>` -> `normal <../folder/index.rst>`
+    # :doc:`normal <link.rst>` -> `normal <link.rst>`
+    # :doc:`normal <link>` -> `normal <link.rst>`
+    match = ROLE_DOC_NAMED.fullmatch(content)
+    if match:
+        return "`" + match.group(1) + " <" + match.group(2) + ".rst>`_"
 
-    # :doc:`../folder/index.rst`
-    # :doc:`simple.rst`
-    # `title <../folder/index.rst>`_
-    # `title <simple.rst>`_
-    document_reference = re.compile(r":doc:`((\w|-|_)*?)(\.rst)?`")
-    text = document_reference.sub(
-        lambda match: "`" + _doc_title(path, match.group(1)) + " <" + match.group(1) + ".rst>`_",
-        text
-    )
-    return text
+    # :doc:`simple.rst` -> `title <simple.rst>`_
+    match = ROLE_DOC_SIMPLE.fullmatch(content)
+    if match:
+        return "`" + _doc_title(path, match.group(1)) + " <" + match.group(1) + ".rst>`_"
+    return None
 
 
-def _preprocess_rst_ref(path: str, text: str) -> str:
+def _role_ref(path: str, content: str) -> str:
     """
-    Preprocess rst content replacing ref references with links.
+    Replace ref reference with link.
     """
-    # ref links processed in order from most to least complicated
     # :ref:`normal <link>`
-    named_reference = re.compile(r":ref:`(.*?) <((\w|-)*)>`")
-    text = named_reference.sub(
-        lambda match: "`" + match.group(1) + " <" + _ref_path(path, match.group(2)) + ">`_",
-        text
-    )
+    # :ref:`normal <project:link>` (when migrating several projects)
+    match = ROLE_REF_NAMED.fullmatch(content)
+    if match:
+        return "`" + match.group(1) + " <" + _ref_path(path, match.group(2)) + ">`_"
 
     # :ref:`simple`
-    simple_reference = re.compile(r":ref:`((\w|-)*?)\`")
-    text = simple_reference.sub(
-        lambda match: "`" + _ref_title(match.group(1)) + " <" + _ref_path(path, match.group(1)) + ">`_",
-        text
-    )
+    match = ROLE_REF_SIMPLE.fullmatch(content)
+    if match:
+        return "`" + _ref_title(match.group(1)) + " <" + _ref_path(path, match.group(1)) + ">`_"
+    return None
 
-    return text
+
+def _role_strong(path: str, content: str) -> str:
+    """
+    gui-label and menuselection represented: **Cancel**
+    """
+    return "**" + content + "**"
+
+
+def _role_command(path: str, content: str) -> str:
+    """
+    command represented: ***mkdir***
+    """
+    return "***" + content + "***"
+
+
+def _role_file(path: str, content: str) -> str:
+    """
+    file path represented: **`path`**
+    """
+    return "**`" + content + "`**"
+
+
+def _role_kbd(path: str, content: str) -> str:
+    """
+    kbd input represented with as literal text in by mkdocs
+    physical keys represented with +++ctrl+alt+del++
+    """
+    return "`" + content + "`"
+
+
+def _role_extlink(definition: str) -> Callable[[str, str], str]:
+    """
+    Handler for extlinks role, definition is a link with optional label (separated by `|`).
+
+    A label of `raw` replaces the role with the link itself.
+    """
+    definition_split = definition.split('|')
+    if len(definition_split) == 2:
+        link = definition_split[0]
+        label = definition_split[1]
+    else:
+        link = definition_split[0]
+        label = '%s'
+
+    def extlink(path: str, content: str) -> str:
+        # match :key:`link <url>` first
+        match = ROLE_EXTLINK_NAMED.fullmatch(content)
+        if label == "raw":
+            if match:
+                return link.replace(r'%s', match.group(2))
+            return link.replace(r'%s', content)
+
+        if match:
+            return "`" + match.group(1) + " <" + link.replace(r'%s', match.group(2)) + ">`_"
+        # match :key:`<url>` second
+        return "`" + label.replace(r'%s', content) + " <" + link.replace(r'%s', content) + ">`_"
+
+    return extlink
+
+
+# inline role handlers, called with rst file and role content, returning None to leave role unchanged
+INLINE_ROLES: dict[str, Callable[[str, str], str]] = {
+    'doc': _role_doc,
+    'ref': _role_ref,
+    'download': _role_download,
+    'guilabel': _role_strong,
+    'menuselection': _role_strong,
+    'command': _role_command,
+    'file': _role_file,
+    'kbd': _role_kbd,
+}
+
+def inline_role_lexer(extlinks: dict[str, str]) -> tuple[re.Pattern, dict[str, Callable[[str, str], str]]]:
+    """
+    Inline role lexer for INLINE_ROLES and extlinks, compiled once for each session (see Session.role_lexer()).
+
+    :param extlinks: extlinks configuration
+    :return: pattern matching role and role content, handlers by role
+    """
+    handlers = {role: _role_extlink(definition) for (role, definition) in extlinks.items()}
+    handlers.update(INLINE_ROLES)
+    roles = '|'.join(re.escape(role) for role in sorted(handlers, key=len, reverse=True))
+    return (re.compile(r":(" + roles + r"):`([^`\n]*)`"), handlers)
+
+
+def _preprocess_rst_roles(path: str, text: str) -> str:
+    """
+    Preprocess rst content replacing inline roles (doc, ref, download, guilabel, ..., extlinks) in a single scan.
+
+    :param path: rst file location, used to resolve relative links
+    :param text: rst content
+    :return: preprocessed rst content
+    """
+    if ':`' not in text:
+        # no processing required
+        return text
+
+    (pattern, handlers) = mkdocs_translate.session.current_session().role_lexer()
+
+    def replace(match: re.Match) -> str:
+        output = handlers[match.group(1)](path, match.group(2))
+        return match.group(0) if output is None else output
+
+    return pattern.sub(replace, text)
 
 
 def _preprocess_rst_toctree(path: str, text: str) -> str:
     """
     scan document for toctree directives to process
     """
+    return ''.join(_preprocess_rst_toctree_lines(path, text.splitlines()))
+
+
+def _preprocess_rst_toctree_lines(path: str, lines: Iterable[str]) -> Iterator[str]:
+    """
+    Generate document lines, with toctree directives processed into a list of links.
+    """
     toctree_rst_file = path
 
     toctree = None
@@ -1101,11 +1566,10 @@ def _preprocess_rst_toctree(path: str, text: str) -> str:
     matched_links: set[str] = set()
 
     hidden = False
-    process = ''
-    for line in text.splitlines():
+    for line in lines:
         if line.startswith('.. toctree::'):
             # directive started
-            toctree = '<div class="grid cards" markdown>\n\n'
+            toctree = ['<div class="grid cards" markdown>\n\n']
             hidden = False
             continue
 
@@ -1134,28 +1598,28 @@ def _preprocess_rst_toctree(path: str, text: str) -> str:
                             if match.link_rst not in matched_links:
                                 # wildcard only lists documents not already covered
                                 matched_links.add(match.link_rst)
-                                toctree += f"-   `{match.title()} <{match.link_rst}>`_\n"
+                                toctree.append(f"-   `{match.title()} <{match.link_rst}>`_\n")
                 else:
                     if parse.link_rst not in matched_links:
                         matched_links.add(parse.link_rst)
-                        toctree += f"-   `{parse.title()} <{parse.link_rst}>`_\n"
+                        toctree.append(f"-   `{parse.title()} <{parse.link_rst}>`_\n")
             else:
                 # end directive
                 if not hidden:
-                    process += toctree + '\n</div>\n\n'
+                    yield from toctree
+                    yield '\n</div>\n\n'
 
-                process += line + '\n'
+                yield line + '\n'
                 toctree = None
                 hidden = False
         else:
-            process += line + '\n'
+            yield line + '\n'
 
     if toctree != None:
         # end directive at end of file
         if not hidden:
-            process += toctree + '\n</div>\n\n'
-
-    return process
+            yield from toctree
+            yield '\n</div>\n\n'
 
 
 def _to_relative_path(current_file: str, reference: str) -> str:
@@ -1266,10 +1730,7 @@ def _block_directive_parsed_literal(path: str, value: str, arguments: dict[str,
     simplified += indent + '\n'
 
     if block:
-        for line in block.splitlines():
-            if '\\\\' in line:
-                line = line.replace("\\\\","\\")
-            simplified += indent + '   ' + line + '\n'
+        simplified += ''.join(indent + '   ' + line.replace("\\\\", "\\") + '\n' for line in block.splitlines())
     else:
         logging.debug('parsed-literal expects a code block')
 
@@ -1294,499 +1755,91 @@ def _block_directive_only(path: str, value: str, arguments: dict[str, str], cont
     if content:
         # blank line to separate content
         simplified += indent + '   \n'
-        for line in content.splitlines():
-            simplified += indent + line + '\n'
+        simplified += ''.join(indent + line + '\n' for line in content.splitlines())
 
     # blank line to end directive
     simplified += indent + '\n'
     return simplified
 
 
-def _list_table_scan2(block: str) -> str:
+def _list_table_scan(block: str) -> str:
     """
-    Process list-table directive into a definition list to avoid pandoc conversion into grid-markdown grid-table.
-    """
-    ROW = re.compile(r'^(\s+)([\*|-])(\s+)([-|*])(\s+)(.*)$')
-    first_line = block.split('\n',1)[0]
-    row = ROW.match(first_line)
-    if row:
-        ROW_LEADING_INDENT = row.group(1)
-        ROW_BULLET = row.group(2)
-        ROW_CELL_INDENT = row.group(3)
-        CELL_BULLET = row.group(4)
-        CELL_CONTENT_INDENT = row.group(5)
+    Scan list-table content to determine markdown representation.
 
-        row_indentation = len(ROW_LEADING_INDENT)
-        cell_indentation = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT)
-        content_indentation = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT + CELL_BULLET + CELL_CONTENT_INDENT)
-        cell_content_indentation = len(CELL_CONTENT_INDENT)
-    else:
-        return "unexpected"
+    :param block: list-table directive content
+    :return: pipe-table for inline cells, definition-list for block cells, or inconsistent if not parsed
+    """
+    try:
+        table = parse_list_table('list-table', block)
+    except ValueError as error:
+        return "inconsistent: " + str(error)
 
-    if CELL_BULLET == "*":
-        CELL_BULLET = r"\*"
-
-    CELL = re.compile( r"^\s{" + str(cell_indentation) + "}" + CELL_BULLET + r"\s{" + str(cell_content_indentation) + r"}(.*)$" )
-    CELL_EMPTY = re.compile(r"^\s{" + str(cell_indentation) + "}" + CELL_BULLET + r"$")
-    CONTENT = re.compile( r"^\s{"+str(content_indentation)+r"}(.*)$")
-
-    # generate raw reStructuredText definition list
-    state = "start"
-    term = ''
-    definition = ''
-
-    for line in block.splitlines():
-        row = ROW.match(line)
-        cell = CELL.match(line)
-        cell_empty = CELL_EMPTY.match(line)
-        content = CONTENT.match(line)
-
-        if len(line.strip()) == 0:
-            intended = 0
-        else:
-            intended = len(line) - len(line.lstrip());
-        blank = intended == 0
-
-        if state == "start":
-            if blank:
-                continue
-            if row:
-                state = "row"
-                term = row.group(6)
-                continue
-            elif cell:
-                raise ValueError(f"{file_path}: list-table start row expected, unexpected cell:" + line)
-            else:
-                raise ValueError(f"{file_path}: list-table start row expected, unexpected content:" + line)
-
-        elif state == "blank":
-            if blank:
-                continue
-
-            elif row:
-                for def_line in definition.splitlines():
-                    processed += f"{indent}   {def_line}\n"
-
-                processed += f"{indent}\n"
-                definition = ''
-                term = ''
-
-                state = "row"
-                term = row.group(6)
-                continue
-
-            elif cell:
-                state = "cell"
-                definition = cell.group(1)
-                continue
-
-            elif cell_empty:
-                state = "cell"
-                definition = ""
-                continue
-
-            elif content:
-                # this is tricky!
-                if definition:
-                    definition += "\n"+content.group(1)
-                    status = "cell"
-                    continue
-
-                elif term:
-                    term += content.group(1)
-                    status = "row"
-
-            raise ValueError(f"{file_path}: list-table, unexpected content:" + line)
-
-        elif state == "row":
-            if row and intended == row_indentation:
-                # two rows is a row no go
-                raise ValueError(f"{file_path}: list-table row processing, unexpected row:" + line)
-
-            if blank:
-                state = "blank"
-                continue
-
-            if cell:
-                state = "cell"
-                definition = cell.group(1)
-                continue
-
-            if cell_empty:
-                state = "cell"
-                definition = ""
-                continue
-
-            if content:
-                term += content.group(1)
-                continue
-
-            raise ValueError(f"{file_path}: list-table row processing, unexpected content:" + line)
-
-        elif state == "cell":
-            if blank:
-                definition += "\n"
-                continue
-
-            if row:
-                processed += f"{indent}{term}\n"
-                for def_line in definition.splitlines():
-                    processed += f"{indent}   {def_line}\n"
-                processed += f"{indent}\n"
-
-                definition = ''
-                term = ''
-
-                state = "row"
-                term = row.group(6)
-                continue
-
-            if cell:
-                # add cell content to definition already in progress
-                # leaving a blank line to start a new paragraph
-                definition += "\n\n" + cell.group(1)
-                continue
-
-            if cell_empty:
-                # add cell content to definition already in progress
-                # leaving a blank line to start a new paragraph
-                definition += "\n\n"
-                continue
-
-            if content:
-                definition += "\n"+content.group(1)
-                continue
-
-            raise ValueError(f"{file_path}: list-table cell processing, unexpected content:" + line)
-
-        else:
-            raise ValueError(f"{file_path}: list-table {state} processing, unexpected content:" + line)
-
-    # final definition
-    if state == "cell":
-        processed += f"{indent}{term}\n"
-        for def_line in definition.splitlines():
-            processed += f"{indent}   {def_line}\n"
-
-    elif state != "blank":
-        raise ValueError(f"{file_path}: list-table unexpected end: {state}")
-
-    return processed
-
-def _list_table_scan(block:str) -> str:
-    scan = "empty"
-    scan_detected = "unknown"
-    columns = 0
-
-    ROW = re.compile(r'^(\s+)([\*|-])(\s+)([-|*])(\s+)(.*)$')
-    CELL = re.compile(r'^(\s+)([\*|-])(\s+)([-|*])(.*)$')
-    CONTENT = re.compile(r'^(\s+)(.*)$')
-
-    max_columns = 0;
-
-    first_line = block.split('\n',1)[0]
-
-    row = ROW.match(first_line)
-    if row:
-        ROW_LEADING_INDENT = row.group(1)
-        ROW_BULLET = row.group(2)
-        ROW_CELL_INDENT = row.group(3)
-        CELL_BULLET = row.group(4)
-        CELL_CONTENT_INDENT = row.group(5)
-        content = row.group(6)
-
-        # indent amount for cell
-        indent_cell = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT)
-
-        # indent amount for content
-        content_indent = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT + CELL_BULLET + CELL_CONTENT_INDENT)
-    else:
-        return "inconsistent"
-
-    line_number: int = 0
-    for line in block.splitlines():
-        line_number += 1
-        blank = len(line.strip()) == 0
-        indented = len(line.lstrip()) - len(line)
-
-        row = ROW.match(line)
-        cell = CELL.match(line)
-        if blank:
-            if line_number == block.count('\n'):
-                # last line is okay to be empty
-                return "pipe-table"
-            else:
-                # any other blank line is seperator between paragraphs
-                return "grid-table, blank in table after: "+block.splitlines()[line_number-2].strip()
-
-        if indented == 0:
-            if scan == "start":
-                continue
-            if scan == "empty":
-                continue
-            else:
-                columns = columns+1
-                scan = "empty"
-
-        if line.startswith("* - "):
-            if scan == "row":
-                # two sequential rows? not sure how to clean this up - trust pandoc
-                return "inconsistent: two sequential row items"
-
-            if scan == "data":
-                max_columns = math.max(max_columns, columns)
-
-            if scan in ["empty","start","data"]:
-                scan = "row"
-                columns = 0
-                row_indent = indent + 4
-                continue;
-            else:
-                return "inconsistent"
-
-        elif line.startswith("- "):
-            if scan == "start":
-                # does not make sense to start with a data
-                return "inconsistent: start with data item"
-            if scan in ["empty","row"]:
-                columns = columns + 1
-
-            scan = "data"
-            data_indent = indent + 2
-            continue;
-
-        else:
-            if scan == "row" and indent != row_indent:
-                # row has block directive
-                return "grid-table due to nested block directive"
-
-            if scan == "data" and indent != data_indent:
-                # data has block directive
-                return "grid-table due to nested block directive"
-
-    return "pipe-table"
+    return "pipe-table" if table.inline() else "definition-list"
 
 def _safe_list_table(file_path: str, value: str, arguments: dict[str, str], block: str, indent: str) -> str:
     """
     Safe list-table stripping out widths and width control which force grid-table representation.
     """
-    # re-encode list-table directive
+    # re-encode list-table directive, block content is indented relative to directive indent
     raw = f'{indent}.. list-table::\n'
     for (key, value) in arguments.items():
         if key in ['width', 'widths']:
             continue
-        raw += f"{indent}   {indent}:{key}: {value}\n"
+        raw += f"{indent}   :{key}: {value.strip()}\n"
 
     raw += f"{indent}\n"
-
-    for item in block.splitlines():
-        raw += item + '\n'
-
+    raw += ''.join(f"{indent}{line}\n" if line.strip() else f"{indent}\n" for line in block.splitlines())
     raw += indent + '\n'
     return raw
 
 
-def _rst_definition_list_from_list_table(file_path: str, value: str, arguments: dict[str, str], block: str, indent: str) -> str:
-    """
-    Process list-table directive into a definition list to avoid pandoc conversion into grid-markdown grid-table.
-    """
-    ROW = re.compile(r'^(\s+)([\*|-])(\s+)([-|*])(\s+)(.*)$')
-    # CELL = re.compile(r'^(\s+)([\*|-])(\s+)([^-|^\*].*)$')
-    # CONTENT = re.compile(r'^(\s+)(.*)$')
-
-    first_line = block.split('\n',1)[0]
-    row = ROW.match(first_line)
-    if row:
-        ROW_LEADING_INDENT = row.group(1)
-        ROW_BULLET = row.group(2)
-        ROW_CELL_INDENT = row.group(3)
-        CELL_BULLET = row.group(4)
-        CELL_CONTENT_INDENT = row.group(5)
-        content = row.group(6)
-
-        row_indentation = len(ROW_LEADING_INDENT)
-        cell_indentation = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT)
-        content_indentation = len(ROW_LEADING_INDENT + ROW_BULLET + ROW_CELL_INDENT + CELL_BULLET + CELL_CONTENT_INDENT)
-        cell_content_indentation = len(CELL_CONTENT_INDENT)
-    else:
-        raise ValueError(f"{file_path}: list-table first row required, unexpected content:" + first_line)
-
-    if CELL_BULLET == "*":
-        CELL_BULLET = r"\*"
-
-    cell_pattern = r"^\s{" + str(cell_indentation) + "}" + CELL_BULLET + r"\s{" + str(cell_content_indentation) + r"}(.*)$"
-    CELL = re.compile( cell_pattern )
-
-    cell_empty_pattern = r"^\s{" + str(cell_indentation) + "}" + CELL_BULLET + r"$"
-    CELL_EMPTY = re.compile(cell_empty_pattern)
-
-    content_pattern = r"^\s{"+str(content_indentation)+r"}(.*)$"
-    CONTENT = re.compile( content_pattern)
-
-    # generate raw reStructuredText definition list
-    processed = ''
-    state = "start"
-
-    term = ''
-    definition = ''
-
-    for line in block.splitlines():
-        row = ROW.match(line)
-        cell = CELL.match(line)
-        cell_empty = CELL_EMPTY.match(line)
-        content = CONTENT.match(line)
-
-        if len(line.strip()) == 0:
-            intended = 0
-        else:
-            intended = len(line) - len(line.lstrip());
-        blank = intended == 0
-
-        if state == "start":
-            if blank:
-                continue
-            if row:
-                state = "row"
-                term = row.group(6)
-                continue
-            elif cell:
-                raise ValueError(f"{file_path}: list-table start row expected, unexpected cell:" + line)
-            else:
-                raise ValueError(f"{file_path}: list-table start row expected, unexpected content:" + line)
-
-        elif state == "blank":
-            if blank:
-                continue
-
-            elif row:
-                for def_line in definition.splitlines():
-                    processed += f"{indent}   {def_line}\n"
-
-                processed += f"{indent}\n"
-                definition = ''
-                term = ''
-
-                state = "row"
-                term = row.group(6)
-                continue
-
-            elif cell:
-                state = "cell"
-                definition = cell.group(1)
-                continue
-
-            elif cell_empty:
-                state = "cell"
-                definition = ""
-                continue
-
-            elif content:
-                # this is tricky!
-                if definition:
-                    definition += "\n"+content.group(1)
-                    status = "cell"
-                    continue
-
-                elif term:
-                    term += content.group(1)
-                    status = "row"
-
-            raise ValueError(f"{file_path}: list-table, unexpected content:" + line)
-
-        elif state == "row":
-            if row and intended == row_indentation:
-                # two rows is a row no go
-                raise ValueError(f"{file_path}: list-table row processing, unexpected row:" + line)
-
-            if blank:
-                state = "blank"
-                continue
-
-            if cell:
-                state = "cell"
-                definition = cell.group(1)
-                continue
-
-            if cell_empty:
-                state = "cell"
-                definition = ""
-                continue
-
-            if content:
-                term += content.group(1)
-                continue
-
-            raise ValueError(f"{file_path}: list-table row processing, unexpected content:" + line)
-
-        elif state == "cell":
-            if blank:
-                definition += "\n"
-                continue
-
-            if row:
-                processed += f"{indent}{term}\n"
-                for def_line in definition.splitlines():
-                    processed += f"{indent}   {def_line}\n"
-                processed += f"{indent}\n"
-
-                definition = ''
-                term = ''
-
-                state = "row"
-                term = row.group(6)
-                continue
-
-            if cell:
-                # add cell content to definition already in progress
-                # leaving a blank line to start a new paragraph
-                definition += "\n\n" + cell.group(1)
-                continue
-
-            if cell_empty:
-                # add cell content to definition already in progress
-                # leaving a blank line to start a new paragraph
-                definition += "\n\n"
-                continue
-
-            if content:
-                definition += "\n"+content.group(1)
-                continue
-
-            raise ValueError(f"{file_path}: list-table cell processing, unexpected content:" + line)
-
-        else:
-            raise ValueError(f"{file_path}: list-table {state} processing, unexpected content:" + line)
-
-    # final definition
-    if state == "cell":
-        processed += f"{indent}{term}\n"
-        for def_line in definition.splitlines():
-            processed += f"{indent}   {def_line}\n"
-
-    elif state != "blank":
-        raise ValueError(f"{file_path}: list-table unexpected end: {state}")
-
-    return processed
-
 def _block_directive_list_table(file_path: str, value: str, arguments: dict[str, str], block: str, indent: str) -> str:
     """
-    Called by _preprocess_rst_block_directive to clean up list-table directive.
+    Called by _preprocess_rst_block_directive to convert list-table directive.
+
+    Tables with inline cell content and a single header row are written directly as a markdown pipe table.
+    Pipe tables require a header row and do not support stub columns, tables without a header row, with several
+    header rows or with stub columns are written as a definition list.
 
     Very complicated tables with nested blocks cannot be supported by mkdocs pipe table approach,
     as fallback plan definition lists are used (and some sample styling is available to present these
     more like tables.
     """
-    relative_path = value.strip()
-
-    scan:str = _list_table_scan(block)
+    try:
+        table = parse_list_table(file_path, block)
+    except ValueError as error:
+        logger.warning(str(error))
+        return _safe_list_table(file_path, value, arguments, block, indent)
 
-    if scan.startswith('grid-table'):
+    if not table.inline():
         # process into definition list
-        logger.debug(file_path + ": grid-table detected: " + scan)
-        return _rst_definition_list_from_list_table(file_path, value, arguments, block, indent)
-    else:
+        logger.debug(file_path + ": list-table block content, processed into definition list")
+        return table.definition_list(indent)
+
+    header_rows = arguments.get('header-rows', '0').strip()
+    stub_columns = arguments.get('stub-columns', '0').strip()
+    if header_rows != '1' or stub_columns not in ['', '0']:
+        logger.debug(file_path + ": list-table header-rows " + header_rows + " stub-columns " + stub_columns +
+                     ", processed into definition list")
+        return table.definition_list(indent)
+
+    session = mkdocs_translate.session.current_session()
+    substitutions = session.substitutions().values
+    try:
+        lines = table.pipe_table(
+            lambda text: inline_markdown(_preprocess_rst_roles(file_path, text), substitutions)
+        )
+    except ValueError as error:
+        # inline markup requiring pandoc, cells are simple enough for pandoc to produce pipe table
+        logger.debug(file_path + ": list-table " + str(error))
         return _safe_list_table(file_path, value, arguments, block, indent)
 
+    raw = indent + '.. code-block:: raw_markdown\n'
+    raw += indent + '   \n'
+    raw += ''.join(indent + '   ' + line + '\n' for line in lines)
+    raw += indent + '\n'
+    return raw
+
 def _block_directive_include(file_path: str, value: str, arguments: dict[str, str], block: str, indent: str) -> str:
     """
     Called by _preprocess_rst_block_directive to convert sphinx directive to raw markdown code block.
@@ -1879,6 +1932,24 @@ def _block_directive_literalinclude(path: str, value: str, arguments: dict[str,
     return raw
 
 
+# block directives simplified for pandoc by preprocess_rst_text, in processing order
+BLOCK_DIRECTIVES: dict[str, Callable[..., str]] = {
+    'code-block': _block_directive_code,
+    'only': _block_directive_only,
+    'include': _block_directive_include,
+    'literalinclude': _block_directive_literalinclude,
+    'parsed-literal': _block_directive_parsed_literal,
+    'figure': _block_directive_figure,
+    'list-table': _block_directive_list_table,
+}
+
+# block directive start: indent, directive, directive value
+DIRECTIVE_START = re.compile(r"^(\s*)\.\. ([\w-]+)::(.*)$")
+
+# directives with literal content, not scanned for nested block directives
+LITERAL_DIRECTIVES = ['code-block', 'code', 'sourcecode', 'raw']
+
+
 def _preprocess_rst_block_directive(path: str, text: str, directive: str,
                                     directive_processing: Callable[..., str]) -> str:
     """
@@ -1894,133 +1965,151 @@ def _preprocess_rst_block_directive(path: str, text: str, directive: str,
 
     returns processed text
     """
-    if '.. ' + directive + '::' not in text:
+    return _preprocess_rst_directives(path, text, {directive: directive_processing})
+
+
+def _preprocess_rst_directives(path: str, text: str, directives: dict[str, Callable[..., str]] = None,
+                               at_end: bool = True) -> str:
+    """
+    Scan document once for sphinx-build block directives, delegating each block to its directive processing callable.
+
+    Directives are processed in registry order. Directives nested in a block are processed before the block if
+    earlier in the registry, and in the block output if later in the registry. Literal blocks, and the content of
+    code directives, are copied as is.
+
+    :param path: rst file location, used to resolve relative links
+    :param text: rst content
+    :param directives: directive processing callables by directive, defaults to BLOCK_DIRECTIVES
+    :param at_end: text is the end of the document, a block ending the document is followed by a blank line
+    :return: processed text
+    """
+    if directives is None:
+        directives = BLOCK_DIRECTIVES
+    if not any('.. ' + directive + '::' in text for directive in directives):
         # no processing required
         return text
 
-    # ..<directive>:: <directive_value>
-    #   <argument>:<value>
-    #
-    #   directive_content
+    names = list(directives)
+    lines = text.splitlines()
+    process = []
+    index = 0
+    logger.debug("preprocessing directives: " + path)
+    while index < len(lines):
+        line = lines[index]
+        match = DIRECTIVE_START.match(line)
+        if not match or match.group(2) not in directives:
+            if match and match.group(2) in LITERAL_DIRECTIVES:
+                # code content is copied as is
+                end = _capture_block_directive(lines, index, match.group(1))[2]
+            elif not match and line.rstrip().endswith('::') and not line.lstrip().startswith('..'):
+                # literal block following paragraph is copied as is
+                end = _literal_block_end(lines, index)
+            else:
+                end = index + 1
+            process.extend(block_line + '\n' for block_line in lines[index:end])
+            index = end
+            continue
 
-    directive_value = None
-    directive_arguments = None  # arguments while capturing
-    directive_content = None  # rst content while capturing
+        directive = match.group(2)
+        indent = match.group(1)
+        directive_value = match.group(3)
+        logger.debug("    " + directive + ": " + directive_value)
+        position = names.index(directive)
 
-    directive_raw = None
-    indent = None  # indent while capturing
-    state = 'scan'
+        (directive_arguments, directive_content, end) = _capture_block_directive(lines, index, indent)
 
-    directive_output = None  # directive output
+        earlier = {name: directives[name] for name in names[:position]}
+        if earlier:
+            block = ''.join(block_line + '\n' for block_line in lines[index + 1:end])
+            processed = _preprocess_rst_directives(path, block, earlier, at_end and end == len(lines))
+            if processed is not block:
+                # capture block again, as processed by nested directives
+                block_lines = [line] + processed.splitlines()
+                (directive_arguments, directive_content, block_end) = _capture_block_directive(block_lines, 0, indent)
+                # lines no longer in block (if any) are scanned again
+                lines[index:end] = block_lines
+                end = index + block_end
 
-    # processed text
-    process = ''
-    logger.debug("preprocessing " + directive + ": " + path)
-    for line in text.splitlines():
-        logger.debug('processing ' + state +':' + line)
-        blank = len(line.strip()) == 0
+        directive_output = directives[directive](path, directive_value, directive_arguments, directive_content, indent)
+        if at_end and end == len(lines):
+            # end directive at end of file
+            directive_output += '\n'
 
-        if directive_raw == None:
-            state = "scan"
-            match = re.search(r"^(\s*)\.\. " + directive + "::(.*)$", line)
-            if match:
-                # directive started
-                state = "directive"
-                directive_raw = line + '\n'
+        later = {name: directives[name] for name in names[position + 1:]}
+        if later and directive not in LITERAL_DIRECTIVES:
+            directive_output = _preprocess_rst_directives(path, directive_output, later, at_end and end == len(lines))
 
-                indent = match.group(1)
-                directive_value = match.group(2)
-                directive_content = None
-                directive_arguments = {}
+        process.append(directive_output)
+        index = end
 
-                logger.debug("    " + directive + ": " + directive_value)
-                continue
-            else:
-                # logging.debug('      scan:'+line)
-                process += line + '\n'
-                continue
-        else:
-            # replace tabs with three spaces for consistent indent calculation
-            line = line.replace("\t","   ")
-
-            indented = len(line) - len(line.lstrip())
-            if blank and directive_content is None:
-                state = "content"
-                logger.debug('     blank:' + line)
-                # capture content next
-                directive_raw += line + '\n'
-                directive_content = ''
-                continue
-            elif line[indented:indented + 1] == ':' and directive_content is None:
-                state = "argument"
-                logger.debug('   process:' + line)
-                # capture arguments
-                directive_raw += line + '\n'
-                (ignore, option, value) = line.split(':', 2)
-                logger.debug("      " + option + '="' + value + '"')
-                directive_arguments[option] = value.lstrip()
-                continue
-            elif blank or indented > len(indent):
-                # procssing directive content
-                directive_raw += line + '\n'
-                if blank:
-                    content = indent
-                else:
-                    content = line[len(indent):]
-                logger.debug('   content:' + content)
+    return ''.join(process)
 
-                if directive_content is None or directive_content == '':
-                    directive_content = content
-                else:
-                    directive_content += '\n' + content
 
-                continue
-            else:
-                state = "done"
-                # end directive
-                directive_output = directive_processing(path, directive_value, directive_arguments, directive_content,
-                                                        indent)
-                process += directive_output
-
-                state = "scan"
-                # process current line
-                match = re.search(r"^(\s*)\.\. " + directive + "::(.*)$", line)
-                if match:
-                    state = "directive"
-                    # directive started
-                    directive_raw = line + '\n'
-                    indent = match.group(1)
-                    directive_value = match.group(2)
-                    directive_content = None
-                    directive_arguments = {}
-
-                    logger.debug("    " + directive + ": " + directive_value)
-                    continue
-                else:
-                    state = "scan"
-                    process += line + '\n'
+def _literal_block_end(lines: list[str], start: int) -> int:
+    """
+    End of literal block following paragraph ending with '::'.
 
-                    # reset state for scanning
-                    directive_raw = None
-                    indent = None
-                    directive_value = None
-                    directive_content = None
-                    directive_arguments = None
+    :param lines: document lines
+    :param start: line ending with '::'
+    :return: line ending the literal block, or the line following start if no literal block is indented
+    """
+    indent = len(lines[start]) - len(lines[start].lstrip())
+    block_indent = None
+    end = start + 1
+    for index in range(start + 1, len(lines)):
+        line = lines[index]
+        if not line.strip():
+            continue
+        indented = len(line) - len(line.lstrip())
+        if block_indent is None:
+            if indented <= indent:
+                break
+            block_indent = indented
+        elif indented < block_indent:
+            break
+        end = index + 1
+    return end
 
-                    continue
 
-    # reached the end of the text content
-    # check if we we were in the middle of processing directive
-    if directive_raw != None:
-        state = "done"
-        # end directive at end of file
-        logger.debug("      rst:\n" + directive_raw)
-        directive_output = directive_processing(path, directive_value, directive_arguments, directive_content, indent)
-        logger.debug("      out:\n" + directive_output)
+def _capture_block_directive(lines: list[str], start: int, indent: str) -> tuple[dict[str, str], str, int]:
+    """
+    Capture arguments and content of block directive.
 
-        process += directive_output + '\n'
+    Tabs are replaced with three spaces for consistent indent calculation, including in the line ending the block.
+
+    :param lines: document lines
+    :param start: directive start line
+    :param indent: directive indent
+    :return: directive arguments, directive content (None if no content), line ending the block
+    """
+    directive_arguments = {}
+    content_lines = None
+    index = start + 1
+    while index < len(lines):
+        line = lines[index].replace("\t", "   ")
+        blank = len(line.strip()) == 0
+        indented = len(line) - len(line.lstrip())
+        if blank and content_lines is None:
+            # capture content next
+            content_lines = []
+        elif line[indented:indented + 1] == ':' and content_lines is None:
+            (ignore, option, value) = line.split(':', 2)
+            directive_arguments[option] = value.lstrip()
+        elif blank or indented > len(indent):
+            content = indent if blank else line[len(indent):]
+            if not content_lines or content_lines == ['']:
+                # leading blank lines of top-level directive are not content
+                content_lines = [content]
+            else:
+                content_lines.append(content)
+        else:
+            # end directive
+            lines[index] = line
+            break
+        index += 1
+    directive_content = None if content_lines is None else '\n'.join(content_lines)
+    return (directive_arguments, directive_content, index)
 
-    return process
 
 def _preprocess_rst_strip(path: str, text: str, directive: str) -> str:
     """
@@ -2030,37 +2119,41 @@ def _preprocess_rst_strip(path: str, text: str, directive: str) -> str:
 
     Return processed text
     """
+    return ''.join(_preprocess_rst_strip_lines(path, text.splitlines(), directive))
+
+
+def _preprocess_rst_strip_lines(path: str, lines: Iterable[str], directive: str) -> Iterator[str]:
+    """
+    Generate document lines, with indicated block directive stripped.
+    """
     block = None
-    process = ''
-    for line in text.splitlines():
+    for line in lines:
         if '.. ' + directive + '::' in line:
             # directive started
-            block = line
+            block = [line]
             continue
 
         if block != None:
             if len(line.strip()) == 0:
-                block += line
+                block.append(line)
                 continue
             if line.strip()[0:1] == ':':
-                block += line
+                block.append(line)
                 continue
             if line[0:3] == '   ':
                 # processing directive
-                block += line
+                block.append(line)
             else:
                 # end directive
-                logging.debug("strip " + directive + ":" + block)
-                process += '\n' + line + '\n'
+                logging.debug("strip " + directive + ":" + ''.join(block))
+                yield '\n' + line + '\n'
                 block = None
         else:
-            process += line + '\n'
+            yield line + '\n'
 
     if block != None:
         # end directive at end of file
-        logging.debug("strip " + directive + ":" + block)
-
-    return process
+        logging.debug("strip " + directive + ":" + ''.join(block))
 
 
 def postprocess_rst_markdown(md_file: str, md_clean: str):
@@ -2074,6 +2167,25 @@ def postprocess_rst_markdown(md_file: str, md_clean: str):
     with open(md_file, 'r') as markdown:
         text = markdown.read()
 
+    clean = postprocess_rst_markdown_text(md_clean, text)
+
+    write_text(md_clean, clean)
+
+
+def postprocess_rst_markdown_text(md_file: str, text: str) -> str:
+    """
+    Postprocess pandoc generated markdown for mkdocs use.
+
+    :param md_file: location of markdown file being generated, used for macro_ignore check and messages
+    :param text: markdown content generated by pandoc
+    :return: cleaned markdown content
+    """
+    return _postprocess_macro_header(md_file, _postprocess_rst_markdown_content(md_file, text))
+
+def _postprocess_rst_markdown_content(md_file: str, text: str) -> str:
+    """
+    Postprocess pandoc generated markdown content, front matter is added by _postprocess_macro_header.
+    """
     if "{.title-ref}" in text:
         # some strange thing where `TEXT` is taken to be a wiki link
         text = re.sub(
@@ -2084,13 +2196,35 @@ def postprocess_rst_markdown(md_file: str, md_clean: str):
         )
 
     # review line by line (skipping fenced code blocks)
-    clean = ''
+    clean = ''.join(_postprocess_rst_markdown_lines(md_file, text.splitlines()))
+
+    # fix macros in URLs
+    link_pattern = re.compile(r"\[(.*?)\]\((.*?)\)",flags=re.MULTILINE)
+    clean = link_pattern.sub(
+        lambda match: '[' + match.group(1) + '](' + _postprocess_link(match.group(2)) + ')',
+        clean
+    )
+
+    # process pandoc ::: admonitions to mkdocs representation
+    if ':::' in clean:
+        clean = _postprocess_pandoc_fenced_divs(md_file, clean)
+
+    if "+=====" in clean:
+        logger.warning(f"grid-table in pandoc output, postprocess to pipe-table: {md_file}")
+        clean = _postprocess_pandoc_grid_table(md_file, clean)
+
+    return clean
+
+def _postprocess_rst_markdown_lines(md_file: str, lines: Iterable[str]) -> Iterator[str]:
+    """
+    Generate markdown lines, cleaned up outside of fenced code blocks.
+    """
     code = None
     code_language = None
 
     HEADER_ANCHOR = re.compile(r'^(#+) (.*)\s+{#(.+)\s*}$')
 
-    for line in text.splitlines():
+    for line in lines:
 
         match = re.search(r"^(.*)```(.*)$", line)
         if match:
@@ -2098,22 +2232,22 @@ def postprocess_rst_markdown(md_file: str, md_clean: str):
                 # starts code-block
                 code_language = match.group(2)
                 if "raw_markdown" in code_language:
-                    code = ''
+                    code = []
                 else:
-                    code = line + '\n'
+                    code = [line + '\n']
             else:
                 # ends code-block
                 if "raw_markdown" not in code_language:
-                    code += line + '\n'
+                    code.append(line + '\n')
 
-                clean += code
+                yield from code
                 code = None
                 code_language = None
             continue
 
         # accept code blocks as is
         if code:
-            code += line + '\n'
+            code.append(line + '\n')
             continue;
 
         # non-code clean content
@@ -2160,41 +2294,29 @@ def postprocess_rst_markdown(md_file: str, md_clean: str):
         if match:
             line = match.group(1) + ' ' + match.group(2) + ' {: #' + match.group(3) + " }"
 
-        clean += line + '\n'
+        yield line + '\n'
 
     if code:
         # file ended with a code block
-        clean += code
-
-    # fix macros in URLs
-    link_pattern = re.compile(r"\[(.*?)\]\((.*?)\)",flags=re.MULTILINE)
-    clean = link_pattern.sub(
-        lambda match: '[' + match.group(1) + '](' + _postprocess_link(match.group(2)) + ')',
-        clean
-    )
-
-    # process pandoc ::: admonitions to mkdocs representation
-    if ':::' in clean:
-        clean = _postprocess_pandoc_fenced_divs(md_file, clean)
+        yield from code
 
-    if "+=====" in clean:
-        logger.warning(f"grid-table in pandoc output, postprocess to pipe-table: {md_file}")
-        clean = _postprocess_pandoc_grid_table(md_file, clean)
-
-    # add header if needed to process mkdocs extra variables
+def _postprocess_macro_header(md_file: str, clean: str) -> str:
+    """
+    Add header if needed to process mkdocs extra variables.
+    """
+    session = mkdocs_translate.session.current_session()
     MACRO = re.compile(r'\{\{ .* \}\}',flags=re.MULTILINE)
     if MACRO.search(clean):
-        if 'macro_ignore' in config:
-            ignore_check = os.path.relpath(md_file,convert_folder).replace('.tmp.md','.md')
-            if ignore_check in config['macro_ignore']:
+        if 'macro_ignore' in session.config:
+            ignore_check = os.path.relpath(md_file,session.docs_folder)
+            if ignore_check in session.config['macro_ignore']:
                 clean = '---\n# YAML header\nrender_macros: false\n---\n\n' + clean
             else:
                 clean = '---\nrender_macros: true\n---\n\n' + clean
         else:
             clean = '---\nrender_macros: true\n---\n\n' + clean
 
-    with open(md_clean, 'w') as markdown:
-        markdown.write(clean)
+    return clean
 
 def _postprocess_link(link:str) -> str:
     link = link.replace(r'%7B%7B%20','{{ ')
@@ -2282,7 +2404,7 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
     indent = ''
     title = None
     note = None
-    process = ''
+    process = []
     state = "scan"
     for line in text.splitlines():
         logger.debug('processing ' + state + ':' + line)
@@ -2292,7 +2414,7 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
             # scanning content looking for fenced div start
             fence_open = re.search(r"^(\s*):::\s*(\w*)$", line)
             if not fence_open:
-                process += line + '\n'
+                process.append(line + '\n')
                 continue
             else:
                 # admonition started
@@ -2310,7 +2432,7 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                     note = None
                 else:
                     # title provided, expect note content next
-                    note = ''
+                    note = []
                     state = 'note'
 
                 logger.debug("process:'" + line + "'")
@@ -2340,7 +2462,7 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                 else:
                     # resume processing for note
                     state = "note"
-                    note = ''
+                    note = []
                 continue
 
             # scanning admonition for fence title break / close
@@ -2351,7 +2473,7 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                 admonition_title = False
                 # start processing for note
                 state = "note"
-                note = ''
+                note = []
                 logger.debug("start note")
                 continue
 
@@ -2368,17 +2490,18 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                     logger.debug("  title:", title)
                     logger.debug("  note:", note)
 
-                    process += indent + '!!! ' + type
+                    process.append(indent + '!!! ' + type)
 
                     if title != None and title.lower() != type.lower():
-                        process += ' "' + title + '"'
+                        process.append(' "' + title + '"')
 
-                    process += "\n\n"
+                    process.append("\n\n")
+                    note = ''.join(note)
                     if ':::' in note:
                         note = _postprocess_pandoc_fenced_divs(md_file,note)
 
                     for content in note.splitlines():
-                        process += '    ' + content + '\n'
+                        process.append('    ' + content + '\n')
 
                     # process += "\n"
 
@@ -2392,14 +2515,15 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                     continue
 
             if note is not None:
-                if note == '' and blank:
+                if not note and blank:
                     # skip initial blank line
                     continue
-                note += line + '\n'
+                note.append(line + '\n')
                 logger.debug("note:" + line)
                 continue
             else:
                 # unexpected
+                process = ''.join(process)
                 logger.error(md_file + ':' + str(process.count('\n')) + ' unexpected ' + str(type) + ':' + str(title))
                 logger.debug("  admonition", admonition)
                 logger.debug("  type", type)
@@ -2408,8 +2532,10 @@ def _postprocess_pandoc_fenced_divs(md_file: str, text: str) -> str:
                 logger.debug(process)
                 raise ValueError('pandoc markdown fenced div unclear ' + str(type) + " " + str(title) + "\n" + md_file + ':' + str(process.count('\n')))
 
+    process = ''.join(process)
     if admonition:
         # fenced div was at end of file
+        note = None if note is None else ''.join(note)
         logger.error(md_file + ':' + str(process.count('\n')) + ' unexpected:')
         logger.error("  admonition", admonition)
         logger.error("  type", type)
@@ -2426,28 +2552,31 @@ def _postprocess_pandoc_grid_table(md_file: str, text: str) -> str:
     Markdown does not support grid tables, we do our best to convert complicated tables to definition lists.
     Any grid tables that remain we are going to try and convert to pipe tables.
     """
-    process = ''
+    return ''.join(_postprocess_pandoc_grid_table_lines(md_file, text.splitlines()))
+
 
+def _postprocess_pandoc_grid_table_lines(md_file: str, lines: Iterable[str]) -> Iterator[str]:
+    """
+    Generate markdown lines, with grid table rules converted to pipe table header separators.
+    """
     GRID_TABLE_DATA = re.compile(r"^(\s*)(\+(-*)\+(\-*\+)*)$")
     GRID_TABLE_HEAD = re.compile(r"^(\s*)(\+(=*)\+(\=*\+)*)$")
 
-    for line in text.splitlines():
+    for line in lines:
         table_header = GRID_TABLE_HEAD.match(line)
 
         if "+=====" in line:
             if table_header:
                 header = table_header.group(1)+"| "+ table_header.group(2)[2:-2].replace("=+="," | ")+" |"
                 header = header.replace("=","-")
-                process += header + '\n'
+                yield header + '\n'
                 continue
 
         table_data = GRID_TABLE_DATA.match(line)
         if table_data:
             continue
 
-        process += line + '\n'
-
-    return process
+        yield line + '\n'
 
 def convert_markdown(md_file: str) -> str:
     """
@@ -2455,13 +2584,14 @@ def convert_markdown(md_file: str) -> str:
     :param md_file: Markdown file path
     :return: html file path
     """
+    session = mkdocs_translate.session.current_session()
     if not os.path.exists(md_file):
         raise FileNotFoundError(errno.ENOENT, f"Markdown file does not exist at location:", md_file)
 
     if not md_file[-3:] == '.md':
         raise FileNotFoundError(errno.ENOENT, f"Markdown 'md' extension required:", md_file)
 
-    upload_folder = config['upload_folder']
+    upload_folder = session.config['upload_folder']
 
     path = re.sub("^docs/", upload_folder + '/', md_file)
     path = path.replace(".en.md", ".en.html")
@@ -2471,28 +2601,20 @@ def convert_markdown(md_file: str) -> str:
     html_dir = os.path.dirname(path)
     if not os.path.exists(html_dir):
         print("Translation directory:", html_dir)
-        os.makedirs(html_dir)
-
-    md_prep = re.sub(r"\.html", r".prep.md", path)
-
-    logging.debug("Preprocessing '" + md_file + "' to '" + md_prep + "'")
-    preprocess_markdown(md_file, md_prep)
-
-    logging.debug("Converting '" + md_prep + "' to '" + html_file + "'")
-    # pandoc --from gfm --to html -o index.en.html index.md
-    completed = subprocess.run(["pandoc",
-                                "--from", md_extensions_from,
-                                "--to", "html",
-                                "--wrap=none",
-                                "--eol=lf",
-                                "-o", html_file,
-                                md_prep
-                                ])
-    if completed.returncode != 0:
-        print(completed)
+        os.makedirs(html_dir, exist_ok=True)
 
-    if not os.path.exists(html_file):
-        raise FileNotFoundError(errno.ENOENT, f"Pandoc did not create html file:", html_file)
+    with open(md_file, 'r') as file:
+        text = file.read()
+
+    logging.debug("Preprocessing '" + md_file + "'")
+    md_prep = preprocess_markdown_text(text)
+    if session.keep_temp:
+        _write_temp(re.sub(r"\.html", r".prep.md", path), md_prep)
+
+    logging.debug("Converting '" + md_file + "' to '" + html_file + "'")
+    html = pandoc(md_prep, md_extensions_from, "html")
+
+    write_text(html_file, html)
 
     return html_file
 
@@ -2501,12 +2623,29 @@ def preprocess_markdown(md_file: str, md_prep: str) -> str:
     with open(md_file, 'r') as file:
         text = file.read()
 
-    clean = ''
+    clean = preprocess_markdown_text(text)
+
+    write_text(md_prep, clean)
+
+    return clean
+
+
+def preprocess_markdown_text(text: str) -> str:
+    """
+    Pre-process markdown content for pandoc conversion to html, handling notes as pandoc fenced_divs.
+    """
+    return ''.join(_preprocess_markdown_lines(text.splitlines()))
+
+
+def _preprocess_markdown_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Generate markdown lines for pandoc conversion to html, with notes as pandoc fenced_divs.
+    """
     code = ''
-    admonition = None
+    admonition = None  # admonition start line, followed by admonition contents
 
     # handle notes as pandoc fenced_divs
-    for line in text.splitlines():
+    for line in lines:
         # phase 1: code-block pre-processing
         #
         # cause pandoc #markdown or #text to force to fenced codeblocks (rather than indent)
@@ -2536,27 +2675,28 @@ def preprocess_markdown(md_file: str, md_prep: str) -> str:
         if not admonition:
             if '!!! ' in line:
                 # print('admonition start  : "'+line+'"')
-                admonition = line
+                admonition = [line]
             else:
-                clean += line + '\n'
+                yield line + '\n'
         else:
-            indent = admonition.index('!!! ')
-            padding = admonition[0:indent]
+            indent = admonition[0].index('!!! ')
+            padding = admonition[0][0:indent]
 
             if len(line) == 0:
-                if '\n' in admonition:
+                if len(admonition) > 1:
                     # print('admonition blank  : "'+line+'"')
-                    admonition += line + "\n"
+                    admonition.append(line + "\n")
                 else:
                     # print('admonition skip   : "'+line+'"')
-                    admonition += "\n"
+                    admonition.append("\n")
             elif line[0:indent].isspace():
                 # print('admonition content: "'+line+'"')
                 # use indent level to gather admonition contents
-                admonition += padding + line[indent + 4:] + '\n'
+                admonition.append(padding + line[indent + 4:] + '\n')
             else:
                 # print('admonition end    : "'+line+'"')
                 # outdent admonition completed
+                admonition = ''.join(admonition)
                 first_newline = admonition.index('\n')
                 last_newline = admonition.rindex('\n')
 
@@ -2564,17 +2704,14 @@ def preprocess_markdown(md_file: str, md_prep: str) -> str:
                 contents = admonition[first_newline:last_newline]
 
                 # output as pandoc fenced_divs
-                clean += padding + "::: " + title
-                clean += contents
-                clean += padding + ":::\n\n"
+                yield padding + "::: " + title
+                yield contents
+                yield padding + ":::\n\n"
 
                 # remember to output line that breaks indent level
                 admonition = None
 
-                clean += line + '\n'
-
-    with open(md_prep, 'w') as markdown:
-        markdown.write(clean)
+                yield line + '\n'
 
 
 def convert_html(html_file: str) -> str:
@@ -2583,18 +2720,20 @@ def convert_html(html_file: str) -> str:
     :param html_file: HTML file path
     :return: md file path
     """
+    session = mkdocs_translate.session.current_session()
     if not os.path.exists(html_file):
         raise FileNotFoundError(errno.ENOENT, f"HTML file does not exist at location:", html_file)
 
     if not html_file[-5:] == '.html':
         raise FileNotFoundError(errno.ENOENT, f"HTML '.html' extension required:", html_file)
 
-    # prep html file for conversion
-    html_tmp_file = html_file[0:-5] + '.tmp.html'
+    with open(html_file, 'r') as html:
+        data = html.read()
 
-    preprocess_html(html_file, html_tmp_file)
-    if not os.path.exists(html_tmp_file):
-        raise FileNotFoundError(errno.ENOENT, f"Did not create preprocessed html file:", html_tmp_file)
+    # prep html file for conversion
+    html_prep = preprocess_html_text(data)
+    if session.keep_temp:
+        _write_temp(html_file[0:-5] + '.tmp.html', html_prep)
 
     if html_file[:-8] == '.fr.html':
         md_file = html_file[0:-8] + '.fr.md'
@@ -2603,24 +2742,12 @@ def convert_html(html_file: str) -> str:
     else:
         md_file = html_file[0:-5] + '.md'
 
-    md_tmp_file = md_file[0:-3] + ".tmp.md"
+    markdown = pandoc(html_prep, "html", md_extensions_to)
+    if session.keep_temp:
+        _write_temp(md_file[0:-3] + ".tmp.md", markdown)
 
-    completed = subprocess.run(["pandoc",
-                                "--from", "html",
-                                "--to", md_extensions_to,
-                                "--wrap=none",
-                                "--eol=lf",
-                                "-o", md_tmp_file,
-                                html_tmp_file
-                                ])
-    print(completed)
-
-    if not os.path.exists(md_tmp_file):
-        raise FileNotFoundError(errno.ENOENT, f"Pandoc did not create temporary md file:", tmp_file)
-
-    postprocess_markdown(md_tmp_file, md_file)
-    if not os.path.exists(md_file):
-        raise FileNotFoundError(errno.ENOENT, f"Did not create postprocessed md file:", md_file)
+    clean = postprocess_markdown_text(markdown)
+    write_text(md_file, clean)
 
     return md_file
 
@@ -2629,6 +2756,15 @@ def preprocess_html(html_file: str, html_clean: str):
     with open(html_file, 'r') as html:
         data = html.read()
 
+    clean = preprocess_html_text(data)
+
+    write_text(html_clean, clean)
+
+
+def preprocess_html_text(data: str) -> str:
+    """
+    Pre-process translated html content for pandoc conversion to markdown.
+    """
     # Fix image captions
     #
     #     ![Search field](img/search.png) *Champ de recherche*
@@ -2663,14 +2799,22 @@ def preprocess_html(html_file: str, html_clean: str):
         clean,
         flags=re.MULTILINE
     )
-    with open(html_clean, 'w') as html:
-        html.write(clean)
+    return clean
 
 
 def postprocess_markdown(md_file: str, md_clean: str):
     with open(md_file, 'r') as markdown:
         data = markdown.read()
 
+    data = postprocess_markdown_text(data)
+
+    write_text(md_clean, data)
+
+
+def postprocess_markdown_text(data: str) -> str:
+    """
+    Post-process pandoc generated markdown after translation for mkdocs use.
+    """
     # fix icons
     data = re.sub(
         r":(fontawesome-\S*)\s:",
@@ -2692,8 +2836,7 @@ def postprocess_markdown(md_file: str, md_clean: str):
         data,
         flags=re.MULTILINE
     )
-    with open(md_clean, 'w') as markdown:
-        markdown.write(data)
+    return data
 
 
 def deepl_document(en_html: str, fr_html: str):
@@ -2703,29 +2846,40 @@ def deepl_document(en_html: str, fr_html: str):
     :param fr_html: French html file
     :return: status
     """
+    session = mkdocs_translate.session.current_session()
 
     if not os.path.exists(en_html):
         raise FileNotFoundError(errno.ENOENT, f"HTML file does not exist at location:", en_html)
 
     AUTH = load_auth()
 
-    # prep html file for conversion
-    translate_tmp_file = en_html[0:-5] + '.tmp.html'
-    print("Preprocssing", en_html, "to", translate_tmp_file)
+    with open(en_html, 'r') as html:
+        data = html.read()
 
-    preprocess_translate(en_html, translate_tmp_file)
+    # prep html file for conversion
+    print("Preprocessing", en_html)
+    html_prep = preprocess_translate_text(data)
+    if session.keep_temp:
+        _write_temp(en_html[0:-5] + '.tmp.html', html_prep)
 
     translator = deepl.Translator(AUTH)
 
     try:
-        # Using translate_document_from_filepath() with file paths
-        translator.translate_document_from_filepath(
-            translate_tmp_file,
-            fr_html,
-            source_lang='EN',
-            target_lang="FR",
-            formality="more"
-        )
+        # Using translate_document() with in memory upload
+        with open(fr_html, 'wb') as fr_file:
+            try:
+                translator.translate_document(
+                    io.BytesIO(html_prep.encode('utf-8')),
+                    fr_file,
+                    source_lang='EN',
+                    target_lang="FR",
+                    formality="more",
+                    filename=os.path.basename(en_html)
+                )
+            except Exception:
+                fr_file.close()
+                os.unlink(fr_html)
+                raise
 
     except deepl.DocumentTranslationException as error:
         # If an error occurs during document translation after the document was
@@ -2750,6 +2904,15 @@ def preprocess_translate(html_file: str, html_clean: str):
     with open(html_file, 'r') as html:
         data = html.read()
 
+    data = preprocess_translate_text(data)
+
+    write_text(html_clean, data)
+
+
+def preprocess_translate_text(data: str) -> str:
+    """
+    Pre-process html content prior to translation, protecting code blocks.
+    """
     # Fix deepl not respecting <pre><code> blogs using CDATA
     data = re.sub(
         r'<code>',
@@ -2763,5 +2926,4 @@ def preprocess_translate(html_file: str, html_clean: str):
         data,
         flags=re.MULTILINE
     )
-    with open(html_clean, 'w') as html:
-        html.write(data)
+    return data
@@ -0,0 +1,297 @@
+"""
+Watch rst folder for changes, migrating changed rst files and any pages that depend on them.
+
+When configured with projects, the rst folder of each project is watched, each project keeping its own anchors index
+and dependency graph.
+
+Uses inotify when the optional inotify_simple package is installed, otherwise polls for changes.
+"""
+# message/watch.py
+
+import logging
+import os
+import time
+from typing import Iterator
+
+import mkdocs_translate.session
+from mkdocs_translate import __app_name__
+from .manifest import load_manifest
+from .manifest import manifest_entry
+from .manifest import manifest_key
+from .manifest import save_depends
+from .manifest import save_manifest
+from .translate import collect_path
+from .translate import convert_rst
+from .translate import scan_depends_rst
+from .translate import scan_index_rst
+from .translate import write_text
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+logger = logging.getLogger(__app_name__)
+
+
+class WatchIndex:
+    """
+    In memory anchors.txt index and dependency graph, maintained one rst file at a time.
+
+    Attributes:
+        index: anchors contributed by each rst file
+        graph: dependencies of each rst file
+    """
+    index: dict[str, dict[str, str]]
+    graph: dict[str, dict]
+
+    def __init__(self):
+        self.index = {}
+        self.graph = {}
+
+    def scan(self, rst_files: list[str]) -> None:
+        """
+        Initial scan of rst files, refreshing anchors.
+        """
+        rst_folder = mkdocs_translate.session.current_session().rst_folder
+        for rst_file in rst_files:
+            self.index[manifest_key(rst_file)] = _scan_anchors(rst_file)
+            self.graph[manifest_key(rst_file)] = scan_depends_rst(rst_folder, rst_file)
+        self.update_anchors()
+
+    def update(self, rst_file: str) -> set[str]:
+        """
+        Rescan rst file (which may have been removed), refreshing anchors.
+
+        :return: anchors keys that have changed
+        """
+        key = manifest_key(rst_file)
+        before = self.index.get(key, {})
+        if os.path.exists(rst_file):
+            after = _scan_anchors(rst_file)
+            self.index[key] = after
+            self.graph[key] = scan_depends_rst(mkdocs_translate.session.current_session().rst_folder,
+                                               rst_file)
+        else:
+            after = {}
+            self.index.pop(key, None)
+            self.graph.pop(key, None)
+
+        changed = set()
+        for anchor in before.keys() | after.keys():
+            if before.get(anchor) != after.get(anchor):
+                changed.add(anchor)
+
+        if changed:
+            self.update_anchors()
+        return changed
+
+    def update_anchors(self) -> None:
+        """
+        Refresh anchors used for conversion, and anchors.txt used by other commands.
+        """
+        anchors: dict[str, str] = {}
+        for file_anchors in self.index.values():
+            anchors.update(file_anchors)
+        session = mkdocs_translate.session.current_session()
+        session.anchors = anchors
+
+        anchor_path = session.anchor_file
+        os.makedirs(os.path.dirname(anchor_path), exist_ok=True)
+        write_text(anchor_path, ''.join(anchor + '=' + path + '\n' for (anchor, path) in anchors.items()))
+
+    def dependents(self, changed_files: set[str], changed_anchors: set[str]) -> set[str]:
+        """
+        Determine pages using changed files (via include) or changed anchors (via ref, doc and toctree titles).
+
+        :param changed_files: changed file keys, relative to rst folder
+        :param changed_anchors: changed anchors keys
+        :return: page keys, relative to rst folder
+        """
+        lowercase = {anchor.lower() for anchor in changed_anchors}
+        pages = set()
+        for (page, depends) in self.graph.items():
+            if changed_files.intersection(depends.get('include', [])):
+                pages.add(page)
+                continue
+            if changed_anchors.intersection(depends.get('doc', []) + depends.get('toctree', [])):
+                pages.add(page)
+                continue
+            for ref in depends.get('ref', []):
+                if ref in changed_anchors or ref + '.title' in changed_anchors or \
+                        ref.lower() in lowercase or ref.lower() + '.title' in lowercase:
+                    pages.add(page)
+                    break
+        return pages
+
+
+def _scan_anchors(rst_file: str) -> dict[str, str]:
+    """
+    Scan rst file for anchors and headings, parsed into anchors dictionary.
+    """
+    rst_folder = mkdocs_translate.session.current_session().rst_folder
+    anchors = {}
+    for line in scan_index_rst(rst_folder, rst_file).splitlines():
+        if '=' in line:
+            (anchor, path) = line.split('=', 1)
+            anchors[anchor] = path
+    return anchors
+
+
+def _snapshot(folder: str) -> dict[str, tuple[int, int]]:
+    """
+    Modification time and size of all files in folder.
+    """
+    snapshot = {}
+    for (dirpath, dirnames, filenames) in os.walk(folder):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def _poll_changes(folders: list[str], interval: float) -> Iterator[set[str]]:
+    """
+    Poll folders for changes.
+
+    :return: iterator of changed file paths
+    """
+    def snapshot() -> dict[str, tuple[int, int]]:
+        files = {}
+        for folder in folders:
+            files.update(_snapshot(folder))
+        return files
+
+    before = snapshot()
+    while True:
+        time.sleep(interval)
+        after = snapshot()
+        changed = set()
+        for path in before.keys() | after.keys():
+            if before.get(path) != after.get(path):
+                changed.add(path)
+        before = after
+        if changed:
+            yield changed
+
+
+def _inotify_changes(inotify, folders: list[str]) -> Iterator[set[str]]:
+    """
+    Use inotify to watch folders for changes.
+
+    :return: iterator of changed file paths
+    """
+    flags = inotify_simple.flags
+    mask = flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_FROM | flags.MOVED_TO
+    watches: dict[int, str] = {}
+
+    def add_watch(path: str) -> None:
+        for (dirpath, dirnames, filenames) in os.walk(path):
+            watches[inotify.add_watch(dirpath, mask)] = dirpath
+
+    for folder in folders:
+        add_watch(folder)
+    while True:
+        # read_delay gathers the burst of events produced by an editor save
+        events = inotify.read(read_delay=50)
+        changed = set()
+        for event in events:
+            if event.wd not in watches:
+                continue
+            path = os.path.join(watches[event.wd], event.name)
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO):
+                    add_watch(path)
+                continue
+            changed.add(path)
+        if changed:
+            yield changed
+
+
+def watch_changes(folders: list[str], interval: float) -> Iterator[set[str]]:
+    """
+    Watch folders for changes, using inotify if available, or polling.
+
+    :param folders: folders to watch
+    :param interval: polling interval in seconds
+    :return: iterator of changed file paths
+    """
+    if inotify_simple is not None:
+        try:
+            return _inotify_changes(inotify_simple.INotify(), folders)
+        except OSError as error:
+            logger.warning(f"inotify not available, polling for changes: {error}")
+    else:
+        logger.info("inotify_simple not installed, polling for changes")
+    return _poll_changes(folders, interval)
+
+
+def migrate_changes(watch_index: WatchIndex, changed: set[str]) -> list[str]:
+    """
+    Migrate changed rst files, and any pages that depend on them.
+
+    :param watch_index: anchors and dependencies, updated to reflect changes
+    :param changed: changed file paths
+    :return: markdown files generated
+    """
+    rst_folder = mkdocs_translate.session.current_session().rst_folder
+
+    changed_files: set[str] = set()
+    changed_anchors: set[str] = set()
+    for path in sorted(changed):
+        changed_files.add(os.path.relpath(path, rst_folder))
+        if path.endswith('.rst'):
+            changed_anchors.update(watch_index.update(path))
+
+    pages = {file for file in changed_files if file.endswith('.rst')}
+    pages.update(watch_index.dependents(changed_files, changed_anchors))
+
+    manifest = load_manifest()
+    loaded = dict(manifest)
+    md_files = []
+    for page in sorted(pages):
+        rst_file = os.path.join(rst_folder, page)
+        if not os.path.exists(rst_file):
+            continue
+        try:
+            md_file = convert_rst(rst_file)
+        except Exception as error:
+            logger.error(f"{rst_file}: {type(error).__name__}: {error}")
+            manifest.pop(page, None)
+            continue
+        manifest[page] = manifest_entry(rst_file, md_file, watch_index.graph)
+        md_files.append(md_file)
+
+    save_manifest(manifest, loaded)
+    save_depends(watch_index.graph)
+    return md_files
+
+
+def watch_rst(interval: float = 0.5) -> None:
+    """
+    Watch rst folder (of each project), migrating rst files (and pages depending on them) when changed.
+
+    :param interval: polling interval in seconds, when inotify is not available
+    """
+    watched: list[tuple[mkdocs_translate.session.Session, WatchIndex]] = []
+    for project in mkdocs_translate.session.current_session().project_sessions():
+        with project.activate():
+            watch_index = WatchIndex()
+            watch_index.scan(collect_path(project.rst_folder + "/**/*.rst", 'rst', True))
+        logger.info("Watching " + project.rst_folder + " (" + str(len(watch_index.index)) + " files)")
+        watched.append((project, watch_index))
+
+    for changed in watch_changes([project.rst_folder for (project, watch_index) in watched], interval):
+        start = time.perf_counter()
+        for (project, watch_index) in watched:
+            project_changed = {path for path in changed if path.startswith(project.rst_folder + os.sep)}
+            if not project_changed:
+                continue
+            with project.activate():
+                for md_file in migrate_changes(watch_index, project_changed):
+                    print(md_file)
+        logger.debug(f"migrate changes: {time.perf_counter() - start:.3f}s")
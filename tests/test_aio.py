@@ -0,0 +1,87 @@
+import asyncio
+import os
+import pkgutil
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+import mkdocs_translate.aio
+import mkdocs_translate.backend
+import mkdocs_translate.cli
+import mkdocs_translate.session
+import mkdocs_translate.translate
+
+EXAMPLE = os.path.join(os.path.dirname(__file__), '..', 'example', 'source')
+
+
+class TestAio(unittest.TestCase):
+
+    def test_context_backend(self):
+        async def run():
+            backend = await mkdocs_translate.aio._in_thread(mkdocs_translate.backend.pandoc_backend)
+            self.assertIsInstance(backend, mkdocs_translate.aio.AsyncBackend)
+            self.assertIs(asyncio.get_running_loop(), backend.loop)
+
+            # conversion waiting on event loop thread would never complete
+            with self.assertRaises(RuntimeError):
+                backend.convert("text", "rst", "markdown")
+
+        asyncio.run(run())
+        self.assertNotIsInstance(mkdocs_translate.backend.pandoc_backend(), mkdocs_translate.aio.AsyncBackend)
+
+    @unittest.skipIf(shutil.which('pandoc') is None, "requires pandoc")
+    def test_iter_migrate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = yaml.safe_load(pkgutil.get_data('mkdocs_translate', 'config.yml'))
+            config.update({'project_folder': tmp, 'docs_folder': 'docs', 'rst_folder': 'source', 'cache_size': 0})
+            config_path = os.path.join(tmp, 'translate.yml')
+            with open(config_path, 'w') as file:
+                yaml.safe_dump(config, file)
+            shutil.copytree(EXAMPLE, os.path.join(tmp, 'source'))
+            os.makedirs(os.path.join(tmp, 'docs'))
+
+            session = mkdocs_translate.session.Session(config_path)
+            with session.activate():
+                mkdocs_translate.cli.scan_project('index')
+                session.init_anchors()
+
+            rst_files = [os.path.join(tmp, 'source', name) for name in
+                         ['index.rst', 'guide/markdown.rst', 'guide/style.rst', 'translate/migrate.rst', 'broken.rst']]
+            with open(rst_files[-1], 'wb') as file:
+                file.write(b"Broken\n======\n\n\xff\n")
+
+            async def migrate(concurrency: int) -> list[tuple[str, str, str]]:
+                with session.activate():
+                    return [result async for result in mkdocs_translate.aio.iter_migrate(rst_files, concurrency)]
+
+            # one at a time results are in file order, failure is produced as a result
+            results = asyncio.run(migrate(1))
+            self.assertEqual(rst_files, [rst_file for (rst_file, md_file, error) in results])
+            self.assertIsNone(results[-1][1])
+            self.assertTrue(results[-1][2].startswith('UnicodeDecodeError'))
+
+            results = asyncio.run(migrate(4))
+            self.assertEqual(sorted(rst_files), sorted(rst_file for (rst_file, md_file, error) in results))
+            converted = {}
+            for (rst_file, md_file, error) in results:
+                if md_file:
+                    with open(md_file, 'r') as file:
+                        converted[rst_file] = file.read()
+                else:
+                    converted[rst_file] = error.split(':')[0]
+
+            # same markdown as sync conversion, or same failure
+            for rst_file in rst_files:
+                try:
+                    with session.activate():
+                        md_file = mkdocs_translate.translate.convert_rst(rst_file)
+                    with open(md_file, 'r') as file:
+                        self.assertEqual(file.read(), converted[rst_file], rst_file)
+                except UnicodeDecodeError:
+                    self.assertEqual('UnicodeDecodeError', converted[rst_file], rst_file)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import subprocess
+import unittest
+
+import mkdocs_translate.backend
+
+
+class TestBackend(unittest.TestCase):
+
+    def test_parse_messages(self):
+        stderr = ("[WARNING] Reference not found for 'x' at line 5 column 1\n"
+                  "[WARNING] Could not convert TeX math x^, rendering as TeX:\n"
+                  "  x^\n"
+                  "[INFO] Not rendering RawBlock (Format \"html\") \"<div>\"\n")
+        messages = mkdocs_translate.backend.parse_messages(stderr)
+        self.assertEqual(3, len(messages))
+
+        self.assertEqual('WARNING', messages[0].verbosity)
+        self.assertEqual("Reference not found for 'x' at line 5 column 1", messages[0].message)
+        self.assertEqual((5, 1), (messages[0].line, messages[0].column))
+
+        self.assertEqual("Could not convert TeX math x^, rendering as TeX:\n  x^", messages[1].message)
+        self.assertIsNone(messages[1].line)
+        self.assertEqual('INFO', messages[2].verbosity)
+
+        self.assertEqual('ERROR', mkdocs_translate.backend.parse_messages("pandoc: out of memory\n")[0].verbosity)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            mkdocs_translate.backend.PandocBackend()
+
+    def test_retry(self):
+        backend = mkdocs_translate.backend.SubprocessBackend()
+        backend.limit(timeout=1, memory=0, retries=2)
+        attempts = []
+
+        def convert() -> str:
+            attempts.append(len(attempts))
+            if len(attempts) < 3:
+                raise subprocess.TimeoutExpired('pandoc', 1)
+            return 'converted'
+
+        self.assertEqual('converted', backend._retry(convert, 'rst', 'markdown'))
+        self.assertEqual(3, len(attempts))
+
+        attempts.clear()
+        backend.limit(timeout=1, memory=0, retries=0)
+        with self.assertRaises(mkdocs_translate.backend.PandocTimeout):
+            backend._retry(convert, 'rst', 'markdown')
+        self.assertEqual(1, len(attempts))
+
+
+if __name__ == '__main__':
+    unittest.main()
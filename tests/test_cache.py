@@ -0,0 +1,76 @@
+import contextlib
+import os
+import tempfile
+import time
+import unittest
+
+import mkdocs_translate.cache
+import mkdocs_translate.manifest
+import mkdocs_translate.session
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = mkdocs_translate.session.Session(configure=False)
+        self.session.config = {'cache_folder': 'cache', 'cache_size': 1}
+        self.session.build_folder = self.tmp.name
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(self.session.activate())
+
+    def tearDown(self):
+        self.stack.close()
+        self.tmp.cleanup()
+
+    def test_cache_key(self):
+        key = mkdocs_translate.cache.cache_key("text", "rst", "markdown")
+        self.assertEqual(key, mkdocs_translate.cache.cache_key("text", "rst", "markdown"))
+        self.assertNotEqual(key, mkdocs_translate.cache.cache_key("text2", "rst", "markdown"), "text")
+        self.assertNotEqual(key, mkdocs_translate.cache.cache_key("text", "html", "markdown"), "direction")
+
+    def test_cache_get_put(self):
+        key = mkdocs_translate.cache.cache_key("Title\n=====\n", "rst", "markdown")
+        self.assertIsNone(mkdocs_translate.cache.cache_get(key))
+
+        mkdocs_translate.cache.cache_put(key, "# Title\n")
+        self.assertEqual("# Title\n", mkdocs_translate.cache.cache_get(key))
+        self.assertEqual(1, mkdocs_translate.cache.cache_stats()['entries'])
+
+    def test_prune_cache(self):
+        old = mkdocs_translate.cache.cache_key("old", "rst", "markdown")
+        new = mkdocs_translate.cache.cache_key("new", "rst", "markdown")
+        mkdocs_translate.cache.cache_put(old, "x" * 100)
+        mkdocs_translate.cache.cache_put(new, "y" * 100)
+
+        past = time.time() - 60
+        os.utime(os.path.join(mkdocs_translate.cache.cache_folder(), old[0:2], old), (past, past))
+
+        (removed, removed_size) = mkdocs_translate.cache.prune_cache(150)
+        self.assertEqual(1, removed)
+        self.assertIsNone(mkdocs_translate.cache.cache_get(old), "least recently used removed")
+        self.assertIsNotNone(mkdocs_translate.cache.cache_get(new))
+
+    def test_export_import(self):
+        key = mkdocs_translate.cache.cache_key("Title\n=====\n", "rst", "markdown")
+        mkdocs_translate.cache.cache_put(key, "# Title\n")
+        mkdocs_translate.manifest.save_manifest({'index.rst': {'source': 'abc'}})
+        bundle = os.path.join(self.tmp.name, 'bundle.tar.gz')
+        self.assertEqual(2, mkdocs_translate.cache.export_cache(bundle))
+
+        with tempfile.TemporaryDirectory() as other:
+            self.session.build_folder = other
+            self.assertEqual((2, 0), mkdocs_translate.cache.import_cache(bundle))
+            self.assertEqual("# Title\n", mkdocs_translate.cache.cache_get(key))
+            self.assertEqual({'index.rst': {'source': 'abc'}}, mkdocs_translate.manifest.load_manifest())
+            self.assertEqual((0, 0), mkdocs_translate.cache.import_cache(bundle), "existing files kept")
+
+        with tempfile.TemporaryDirectory() as other:
+            self.session.build_folder = other
+            self.session.config['fast_path'] = True
+            self.assertEqual((1, 1), mkdocs_translate.cache.import_cache(bundle), "manifest config changed")
+            self.assertEqual({}, mkdocs_translate.manifest.load_manifest())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+import mkdocs_translate.session
+import mkdocs_translate.translate
+
+RST = """Title
+=====
+
+Introduction.
+
+.. _install:
+
+Install
+-------
+
+Install steps.
+
+Detail
+^^^^^^
+
+Detail steps.
+
+Usage
+-----
+
+Usage steps.
+"""
+
+
+class TestChunks(unittest.TestCase):
+
+    def test_split(self):
+        chunks = mkdocs_translate.translate.split_rst_chunks(RST, 4)
+        self.assertEqual(3, len(chunks))
+
+        (text, styles, following) = chunks[0]
+        self.assertEqual("Title\n=====\n\nIntroduction.\n\n", text)
+        self.assertEqual([], styles)
+        self.assertEqual(('-', False), following)
+
+        (text, styles, following) = chunks[1]
+        self.assertTrue(text.startswith(".. _install:\n\nInstall\n-------\n"))
+        self.assertIn("Detail steps.", text)
+        self.assertEqual([('=', False)], styles)
+        self.assertEqual(('-', False), following)
+
+        (text, styles, following) = chunks[2]
+        self.assertTrue(text.startswith("Usage\n-----\n"))
+        self.assertEqual([('=', False), ('-', False), ('^', False)], styles)
+        self.assertIsNone(following)
+
+        self.assertEqual(RST, ''.join(chunk[0] for chunk in chunks))
+
+    def test_not_split(self):
+        self.assertEqual([(RST, [], None)], mkdocs_translate.translate.split_rst_chunks(RST, 0))
+        self.assertEqual([(RST, [], None)], mkdocs_translate.translate.split_rst_chunks(RST, 100))
+
+        substitution = RST + "\nUses |project| substitution.\n\n.. |project| replace:: GeoServer\n"
+        self.assertEqual(1, len(mkdocs_translate.translate.split_rst_chunks(substitution, 4)))
+
+        reference = RST + "\nSee install_ for details.\n"
+        self.assertEqual(1, len(mkdocs_translate.translate.split_rst_chunks(reference, 4)))
+
+    def test_toctree(self):
+        """
+        Duplicate toctree entries are removed across the complete file, not each chunk.
+        """
+        toctree = RST.replace(".. _install:\n\n", "").replace("Install steps.", "Install steps.\n\n.. toctree::\n\n   setup\n   config\n")
+        toctree = toctree.replace("Usage steps.", "Usage steps.\n\n.. toctree::\n\n   config\n   usage\n")
+
+        session = mkdocs_translate.session.Session(configure=False)
+        session.rst_folder = 'doc'
+        session.anchors = {'/setup.rst.title': 'Setup', '/config.rst.title': 'Config', '/usage.rst.title': 'Usage'}
+        with session.activate():
+            expected = mkdocs_translate.translate.preprocess_rst_text('doc/index.rst', toctree)
+            chunks = mkdocs_translate.translate.split_rst_chunks(toctree, 4)
+            chunked = ''.join(
+                mkdocs_translate.translate.preprocess_rst_text('doc/index.rst', chunk[0]) for chunk in chunks
+            )
+        self.assertEqual(1, expected.count('<config.rst>'))
+        self.assertEqual(expected, chunked)
+
+
+if __name__ == '__main__':
+    unittest.main()
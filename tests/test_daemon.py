@@ -0,0 +1,81 @@
+import logging
+import os
+import stat
+import tempfile
+import threading
+import unittest
+
+import mkdocs_translate.daemon
+import mkdocs_translate.session
+
+
+@unittest.skipIf(mkdocs_translate.daemon.DaemonServer is None, "requires Unix domain socket support")
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'daemon.sock')
+        self.daemon = mkdocs_translate.daemon.Daemon(mkdocs_translate.session.Session(configure=False))
+        self.server = mkdocs_translate.daemon.DaemonServer(self.path, self.daemon)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.folder.cleanup()
+
+    def test_ping(self):
+        with mkdocs_translate.daemon.connect(self.path) as client:
+            status = client.call('ping')
+            self.assertEqual(os.getpid(), status['pid'])
+            self.assertEqual(os.getcwd(), status['cwd'])
+            self.assertIsNone(status['config'])
+
+            with self.assertRaises(mkdocs_translate.daemon.DaemonError) as context:
+                client.call('unknown')
+            self.assertEqual(mkdocs_translate.daemon.METHOD_NOT_FOUND, context.exception.code)
+
+            with self.assertRaises(mkdocs_translate.daemon.DaemonError) as context:
+                client.call('nav', {'unexpected': True})
+            self.assertEqual(mkdocs_translate.daemon.SERVER_ERROR, context.exception.code)
+
+    def test_notify(self):
+        logger = logging.getLogger(mkdocs_translate.__app_name__)
+
+        def echo(text: str) -> str:
+            logger.warning("echo: " + text)
+            mkdocs_translate.daemon._connection.get().notify('result', {'text': text})
+            return text
+
+        self.daemon.methods['echo'] = echo
+        notifications = []
+        with mkdocs_translate.daemon.connect(self.path) as client:
+            with self.assertLogs(logger, 'WARNING') as logs, mkdocs_translate.daemon._notify_logging():
+                result = client.call('echo', {'text': 'hello'},
+                                     notify=lambda method, params: notifications.append((method, params)))
+
+        self.assertEqual('hello', result)
+        self.assertEqual([('result', {'text': 'hello'})], notifications)
+        # logged by daemon thread, and again by client when notified
+        self.assertEqual(2, logs.output.count('WARNING:mkdocs_translate:echo: hello'))
+
+    def test_notify_root_logger(self):
+        def echo(text: str) -> str:
+            logging.getLogger('pandoc').warning("echo: " + text)
+            return text
+
+        self.daemon.methods['echo'] = echo
+        logger = logging.getLogger(mkdocs_translate.__app_name__)
+        with mkdocs_translate.daemon.connect(self.path) as client:
+            with self.assertLogs(logger, 'WARNING') as logs, mkdocs_translate.daemon._notify_logging():
+                client.call('echo', {'text': 'hello'})
+        self.assertEqual(['WARNING:mkdocs_translate:echo: hello'], logs.output, "notified to client")
+
+    def test_socket_permissions(self):
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
-import logging
+import contextlib
+import os
+import mkdocs_translate.session
 import mkdocs_translate.translate
 import unittest
 
@@ -19,6 +21,16 @@ def _callback(path:str, value:str, arguments: dict, block:str, indent:str) -> st
     return output
 
 class TestDirective(unittest.TestCase):
+
+    def setUp(self):
+        # each test uses a fresh session, leaving default session configuration and anchors unchanged
+        self.session = mkdocs_translate.session.Session(configure=False)
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(self.session.activate())
+
+    def tearDown(self):
+        self.stack.close()
+
     def test_preprocess_rst_block_directive(self):
         text = """
 Hello World
@@ -113,7 +125,7 @@ Goodbye"""
         """
         Test the white space indentation on blank lines is different throwing off detection of the nested block directives
         """
-        text = """
+        text = r"""
 #. Run the container
 
    .. only:: not snapshot
@@ -268,6 +280,184 @@ Goodbye"""
 """
         self.assertEqual("pipe-table", mkdocs_translate.translate._list_table_scan(block) )
 
+    def test_preprocess_list_table_pipe(self):
+        """
+        List tables with inline cell content are written as markdown pipe tables.
+        """
+        rst_example = """
+#. Login using:
+
+   .. list-table::
+      :widths: 30 70
+      :header-rows: 1
+
+      * - Field
+        - Value
+      * - User:
+        - ``admin`` see `docs <security.rst>`_
+      * - Password:
+        -
+"""
+        process = mkdocs_translate.translate._preprocess_rst_directives("docker.rst", rst_example)
+        self.assertIn("   .. code-block:: raw_markdown\n", process)
+        self.assertIn("      | Field     | Value                           |\n"
+                      "      |-----------|---------------------------------|\n"
+                      "      | User:     | `admin` see [docs](security.md) |\n"
+                      "      | Password: |                                 |\n", process)
+
+    def test_preprocess_list_table_fallback(self):
+        """
+        List tables with inline markup requiring pandoc are written as list-table, at the directive indentation.
+        """
+        rst_example = """
+#. Options:
+
+   .. list-table::
+      :widths: 30 70
+      :header-rows: 1
+
+      * - Option
+        - Value
+      * - Pipe
+        - a | b
+
+#. Next
+"""
+        process = mkdocs_translate.translate._preprocess_rst_directives("docker.rst", rst_example)
+        self.assertIn("   .. list-table::\n"
+                      "      :header-rows: 1\n"
+                      "   \n"
+                      "      * - Option\n"
+                      "        - Value\n"
+                      "      * - Pipe\n"
+                      "        - a | b\n", process)
+        self.assertNotIn(":widths:", process)
+
+    def test_preprocess_list_table_stub_columns(self):
+        """
+        List tables without a header row, or with stub columns, are written as definition lists.
+        """
+        rst_example = """
+#. Login using:
+
+   .. list-table::
+      :widths: 30 70
+      :stub-columns: 1
+{header}
+      * - User:
+        - ``admin``
+      * - Password:
+        - ``geoserver``
+"""
+        definition_list = ("   User:\n"
+                           "      ``admin``\n"
+                           "   \n"
+                           "   Password:\n"
+                           "      ``geoserver``\n")
+        for header in ["", "      :header-rows: 0\n", "      :header-rows: 1\n"]:
+            process = mkdocs_translate.translate._preprocess_rst_directives("docker.rst", rst_example.format(header=header))
+            self.assertIn(definition_list, process)
+            self.assertNotIn("raw_markdown", process)
+
+    def test_preprocess_literal_blocks(self):
+        """
+        Code and literal blocks are copied as is, the example guide shows rst directives in code blocks.
+        """
+        guide = os.path.join(os.path.dirname(__file__), '..', 'example', 'source', 'guide', 'markdown.rst')
+        with open(guide, 'r') as file:
+            text = file.read()
+        process = mkdocs_translate.translate._preprocess_rst_directives("guide/markdown.rst", text)
+
+        for sample in [
+            "   #. To login as the GeoServer administrator using the default password:\n\n"
+            "      .. list-table::\n"
+            "         :widths: 30 70\n",
+            "   .. figure:: img/foss4g.svg\n"
+            "      :scale: 25%\n",
+        ]:
+            self.assertIn(sample, text)
+            self.assertIn(sample, process)
+
+        literal = "Example::\n\n   .. figure:: img/example.png\n\n#. Next\n\n   .. figure:: img/next.png\n"
+        process = mkdocs_translate.translate._preprocess_rst_directives("index.rst", literal)
+        self.assertIn("Example::\n\n   .. figure:: img/example.png\n", process)
+        self.assertNotIn(".. figure:: img/next.png", process)
+
+    def test_preprocess_list_table_definition_list(self):
+        """
+        List tables with block cell content are written as definition lists.
+        """
+        block = """   * - Term
+     - First paragraph.
+
+       Second paragraph.
+     - .. note:: Nested
+   * - Empty
+     -
+"""
+        self.assertEqual("definition-list", mkdocs_translate.translate._list_table_scan(block))
+        process = mkdocs_translate.translate._block_directive_list_table("docker.rst", "", {}, block, "")
+        self.assertEqual("Term\n"
+                         "   First paragraph.\n"
+                         "\n"
+                         "   Second paragraph.\n"
+                         "\n"
+                         "   .. note:: Nested\n"
+                         "\n"
+                         "Empty\n"
+                         "   \\ \n"
+                         "\n", process)
+
+    def test_preprocess_rst_roles(self):
+        self.session.config = {
+            'extlinks': {
+                'wiki': 'https://github.com/geoserver/geoserver/wiki/%s',
+                'geos': 'https://osgeo-org.atlassian.net/browse/GEOS-%s|GEOS-%s',
+                'api': 'https://docs.geoserver.org/api/%s|raw'
+            }
+        }
+        text = (
+            "Click :guilabel:`Save` or :menuselection:`File --> Open`, run :command:`ls` in :file:`/tmp`.\n"
+            "Press :kbd:`Enter`, see :wiki:`Home`, :wiki:`release notes <Release>`\n"
+            "and :geos:`123`, visit :api:`rest`, :api:`docs <index>` and :unknown:`role`.\n"
+        )
+        output = mkdocs_translate.translate._preprocess_rst_roles("inline.rst", text)
+
+        self.assertEqual(
+            "Click **Save** or **File --> Open**, run ***ls*** in **`/tmp`**.\n"
+            "Press `Enter`, see `Home <https://github.com/geoserver/geoserver/wiki/Home>`_, "
+            "`release notes <https://github.com/geoserver/geoserver/wiki/Release>`_\n"
+            "and `GEOS-123 <https://osgeo-org.atlassian.net/browse/GEOS-123>`_, "
+            "visit https://docs.geoserver.org/api/rest, https://docs.geoserver.org/api/index and :unknown:`role`.\n",
+            output
+        )
+
+    def test_preprocess_rst_directives_nested(self):
+        text = """.. figure:: img/diagram.png
+
+   .. only:: snapshot
+
+      Caption
+
+.. only:: snapshot
+
+   .. figure:: img/example.png
+
+   .. code-block:: bash
+      :linenos:
+
+      ls
+"""
+        output = mkdocs_translate.translate._preprocess_rst_directives("docker.rst", text)
+        expected = text
+        for (directive, processing) in mkdocs_translate.translate.BLOCK_DIRECTIVES.items():
+            expected = mkdocs_translate.translate._preprocess_rst_block_directive("docker.rst", expected, directive,
+                                                                                  processing)
+        self.assertEqual(expected, output, "single pass matches processing each directive in turn")
+        self.assertIn('.. admonition:: Nightly Build', output)
+        self.assertIn('![](img/example.png)', output)
+        self.assertNotIn(':linenos:', output)
+
 def indentation(text:str) -> list[int]:
     """
     Check indentation of provided text, tabs treated as three spaces, blank line marked as -1.
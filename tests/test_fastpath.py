@@ -0,0 +1,173 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import mkdocs_translate.backend
+import mkdocs_translate.cli
+import mkdocs_translate.fastpath
+import mkdocs_translate.session
+import mkdocs_translate.translate
+
+# sample pages accepted by the fast path, compared with pandoc output
+SAMPLES = [
+    "\ufeffTitle\n=====\n\nIt's the successor.  Two spaces after a sentence,   and runs of   spaces.\n",
+    "It\u2019s \u2018quoted\u2019 and \u201cdouble quoted\u201d, a \u2013 b \u2014 c \u2026 and wait...\n",
+    "Options -- and --- and x--y, see `page <setup.rst>`_ and https://example.com for details.\n",
+    "- item  with  spaces\n- ``code  kept``\n\n#. first\n#. second\n",
+    ".. note::\n\n   Careful  now.\n",
+    ".. only a comment\n",
+    "Run ***mkdir*** command, then ***cd***\n",
+    'Pages\n\n<div class="grid cards" markdown>\n\n-   ` Setup <setup/index.rst>`_\n-   `Guide <guide.rst>`_\n\n</div>\n',
+    "",
+]
+
+
+class TestFastPath(unittest.TestCase):
+
+    def test_headings(self):
+        rst = """Title
+=====
+
+.. _install:
+
+Installation
+------------
+
+.. _sub-section:
+
+Sub Section
+-----------
+"""
+        markdown = mkdocs_translate.fastpath.convert_rst_fast(rst)
+        self.assertEqual("# Title\n\n## Installation {#install}\n\n## Sub Section\n", markdown)
+
+    def test_inline(self):
+        rst = "Use **Save**, *emphasis*, ``code`` and `title`, see `page <setup.rst#install>`_ and https://example.com ...\n"
+        markdown = mkdocs_translate.fastpath.convert_rst_fast(rst)
+        expected = "Use **Save**, *emphasis*, `code` and [title]{.title-ref}, see [page](setup.rst#install) and <https://example.com> \\...\n"
+        self.assertEqual(expected, markdown)
+
+    def test_lists(self):
+        rst = """- one
+- two
+
+  - nested
+
+#. first
+#. second::
+
+      code
+
+"""
+        markdown = mkdocs_translate.fastpath.convert_rst_fast(rst)
+        expected = """- one
+- two
+  - nested
+
+1.  first
+
+2.  second:
+
+        code
+"""
+        self.assertEqual(expected, markdown)
+
+    def test_admonition(self):
+        rst = """.. warning::
+
+   Careful.
+
+   .. note:: Nested.
+
+.. admonition:: Custom
+
+   Body.
+"""
+        markdown = mkdocs_translate.fastpath.convert_rst_fast(rst)
+        expected = """:::::: warning
+::: title
+Warning
+:::
+
+Careful.
+
+:::: note
+::: title
+Note
+:::
+
+Nested.
+::::
+::::::
+
+::: admonition
+Custom
+
+Body.
+:::
+"""
+        self.assertEqual(expected, markdown)
+
+    def test_admonition_argument(self):
+        rst = ".. note:: Release 1\n   \n   Current release\n"
+        markdown = mkdocs_translate.fastpath.convert_rst_fast(rst)
+        self.assertEqual(":::: note\n::: title\nNote\n:::\n\nRelease 1\n\nCurrent release\n::::\n", markdown)
+
+    def test_unsupported(self):
+        for rst in [
+            ".. figure:: img/example.png\n",
+            "Term\n   Definition\n",
+            "Uses |project| substitution\n",
+            "Uses :guilabel:`role`\n",
+            "====  ====\nA     B\n====  ====\n",
+            '<span>raw html</span>\n',
+            ".. code-block:: bash\n\ncode not indented\n",
+        ]:
+            with self.assertRaises(mkdocs_translate.fastpath.FastPathUnsupported, msg=rst):
+                mkdocs_translate.fastpath.convert_rst_fast(rst)
+
+    @unittest.skipIf(shutil.which('pandoc') is None, "requires pandoc")
+    def test_pandoc(self):
+        backend = mkdocs_translate.backend.pandoc_backend()
+        for rst in SAMPLES:
+            expected = backend.convert(rst, 'rst', mkdocs_translate.translate.md_extensions_to)
+            self.assertEqual(expected, mkdocs_translate.fastpath.convert_rst_fast(rst), rst)
+
+    def test_strong_emphasis(self):
+        markdown = mkdocs_translate.fastpath.convert_rst_fast("Run ***mkdir*** command.\n")
+        self.assertEqual("Run **\\*mkdir**\\* command.\n", markdown)
+
+        # not rst markup, '*' following strong read by pandoc as starting emphasis
+        with self.assertRaises(mkdocs_translate.fastpath.FastPathUnsupported):
+            mkdocs_translate.fastpath.convert_rst_fast("Run ***mkdir***, then *cd*.\n")
+
+    @unittest.skipIf(shutil.which('pandoc') is None, "requires pandoc")
+    def test_verify_example(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            example = os.path.join(tmp, 'example')
+            shutil.copytree(os.path.join(os.path.dirname(__file__), '..', 'example'), example,
+                            ignore=shutil.ignore_patterns('build', 'docs'))
+            os.makedirs(os.path.join(example, 'docs'))
+            cwd = os.getcwd()
+            os.chdir(example)
+            try:
+                session = mkdocs_translate.session.Session('translate.yml')
+                session.config['fast_path'] = 'verify'
+                logger = logging.getLogger(mkdocs_translate.__app_name__)
+                with session.activate(), self.assertLogs(logger, 'INFO') as logs:
+                    mkdocs_translate.cli.scan_project('all')
+                    session.init_anchors()
+                    migrated = list(mkdocs_translate.cli.migrate_files([session.rst_folder], 1, True, False))
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual([None] * len(migrated), [error for (rst_file, md_file, error) in migrated])
+        verified = [line for line in logs.output if 'Fast path verified' in line]
+        self.assertGreater(len(verified), 0, "example pages converted using fast path")
+        self.assertEqual([], [line for line in logs.output if 'Fast path differs' in line])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import contextlib
+import os
+import tempfile
+import unittest
+
+import mkdocs_translate.manifest
+import mkdocs_translate.session
+import mkdocs_translate.translate
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.session = mkdocs_translate.session.Session(configure=False)
+        self.session.config = {'substitutions': {'project': 'Example'}}
+        self.session.rst_folder = os.path.join(self.folder, 'source')
+        self.session.build_folder = os.path.join(self.folder, 'build')
+        os.makedirs(self.session.rst_folder)
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(self.session.activate())
+
+        self.rst_file = os.path.join(self.folder, 'source', 'index.rst')
+        self.md_file = os.path.join(self.folder, 'index.md')
+        with open(self.rst_file, 'w') as file:
+            file.write("Title\n=====\n")
+        with open(self.md_file, 'w') as file:
+            file.write("# Title\n")
+
+    def tearDown(self):
+        self.stack.close()
+        self.tmp.cleanup()
+
+    def test_manifest_current(self):
+        manifest = mkdocs_translate.manifest.load_manifest()
+        self.assertEqual({}, manifest)
+
+        entry = mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file)
+        manifest[mkdocs_translate.manifest.manifest_key(self.rst_file)] = entry
+        mkdocs_translate.manifest.save_manifest(manifest)
+
+        manifest = mkdocs_translate.manifest.load_manifest()
+        self.assertIn('index.rst', manifest)
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file)
+        self.assertTrue(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current))
+
+    def test_manifest_changed(self):
+        manifest = {'index.rst': mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file)}
+
+        with open(self.rst_file, 'a') as file:
+            file.write("\nChanged\n")
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file)
+        self.assertFalse(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current), "source changed")
+
+        manifest = {'index.rst': mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file)}
+        self.session.config = {'substitutions': {'project': 'Changed'}}
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file)
+        self.assertFalse(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current), "config changed")
+
+    def test_depends_changed(self):
+        with open(self.rst_file, 'w') as file:
+            file.write("Title\n=====\n\nSee :ref:`install`.\n")
+
+        depends = mkdocs_translate.translate.scan_depends_rst(self.session.rst_folder, self.rst_file)
+        self.assertEqual(['install'], depends['ref'])
+        graph = {'index.rst': depends}
+
+        self.session.anchors = {'install': '/install.rst', 'install.title': 'Install'}
+        manifest = {'index.rst': mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file, graph)}
+
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file, graph=graph)
+        self.assertTrue(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current, depends=True))
+
+        self.session.anchors = {'install': '/install.rst', 'install.title': 'Installation'}
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file, graph=graph)
+        self.assertTrue(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current), "source unchanged")
+        self.assertFalse(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current, depends=True), "title changed")
+
+    def test_depends_roles(self):
+        with open(self.rst_file, 'w') as file:
+            file.write("Title\n=====\n\n"
+                       "See :ref:`install`, :ref:`setup <user:setup>` and :doc:`intro`.\n"
+                       "Named :doc:`Guide <guide>` keeps its own title.\n")
+
+        depends = mkdocs_translate.translate.scan_depends_rst(self.session.rst_folder, self.rst_file)
+        self.assertEqual(['install', 'user:setup'], depends['ref'])
+        self.assertEqual(['/intro.rst.title'], depends['doc'])
+
+    def test_depends_projects(self):
+        with open(self.rst_file, 'w') as file:
+            file.write("Title\n=====\n\nSee :ref:`user:install`.\n")
+        graph = {'index.rst': mkdocs_translate.translate.scan_depends_rst(self.session.rst_folder, self.rst_file)}
+
+        user = mkdocs_translate.session.Session(configure=False)
+        user.docs_folder = os.path.join(self.folder, 'user')
+        user.anchors = {'install': '/install.md#install', 'install.title': 'Install'}
+        self.session.name = 'developer'
+        self.session.docs_folder = os.path.join(self.folder, 'developer')
+        self.session.projects = {'user': user, 'developer': self.session}
+        user.projects = self.session.projects
+
+        manifest = {'index.rst': mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file, graph)}
+        user.anchors = {'install': '/install.md#install', 'install.title': 'Installation'}
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file, graph=graph)
+        self.assertFalse(mkdocs_translate.manifest.is_current(manifest, self.rst_file, current, depends=True),
+                         "title changed in other project")
+
+    def test_shared_build_folder(self):
+        entry = mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file)
+        mkdocs_translate.manifest.save_manifest({'old.rst': entry, 'removed.rst': entry})
+
+        # two processes migrating into the same build folder
+        first = mkdocs_translate.manifest.load_manifest()
+        second = mkdocs_translate.manifest.load_manifest()
+        first_loaded = dict(first)
+        second_loaded = dict(second)
+
+        first['index.rst'] = entry
+        first.pop('removed.rst')
+        mkdocs_translate.manifest.save_manifest(first, first_loaded)
+        second['other.rst'] = entry
+        mkdocs_translate.manifest.save_manifest(second, second_loaded)
+
+        self.assertEqual(['index.rst', 'old.rst', 'other.rst'], sorted(mkdocs_translate.manifest.load_manifest()))
+
+    def test_journal(self):
+        self.assertEqual({}, mkdocs_translate.manifest.load_journal())
+
+        entry = mkdocs_translate.manifest.manifest_entry(self.rst_file, self.md_file)
+        mkdocs_translate.manifest.append_journal(self.rst_file, entry, seconds=0.25)
+        with open(mkdocs_translate.manifest.journal_path(), 'a') as file:
+            file.write('{"file": "interrupted.rst", "sta')
+
+        journal = mkdocs_translate.manifest.load_journal()
+        self.assertEqual(['index.rst'], list(journal.keys()))
+        self.assertEqual('converted', journal['index.rst']['status'])
+        self.assertEqual(0.25, journal['index.rst']['seconds'])
+        current = mkdocs_translate.manifest.manifest_entry(self.rst_file)
+        self.assertTrue(mkdocs_translate.manifest.is_current(journal, self.rst_file, current))
+
+        mkdocs_translate.manifest.append_journal(self.rst_file, entry, error="PandocError: failed")
+        self.assertEqual('failed', mkdocs_translate.manifest.load_journal()['index.rst']['status'])
+
+        mkdocs_translate.manifest.reset_journal()
+        self.assertEqual({}, mkdocs_translate.manifest.load_journal())
+
+
+if __name__ == '__main__':
+    unittest.main()
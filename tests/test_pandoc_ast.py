@@ -0,0 +1,111 @@
+import contextlib
+import unittest
+
+import mkdocs_translate.pandoc_ast
+import mkdocs_translate.session
+
+
+def _str(text: str) -> list:
+    inlines = []
+    for (index, word) in enumerate(text.split(' ')):
+        if index:
+            inlines.append({'t': 'Space'})
+        inlines.append({'t': 'Str', 'c': word})
+    return inlines
+
+
+def _para(text: str) -> dict:
+    return {'t': 'Para', 'c': _str(text)}
+
+
+class TestPandocAst(unittest.TestCase):
+
+    def setUp(self):
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(mkdocs_translate.session.Session(configure=False).activate())
+
+    def tearDown(self):
+        self.stack.close()
+
+    def write(self, blocks: list) -> str:
+        document = {'pandoc-api-version': [1, 23, 1], 'meta': {}, 'blocks': blocks}
+        return mkdocs_translate.pandoc_ast.MarkdownWriter('inline').write(document)
+
+    def test_header(self):
+        markdown = self.write([
+            {'t': 'Header', 'c': [1, ['install-guide', [], []], _str('Install Guide')]},
+            {'t': 'Header', 'c': [2, ['install', [], []], _str('Installation')]},
+        ])
+        self.assertEqual("# Install Guide\n\n## Installation {: #install }\n", markdown)
+
+    def test_inline(self):
+        markdown = self.write([{'t': 'Para', 'c': [
+            {'t': 'Span', 'c': [['', ['title-ref'], []], _str('title')]},
+            {'t': 'Space'},
+            {'t': 'Link', 'c': [['', [], []], _str('page'), ['../setup/index.rst#install', '']]},
+            {'t': 'SoftBreak'},
+            {'t': 'Strong', 'c': [{'t': 'Code', 'c': [['', [], []], 'file.txt']}]},
+        ]}])
+        self.assertEqual("``title`` [page](../setup/index.md#install) **`file.txt`**\n", markdown)
+
+    def test_admonition(self):
+        markdown = self.write([
+            {'t': 'Div', 'c': [['', ['note'], []], [
+                {'t': 'Div', 'c': [['', ['title'], []], [_para('Note')]]},
+                _para('Content'),
+                {'t': 'Div', 'c': [['', ['warning'], []], [
+                    {'t': 'Div', 'c': [['', ['title'], []], [_para('Warning')]]},
+                    _para('Nested'),
+                ]]},
+            ]]},
+            {'t': 'Div', 'c': [['', ['admonition'], []], [_para('Custom'), _para('Text')]]},
+        ])
+        expected = """!!! note
+
+    Content
+
+    !!! warning
+
+        Nested
+
+!!! abstract "Custom"
+
+    Text
+"""
+        self.assertEqual(expected, markdown)
+
+    def test_list(self):
+        markdown = self.write([
+            {'t': 'OrderedList', 'c': [[1, {'t': 'Decimal'}, {'t': 'Period'}], [
+                [_para('First'), {'t': 'CodeBlock', 'c': [['', ['bash'], []], 'ls -l']}],
+                [_para('Second'), {'t': 'BulletList', 'c': [
+                    [{'t': 'Plain', 'c': _str('a')}],
+                    [{'t': 'Plain', 'c': _str('b')}],
+                ]}],
+            ]]},
+            _para('2. not a list'),
+        ])
+        expected = """1.  First
+
+    ``` bash
+    ls -l
+    ```
+
+2.  Second
+
+    -   a
+    -   b
+
+2\\. not a list
+"""
+        self.assertEqual(expected, markdown)
+
+    def test_raw_markdown(self):
+        markdown = self.write([
+            {'t': 'CodeBlock', 'c': [['', ['raw_markdown'], []], '| A | B |\n|---|---|\n| 1 | 2 |\n']},
+        ])
+        self.assertEqual("| A | B |\n|---|---|\n| 1 | 2 |\n", markdown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import types
+import unittest
+
+try:
+    import mkdocs_translate.plugin
+    from mkdocs.structure.files import Files
+except ImportError:
+    Files = None
+
+CONFIG = """project_folder: "{folder}"
+rst_folder: "source"
+docs_folder: "docs"
+build_folder: "build"
+anchor_file: "anchors.txt"
+convert_folder: "convert"
+upload_folder: "translate"
+download_folder: "translate"
+fast_path: true
+cache_size: 0
+"""
+
+
+@unittest.skipIf(Files is None, "requires mkdocs")
+class TestPlugin(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        for folder in ['source/setup', 'docs']:
+            os.makedirs(os.path.join(self.folder.name, folder))
+        self.config_file = os.path.join(self.folder.name, 'translate.yml')
+        with open(self.config_file, 'w') as file:
+            file.write(CONFIG.format(folder=self.folder.name))
+        self.write('source/index.rst', "Home\n====\n\nSee :ref:`install`.\n")
+        self.write('source/setup/install.rst', ".. _install:\n\nInstall\n=======\n\nSteps.\n")
+
+        self.plugin = mkdocs_translate.plugin.TranslatePlugin()
+        self.plugin.config = {'config': self.config_file}
+        self.mkdocs_config = {
+            'docs_dir': os.path.join(self.folder.name, 'docs'),
+            'site_dir': os.path.join(self.folder.name, 'site'),
+            'use_directory_urls': True
+        }
+        self.plugin.on_config(self.mkdocs_config)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write(self, path: str, text: str) -> None:
+        with open(os.path.join(self.folder.name, path), 'w') as file:
+            file.write(text)
+
+    def read_source(self, src_uri: str) -> str:
+        page = types.SimpleNamespace(file=types.SimpleNamespace(src_uri=src_uri))
+        return self.plugin.on_page_read_source(page, self.mkdocs_config)
+
+    def test_convert_on_demand(self):
+        files = self.plugin.on_files(Files([]), self.mkdocs_config)
+        self.assertEqual(['index.md', 'setup/install.md'], sorted(file.src_uri for file in files))
+
+        index = self.read_source('index.md')
+        self.assertIn("[Install](setup/install.md)", index)
+        self.assertIs(index, self.read_source('index.md'))
+        install = self.read_source('setup/install.md')
+
+        # changed title is converted, and page referencing title
+        self.write('source/setup/install.rst', ".. _install:\n\nInstallation\n============\n\nSteps.\n")
+        self.plugin.on_files(Files([]), self.mkdocs_config)
+        self.assertIn("[Installation](setup/install.md)", self.read_source('index.md'))
+        self.assertIsNot(install, self.read_source('setup/install.md'))
+
+        # unchanged page is not converted
+        index = self.read_source('index.md')
+        self.plugin.on_files(Files([]), self.mkdocs_config)
+        self.assertIs(index, self.read_source('index.md'))
+
+        self.assertIsNone(self.read_source('other.md'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import time
+import tracemalloc
+import unittest
+
+import mkdocs_translate.translate
+
+RST_SECTION = """Section {n}
+----------
+
+.. index:: section {n}
+
+Text for section {n}.
+
+.. only:: snapshot
+
+   .. code-block:: bash
+      :linenos:
+
+      echo {n}
+
+.. figure:: img/figure{n}.png
+
+   Figure {n}
+
+"""
+
+MD_SECTION = """## Section {n} {{#section-{n}}}
+
+Text with \\<escapes\\> and a [link](page{n}.rst#section).
+
+::: note
+::: title
+Note
+:::
+
+Note {n}
+:::
+
+```bash
+echo {n}
+```
+
+!!! warning
+
+    Warning {n}
+
+"""
+
+
+LIST_TABLE_ROW = """   * - ``parameter{n}``
+     - Description of parameter {n}, see `reference <reference.rst#parameter{n}>`_.
+"""
+
+
+def _stages(rst: str, md: str) -> None:
+    text = mkdocs_translate.translate._preprocess_rst_directives("index.rst", rst)
+    mkdocs_translate.translate._preprocess_rst_strip("index.rst", text, 'index')
+    mkdocs_translate.translate._postprocess_rst_markdown_content("index.md", md)
+    mkdocs_translate.translate.preprocess_markdown_text(md)
+
+
+def _measure(sections: int) -> tuple[float, int]:
+    rst = ''.join(RST_SECTION.format(n=n) for n in range(sections))
+    md = ''.join(MD_SECTION.format(n=n) for n in range(sections))
+
+    elapsed = []
+    for _ in range(3):
+        start = time.perf_counter()
+        _stages(rst, md)
+        elapsed.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        _stages(rst, md)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return (min(elapsed), peak)
+
+
+def _measure_list_table(rows: int) -> float:
+    rst = ".. list-table::\n   :header-rows: 1\n\n" + ''.join(LIST_TABLE_ROW.format(n=n) for n in range(rows))
+
+    elapsed = []
+    for _ in range(3):
+        start = time.perf_counter()
+        mkdocs_translate.translate._preprocess_rst_directives("index.rst", rst)
+        elapsed.append(time.perf_counter() - start)
+    return min(elapsed)
+
+
+class TestScaling(unittest.TestCase):
+
+    def test_linear_in_document_size(self):
+        (small_time, small_peak) = _measure(200)
+        (large_time, large_peak) = _measure(1600)
+
+        # eight times the content, allowing for timing noise (quadratic growth would be 64 times)
+        self.assertLess(large_time, small_time * 24, "runtime linear in document size")
+        self.assertLess(large_peak, small_peak * 16, "peak memory linear in document size")
+
+    def test_list_table_linear_in_rows(self):
+        small_time = _measure_list_table(200)
+        large_time = _measure_list_table(1600)
+
+        self.assertLess(large_time, small_time * 24, "runtime linear in list-table rows")
+
+
+if __name__ == '__main__':
+    unittest.main()
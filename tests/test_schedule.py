@@ -0,0 +1,102 @@
+import contextlib
+import os
+import pkgutil
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+import mkdocs_translate.cli
+import mkdocs_translate.schedule
+import mkdocs_translate.session
+
+
+class TestSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        session = mkdocs_translate.session.Session(configure=False)
+        session.rst_folder = self.tmp.name
+        session.build_folder = os.path.join(self.tmp.name, 'build')
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(session.activate())
+        self.files = {}
+        for (name, text) in [('small.rst', "Small\n=====\n"),
+                             ('table.rst', "Table\n=====\n\n.. list-table::\n\n   * - a\n"),
+                             ('large.rst', "Large\n=====\n\n" + "Text.\n" * 1000)]:
+            self.files[name] = os.path.join(self.tmp.name, name)
+            with open(self.files[name], 'w') as file:
+                file.write(text)
+
+    def tearDown(self):
+        self.stack.close()
+        self.tmp.cleanup()
+
+    def test_estimate(self):
+        rst_files = list(self.files.values())
+        estimates = mkdocs_translate.schedule.estimate_durations(rst_files, {})
+        self.assertEqual([self.files['table.rst'], self.files['large.rst'], self.files['small.rst']],
+                         mkdocs_translate.schedule.longest_first(rst_files, estimates))
+
+        # history is used, and calibrates estimate of files without history
+        durations = {}
+        mkdocs_translate.schedule.record_duration(durations, self.files['large.rst'], 2.0)
+        mkdocs_translate.schedule.record_duration(durations, self.files['large.rst'], 4.0)
+        mkdocs_translate.schedule.save_durations(durations)
+        durations = mkdocs_translate.schedule.load_durations()
+        self.assertEqual({'large.rst': [2.0, 4.0]}, durations)
+
+        estimates = mkdocs_translate.schedule.estimate_durations(rst_files, durations)
+        self.assertEqual(3.0, estimates[self.files['large.rst']])
+        rate = 3.0 / mkdocs_translate.schedule.estimate_cost(self.files['large.rst'])
+        self.assertAlmostEqual(mkdocs_translate.schedule.estimate_cost(self.files['small.rst']) * rate,
+                               estimates[self.files['small.rst']])
+
+        for seconds in range(10):
+            mkdocs_translate.schedule.record_duration(durations, self.files['large.rst'], seconds)
+        self.assertEqual(mkdocs_translate.schedule.DURATIONS_HISTORY, len(durations['large.rst']))
+
+    def test_shared_durations(self):
+        first = mkdocs_translate.schedule.load_durations()
+        second = mkdocs_translate.schedule.load_durations()
+        mkdocs_translate.schedule.record_duration(first, self.files['large.rst'], 2.0)
+        mkdocs_translate.schedule.save_durations(first, {})
+        mkdocs_translate.schedule.record_duration(second, self.files['small.rst'], 1.0)
+        mkdocs_translate.schedule.save_durations(second, {})
+        self.assertEqual({'large.rst': [2.0], 'small.rst': [1.0]}, mkdocs_translate.schedule.load_durations())
+
+    def test_makespan(self):
+        self.assertEqual(0.0, mkdocs_translate.schedule.makespan([], 4))
+        self.assertEqual(6.0, mkdocs_translate.schedule.makespan([1, 2, 3], 1))
+        # longest job started last sets the makespan
+        self.assertEqual(8.0, mkdocs_translate.schedule.makespan([1, 1, 1, 1, 6], 2))
+        self.assertEqual(6.0, mkdocs_translate.schedule.makespan([6, 1, 1, 1, 1], 2))
+
+    @unittest.skipIf(shutil.which('pandoc') is None, "requires pandoc")
+    def test_migrate_order(self):
+        config = yaml.safe_load(pkgutil.get_data('mkdocs_translate', 'config.yml'))
+        config['project_folder'] = self.tmp.name
+        config['docs_folder'] = 'docs'
+        config_path = os.path.join(self.tmp.name, 'translate.yml')
+        with open(config_path, 'w') as file:
+            yaml.safe_dump(config, file)
+        docs = os.path.join(self.tmp.name, 'docs')
+        os.makedirs(docs)
+        rst_files = []
+        for name in ['small.rst', 'table.rst', 'large.rst']:
+            rst_files.append(os.path.join(docs, name))
+            shutil.copy(self.files[name], rst_files[-1])
+
+        session = mkdocs_translate.session.Session(config_path)
+        with session.activate():
+            mkdocs_translate.cli.scan_project('index')
+            migrated = list(mkdocs_translate.cli.migrate_files(rst_files, 2, True, False))
+
+        # converted longest first, reported in file order
+        self.assertEqual(rst_files, [rst_file for (rst_file, md_file, error) in migrated])
+        self.assertEqual([None] * 3, [error for (rst_file, md_file, error) in migrated])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import threading
+import unittest
+import warnings
+
+import mkdocs_translate.backend
+import mkdocs_translate.session
+import mkdocs_translate.translate
+
+
+class TestSession(unittest.TestCase):
+
+    def test_activate(self):
+        default = mkdocs_translate.session.default_session()
+        project = mkdocs_translate.session.Session(configure=False)
+        project.anchors = {'install': '/setup/install.md#install', 'install.title': 'Install'}
+
+        self.assertIs(default, mkdocs_translate.session.current_session())
+        with project.activate():
+            self.assertIs(project, mkdocs_translate.session.current_session())
+            self.assertEqual('Install', mkdocs_translate.translate._ref_title('install'))
+        self.assertIs(default, mkdocs_translate.session.current_session())
+
+    def test_module_attributes(self):
+        project = mkdocs_translate.session.Session(configure=False)
+        project.anchors = {'install': '/setup/install.md#install'}
+        with project.activate():
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.assertIs(project.anchors, mkdocs_translate.translate.anchors)
+                self.assertFalse(mkdocs_translate.translate.keep_temp)
+            self.assertEqual([DeprecationWarning] * 2, [warning.category for warning in caught])
+
+        with self.assertRaises(AttributeError):
+            mkdocs_translate.translate.unknown
+
+    def test_threads(self):
+        sessions = []
+        for name in ['one', 'two']:
+            session = mkdocs_translate.session.Session(configure=False)
+            session.anchors = {'page.title': name}
+            sessions.append(session)
+
+        titles = {}
+
+        def title(session: mkdocs_translate.session.Session) -> None:
+            with session.activate():
+                titles[id(session)] = mkdocs_translate.translate._ref_title('page')
+
+        threads = [threading.Thread(target=title, args=(session,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['one', 'two'], [titles[id(session)] for session in sessions])
+
+    def test_projects(self):
+        projects = {}
+        for (name, folder) in [('user', 'doc/user/docs'), ('developer', 'doc/developer/docs')]:
+            session = mkdocs_translate.session.Session(configure=False)
+            session.name = name
+            session.docs_folder = folder
+            session.rst_folder = folder
+            session.projects = projects
+            projects[name] = session
+        projects['user'].anchors = {'install': '/setup/install.md#install', 'install.title': 'Install'}
+        projects['developer'].anchors = {'build': '/build.md#build', 'build.title': 'Building'}
+
+        developer = projects['developer']
+        self.assertIs(developer, developer.project_session('doc/developer/docs/build.rst'))
+        with developer.activate():
+            self.assertEqual('/build.md#build', mkdocs_translate.translate._ref_location('build'))
+            self.assertEqual('/../../user/docs/setup/install.md#install',
+                             mkdocs_translate.translate._ref_location('install'))
+            self.assertEqual('/../../user/docs/setup/install.md#install',
+                             mkdocs_translate.translate._ref_location('user:install'))
+            self.assertEqual('Install', mkdocs_translate.translate._ref_title('user:install'))
+            self.assertIsNone(mkdocs_translate.translate._project_anchor('developer:install'))
+
+    def test_session_state(self):
+        wiki = mkdocs_translate.session.Session(configure=False)
+        wiki.config = {'extlinks': {'wiki': 'https://example.com/wiki/%s'}}
+        plain = mkdocs_translate.session.Session(configure=False)
+
+        (pattern, handlers) = wiki.role_lexer()
+        self.assertIs(pattern, wiki.role_lexer()[0], "compiled once")
+        self.assertIn('wiki', handlers)
+        self.assertNotIn('wiki', plain.role_lexer()[1])
+
+        wiki.config['extlinks'] = {'site': 'https://example.com/%s'}
+        self.assertIn('site', wiki.role_lexer()[1], "compiled again when extlinks changed")
+
+        project = mkdocs_translate.session.Session(configure=False)
+        project.parent = wiki
+        self.assertIs(wiki, project.root)
+        with project.activate():
+            mkdocs_translate.backend.configure_backend('server', timeout=5)
+        self.assertEqual('server', wiki.backend_name)
+        self.assertEqual('subprocess', plain.backend_name)
+        with plain.activate():
+            backend = mkdocs_translate.backend.pandoc_backend()
+        self.assertIs(backend, plain.backend)
+        self.assertIsNone(wiki.backend)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+import mkdocs_translate.session
+from mkdocs_translate.substitution import Substitutions
+
+
+class TestSubstitution(unittest.TestCase):
+
+    def test_substitute(self):
+        substitutions = Substitutions({
+            'project': 'GeoServer',
+            'install': 'C:\\Program Files\\|project| |release|',
+            'version': '2.25'
+        })
+        (text, unknown) = substitutions.substitute(
+            "|project| |version| |release| installed to |install|.\n"
+        )
+        self.assertEqual("GeoServer 2.25 {{ release }} installed to C:\\Program Files\\|project| {{ release }}.\n",
+                         text, "replaced in configuration order, followed by macros")
+        self.assertEqual([], unknown)
+
+    def test_unknown(self):
+        substitutions = Substitutions({'project': 'GeoServer'})
+        text = (
+            ".. |logo| image:: logo.png\n"
+            "\n"
+            "|logo| |project| uses |missing| and |other name|.\n"
+            "\n"
+            "+-----+-----+\n"
+            "| a   | b   |\n"
+            "+-----+-----+\n"
+            "|x|project|\n"
+        )
+        (text, unknown) = substitutions.substitute(text)
+        self.assertEqual(['missing', 'other name'], unknown, "document definitions and tables not reported")
+        self.assertIn("|logo| GeoServer uses |missing|", text)
+        self.assertIn("|xGeoServer", text)
+
+    def test_session(self):
+        session = mkdocs_translate.session.Session(configure=False)
+        session.config = {'substitutions': {'project': 'GeoServer'}}
+        substitutions = session.substitutions()
+        self.assertIs(substitutions, session.substitutions(), "compiled once")
+
+        session.config['substitutions']['project'] = 'GeoNetwork'
+        self.assertEqual('GeoNetwork', session.substitutions().values['project'], "changed in place")
+
+        session.config['substitutions'] = {'project': 'GeoTools'}
+        self.assertEqual('GeoTools', session.substitutions().values['project'], "replaced")
+
+
+if __name__ == '__main__':
+    unittest.main()
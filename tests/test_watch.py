@@ -0,0 +1,117 @@
+import contextlib
+import os
+import pkgutil
+import shutil
+import tempfile
+import threading
+import unittest
+
+import yaml
+
+import mkdocs_translate.manifest
+import mkdocs_translate.session
+import mkdocs_translate.watch
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config = yaml.safe_load(pkgutil.get_data('mkdocs_translate', 'config.yml'))
+        config['project_folder'] = self.tmp.name
+        config['docs_folder'] = 'docs'
+        config['rst_folder'] = 'docs'
+        config_path = os.path.join(self.tmp.name, 'translate.yml')
+        with open(config_path, 'w') as file:
+            yaml.safe_dump(config, file)
+
+        self.docs = os.path.join(self.tmp.name, 'docs')
+        os.makedirs(self.docs)
+        self.write('index.rst', "Index\n=====\n\nSee :ref:`install` and :doc:`setup`.\n")
+        self.write('install.rst', ".. _install:\n\nInstall\n=======\n\nText.\n")
+        self.write('setup.rst', "Setup\n=====\n\n.. include:: snippet.txt\n")
+        self.write('other.rst', "Other\n=====\n\nText.\n")
+        self.write('snippet.txt', "Snippet text.\n")
+
+        self.session = mkdocs_translate.session.Session(config_path)
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(self.session.activate())
+        self.watch_index = mkdocs_translate.watch.WatchIndex()
+        self.watch_index.scan([self.path(name) for name in sorted(os.listdir(self.docs)) if name.endswith('.rst')])
+
+    def tearDown(self):
+        self.stack.close()
+        self.tmp.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.docs, name)
+
+    def write(self, name: str, text: str) -> None:
+        with open(self.path(name), 'w') as file:
+            file.write(text)
+
+    def test_update(self):
+        self.assertEqual('Install', self.session.anchors['install.title'])
+        self.assertEqual(set(), self.watch_index.update(self.path('install.rst')), "unchanged")
+
+        self.write('install.rst', ".. _install:\n\nInstallation\n============\n\nText.\n")
+        changed = self.watch_index.update(self.path('install.rst'))
+        self.assertEqual({'install.title', '/install.rst.title'}, changed)
+        self.assertEqual('Installation', self.session.anchors['install.title'])
+        self.assertEqual({'index.rst'}, self.watch_index.dependents({'install.rst'}, changed), "ref title")
+
+        self.write('setup.rst', "Set up\n======\n\n.. include:: snippet.txt\n")
+        changed = self.watch_index.update(self.path('setup.rst'))
+        self.assertEqual({'index.rst'}, self.watch_index.dependents({'setup.rst'}, changed), "doc title")
+
+        self.assertEqual({'setup.rst'}, self.watch_index.dependents({'snippet.txt'}, set()), "include")
+
+    def test_update_removed(self):
+        os.unlink(self.path('install.rst'))
+        changed = self.watch_index.update(self.path('install.rst'))
+        self.assertIn('install', changed)
+        self.assertNotIn('install.rst', self.watch_index.index)
+        self.assertNotIn('install.rst', self.watch_index.graph)
+        self.assertNotIn('install', self.session.anchors)
+        with open(self.session.anchor_file) as file:
+            self.assertNotIn('install=', file.read())
+
+    @unittest.skipIf(shutil.which('pandoc') is None, "requires pandoc")
+    def test_migrate_changes(self):
+        self.write('install.rst', ".. _install:\n\nInstallation\n============\n\nText.\n")
+        md_files = mkdocs_translate.watch.migrate_changes(self.watch_index, {self.path('install.rst')})
+        self.assertEqual([self.path('index.md'), self.path('install.md')], md_files)
+        with open(self.path('index.md')) as file:
+            self.assertIn('Installation', file.read())
+
+        self.write('snippet.txt', "Changed snippet.\n")
+        md_files = mkdocs_translate.watch.migrate_changes(self.watch_index, {self.path('snippet.txt')})
+        self.assertEqual([self.path('setup.md')], md_files, "pages including changed file")
+
+        manifest = mkdocs_translate.manifest.load_manifest()
+        self.assertEqual({'index.rst', 'install.rst', 'setup.rst'}, set(manifest))
+
+        os.unlink(self.path('install.rst'))
+        md_files = mkdocs_translate.watch.migrate_changes(self.watch_index, {self.path('install.rst')})
+        self.assertEqual([self.path('index.md')], md_files, "pages using removed anchors")
+        self.assertNotIn('install', self.session.anchors)
+
+    def test_poll_changes(self):
+        other = os.path.join(self.tmp.name, 'other')
+        os.makedirs(other)
+        changes = mkdocs_translate.watch._poll_changes([self.docs, other], 0.2)
+
+        def edit() -> None:
+            self.write('snippet.txt', "Changed snippet, different size.\n")
+            with open(os.path.join(other, 'page.rst'), 'w') as file:
+                file.write("Page\n====\n")
+
+        timer = threading.Timer(0.05, edit)
+        timer.start()
+        changed = next(changes)
+        timer.join()
+        self.assertEqual({self.path('snippet.txt'), os.path.join(other, 'page.rst')}, changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import tempfile
+import unittest
+
+import mkdocs_translate.translate
+
+
+class TestWriteText(unittest.TestCase):
+
+    def test_write_if_changed(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'page.md')
+            self.assertTrue(mkdocs_translate.translate.write_text(path, "# Page\n"))
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+            self.assertFalse(mkdocs_translate.translate.write_text(path, "# Page\n"))
+            self.assertEqual(1_000_000_000, os.stat(path).st_mtime_ns)
+
+            self.assertTrue(mkdocs_translate.translate.write_text(path, "# Changed\n"))
+            with open(path, 'r') as file:
+                self.assertEqual("# Changed\n", file.read())
+
+            # temporary file moved into place
+            self.assertEqual(['page.md'], os.listdir(folder))
+
+
+if __name__ == '__main__':
+    unittest.main()